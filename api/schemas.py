@@ -3,7 +3,7 @@ API Data Schemas - Pydantic models for API requests/responses
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any
 
 
 class ObservationResponse(BaseModel):
@@ -12,7 +12,24 @@ class ObservationResponse(BaseModel):
     frame_id: int = Field(..., description="Frame number")
     timestamp: float = Field(..., description="Unix timestamp")
     num_lanes: int = Field(..., description="Number of lanes")
-    raw_counts: List[int] = Field(..., description="Raw vehicle counts (non-normalized)")
+    raw_counts: List[int] = Field(..., description="Raw vehicle counts of the current frame (non-normalized, unsmoothed)")
+    raw_counts_fractional: Optional[List[float]] = Field(
+        None, description="Unrounded raw counts with fractional lane assignment (raw_counts holds them rounded)"
+    )
+    degraded: bool = Field(False, description="True when counts come from the classical fallback counter")
+    lane_features: Optional[Dict[str, List[float]]] = Field(
+        None, description="Per-lane feature channels (queue_length m, stopped, moving, nearest_distance m) when enabled"
+    )
+    count_variance: Optional[List[float]] = Field(
+        None, description="Variance of the smoothed counts per lane (Kalman count filter only)"
+    )
+    stop_line_crossings: Optional[List[int]] = Field(
+        None, description="Vehicles that crossed each lane's stop line during this step (stop line counter)"
+    )
+    reward: Optional[float] = Field(None, description="Weighted reward of this step (server-side reward)")
+    reward_components: Optional[Dict[str, float]] = Field(
+        None, description="Unweighted reward components of this step (queue, pressure, waiting_time, throughput, phase_switch)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -21,7 +38,8 @@ class ObservationResponse(BaseModel):
                 "frame_id": 1523,
                 "timestamp": 1234567890.123,
                 "num_lanes": 8,
-                "raw_counts": [3, 5, 2, 4, 1, 0, 3, 2]
+                "raw_counts": [3, 5, 2, 4, 1, 0, 3, 2],
+                "degraded": False
             }
         }
 
@@ -42,13 +60,19 @@ class ActionRequest(BaseModel):
 
 class StateResponse(BaseModel):
     """Complete intersection state"""
-    vehicle_counts: List[int] = Field(..., description="Current vehicle counts per lane")
+    vehicle_counts: List[float] = Field(..., description="Current (smoothed) vehicle counts per lane")
     current_phase: int = Field(..., description="Current traffic light phase")
     phase_elapsed_time: float = Field(..., description="Time in current phase (seconds)")
     phase_duration: float = Field(..., description="Total duration of current phase")
     step_count: int = Field(..., description="Number of steps in episode")
     total_vehicles: int = Field(..., description="Total vehicles across all lanes")
     episode_runtime: float = Field(..., description="Episode runtime in seconds")
+    stop_line_crossings_phase: Optional[List[int]] = Field(
+        None, description="Vehicles discharged over each lane's stop line since the current phase started"
+    )
+    stop_line_crossings_episode: Optional[List[int]] = Field(
+        None, description="Vehicles discharged over each lane's stop line this episode"
+    )
 
 
 class HealthResponse(BaseModel):
@@ -56,9 +80,13 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Service status")
     carla_connected: bool = Field(..., description="CARLA connection status")
     yolo_loaded: bool = Field(..., description="YOLO model loaded status")
+    degraded_reason: Optional[str] = Field(None, description="Why observations use the fallback counter")
     num_lanes: int = Field(..., description="Number of lanes configured")
     num_phases: int = Field(..., description="Number of traffic phases")
     uptime: float = Field(..., description="API uptime in seconds")
+    startup_report: Optional[Dict[str, Any]] = Field(
+        None, description="Startup timings (detector load, layer fusion, warmup)"
+    )
 
 
 class MetricsResponse(BaseModel):
@@ -68,6 +96,27 @@ class MetricsResponse(BaseModel):
     average_waiting_time: float
     steps: int
     runtime: float
+    inference: Optional[Dict[str, Any]] = Field(None, description="Batching inference server metrics")
+    ingest: Optional[Dict[str, Any]] = Field(None, description="Per-camera frame ingest allocations and bytes copied")
+    slo: Optional[Dict[str, Any]] = Field(None, description="Latency SLO controller settings and transitions")
+    detection_cache: Optional[Dict[str, Any]] = Field(None, description="Frame-keyed detection cache hit rate")
+    motion_gate: Optional[Dict[str, Any]] = Field(None, description="Motion gate skip rate and count drift")
+    tracker: Optional[Dict[str, Any]] = Field(None, description="Vehicle tracker track counts, exits and update latency")
+    cascade: Optional[Dict[str, Any]] = Field(None, description="Detector cascade trigger rate and refine latency")
+    fallback: Optional[Dict[str, Any]] = Field(None, description="Fallback counter throughput, count error vs YOLO and degraded state")
+    simulation: Optional[Dict[str, Any]] = Field(None, description="Simulation clock, ticks per step and sim-seconds per wall-second")
+    reward: Optional[Dict[str, Any]] = Field(None, description="Episode reward, weights and per-component totals")
+    history: Optional[Dict[str, Any]] = Field(None, description="Metrics history series count and preallocated bytes")
+
+
+class HistoryResponse(BaseModel):
+    """Recorded metrics over a time range, one entry per series"""
+    resolution: str = Field(..., description="Stored resolution the samples were read from (tick, second, minute)")
+    step: Optional[float] = Field(None, description="Bucket size the samples were averaged over")
+    encoding: str = Field(..., description="json or base64")
+    series: Dict[str, Dict[str, Any]] = Field(
+        ..., description="Series name -> width, length, timestamps and columns (one per value index, e.g. lane)"
+    )
 
 
 class ConfigResponse(BaseModel):
@@ -75,6 +124,9 @@ class ConfigResponse(BaseModel):
     num_lanes: int
     num_phases: int
     observation_shape: List[int]
+    observation_space: Optional[Dict] = Field(
+        None, description="Observation layout: feature blocks of a frame (schema), frame_size and frame_stack"
+    )
     action_space_size: int
     lanes: List[Dict]
     phases: List[Dict]
@@ -5,27 +5,37 @@ This is THE interface that Team A will use to communicate with your system
 
 import sys
 import time
+import uuid
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 import cv2
 from loguru import logger
-from typing import Optional
+from typing import Optional, Tuple, Union
 
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
 import carla
 from config import config
-from carla_integration import CarlaClient, CameraManager, TrafficLightController
-from yolo_detection import VehicleDetector, ROIMapper
-from sensing_pipeline import VehicleCounter, ObservationBuilder, StateManager
+from carla_integration import CarlaClient, CameraManager, TrafficLightController, LaneROIGenerator
+from yolo_detection import (
+    VehicleDetector, ROIMapper, InferenceServer, LetterboxPreprocessor, LatencySLOController,
+    DetectionCache, MotionGate, FallbackCounter, VehicleTracker
+)
+from yolo_detection.detect_vehicles import filter_detections, offset_detections
+from yolo_detection.motion_gate import GatePlan
+from sensing_pipeline import (
+    VehicleCounter, ObservationBuilder, StateManager, LaneFeatureExtractor, StopLineCounter, SimClock, WallClock, create_clock,
+    RewardCalculator, MetricsHistory
+)
 from api.schemas import (
     ObservationResponse, ActionRequest, StateResponse,
-    HealthResponse, MetricsResponse, ConfigResponse,
+    HealthResponse, MetricsResponse, ConfigResponse, HistoryResponse,
     CameraPositionRequest
 )
 
@@ -52,12 +62,41 @@ class SystemState:
         self.camera_manager: Optional[CameraManager] = None
         self.traffic_controller: Optional[TrafficLightController] = None
         self.detector: Optional[VehicleDetector] = None
+        self.inference_server: Optional[InferenceServer] = None
+        # Runs the detector off the event loop when batching is off (one worker: the model is not thread-safe)
+        self.detector_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+        self.slo_controller: Optional[LatencySLOController] = None
+        self.preprocessors: dict = {}  # camera_id -> LetterboxPreprocessor
+        self.ingest_image_size: Optional[int] = None  # SLO input size the sensor thread letterboxes to (None = preprocessor's own)
+        self.last_detections: Optional[list] = None
+        self.step_lock = asyncio.Lock()  # one RL-step detection at a time (motion gate, SLO samples)
+        self.detection_cache: Optional[DetectionCache] = None
+        self.inflight_detections: dict = {}  # (camera_id, frame_id) -> asyncio.Future
+        self.motion_gate: Optional[MotionGate] = None
+        self.fallback_counter: Optional[FallbackCounter] = None
+        self.degraded = False  # True while /observation counts come from the fallback counter
+        self.degraded_reason: Optional[str] = None
+        self.degraded_steps = 0
+        self.detector_failures = 0
         self.roi_mapper: Optional[ROIMapper] = None
+        self.lane_roi_generator: Optional[LaneROIGenerator] = None
         self.vehicle_counter: Optional[VehicleCounter] = None
         self.obs_builder: Optional[ObservationBuilder] = None
+        self.lane_features: Optional[LaneFeatureExtractor] = None
+        self.tracker: Optional[VehicleTracker] = None
+        self.junction_radius = 12.0  # m around the intersection center where tracks depart
+        self.stop_line_counter: Optional[StopLineCounter] = None
+        self.step_detections: Optional[list] = None  # detections behind the latest YOLO counts (at step_confidence)
+        self.step_detections_reused = False  # True when those are a strided step's earlier detections
+        self.reward_calculator: Optional[RewardCalculator] = None
+        self.history: Optional[MetricsHistory] = None
+        self.step_vehicles_served = 0  # tracker exits of the latest step
+        self.step_waiting_time = 0.0  # vehicle-seconds stopped during the latest step
         self.state_manager: Optional[StateManager] = None
+        self.clock: Optional[Union[SimClock, WallClock]] = None  # SimClock is synced after every tick
         self.initialized = False
         self.start_time = time.time()
+        self.startup_report: dict = {}
 
 
 system = SystemState()
@@ -83,8 +122,13 @@ async def startup_event():
         system.carla_client.load_map(config.carla['carla']['map_name'])
         if config.carla['carla'].get('synchronous_mode', True):
             system.carla_client.setup_synchronous_mode(
-                config.carla['carla'].get('fixed_delta_seconds', 0.05)
+                config.carla['carla'].get('fixed_delta_seconds', 0.05),
+                no_rendering_mode=config.carla['carla'].get('no_rendering_mode', False)
             )
+        if config.ticks_per_step > 1:
+            logger.info(f"Training mode: {config.ticks_per_step} ticks per observation")
+        system.clock = create_clock(config.carla['carla'].get('clock', 'simulation'))
+        sync_clock()
         
         weather = config.carla['carla']['weather']
         system.carla_client.set_weather(
@@ -108,7 +152,10 @@ async def startup_event():
                 system.traffic_controller.find_intersection_lights(radius=50.0)
         
         logger.info("Setting up cameras...")
-        system.camera_manager = CameraManager(system.carla_client.world)
+        system.camera_manager = CameraManager(
+            system.carla_client.world,
+            num_frame_buffers=config.carla['carla'].get('ingest', {}).get('num_frame_buffers', 4)
+        )
         for cam_config in config.intersection['intersection']['cameras']:
             cfg = dict(cam_config)
             if cam_position is not None and cfg.get('name') == 'intersection_overhead':
@@ -123,25 +170,141 @@ async def startup_event():
         system.carla_client.spawn_vehicles(num_vehicles)
         
         logger.info("Initializing YOLO detector...")
-        system.detector = VehicleDetector(
-            model_path=config.yolo['yolo']['weights'],
-            confidence_threshold=config.yolo['yolo']['detection']['confidence_threshold'],
-            iou_threshold=config.yolo['yolo']['detection']['iou_threshold'],
-            target_classes=config.yolo['yolo']['detection']['target_classes'],
-            device=config.yolo['yolo']['device']
-        )
+        yolo_cfg = config.yolo['yolo']
+        try:
+            init_detector(yolo_cfg)
+        except Exception as e:
+            logger.error(f"YOLO detector failed to load: {e}")
+            if system.inference_server:
+                system.inference_server.stop()
+            system.detector = None
+            system.inference_server = None
+            system.slo_controller = None
+            system.startup_report['detector_error'] = str(e)
         
         logger.info("Initializing ROI mapper...")
         lanes = config.intersection['intersection']['lanes']
-        system.roi_mapper = ROIMapper(lanes)
+        main_cam = config.intersection['intersection']['cameras'][0]
+        assign_cfg = config.intersection['intersection'].get('lane_assignment', {})
+        system.roi_mapper = ROIMapper(
+            lanes,
+            frame_shape=(main_cam['resolution']['height'], main_cam['resolution']['width']),
+            exclusion_zones=config.intersection['intersection'].get('exclusion_zones', []),
+            assignment=assign_cfg.get('mode', 'center'),
+            min_overlap=assign_cfg.get('min_overlap', 0.1),
+            integral_downsample=assign_cfg.get('integral_downsample', 4)
+        )
+        
+        auto_roi_cfg = config.intersection['intersection'].get('auto_roi', {})
+        if auto_roi_cfg.get('enabled', False):
+            system.lane_roi_generator = LaneROIGenerator(
+                system.carla_client.world,
+                approach_length=auto_roi_cfg.get('approach_length', 30.0),
+                waypoint_step=auto_roi_cfg.get('waypoint_step', 2.0),
+                search_radius=auto_roi_cfg.get('search_radius', 40.0)
+            )
+            refresh_lane_rois()
+        
+        gate_cfg = yolo_cfg.get('motion_gate', {})
+        if gate_cfg.get('enabled', False):
+            system.motion_gate = MotionGate(
+                system.roi_mapper,
+                downsample=gate_cfg.get('downsample', 8),
+                threshold=gate_cfg.get('threshold', 6.0),
+                max_age=gate_cfg.get('max_age', 20),
+                crop_padding=gate_cfg.get('crop_padding', 32),
+                max_crop_fraction=gate_cfg.get('max_crop_fraction', 0.6)
+            )
+        
+        fallback_cfg = yolo_cfg.get('fallback', {})
+        if fallback_cfg.get('enabled', False):
+            system.fallback_counter = FallbackCounter(
+                system.roi_mapper,
+                downsample=fallback_cfg.get('downsample', 4),
+                diff_threshold=fallback_cfg.get('diff_threshold', 25),
+                learning_rate=fallback_cfg.get('learning_rate', 0.02),
+                degraded_learning_rate=fallback_cfg.get('degraded_learning_rate', 0.002),
+                min_blob_area=fallback_cfg.get('min_blob_area', 150),
+                vehicle_area=fallback_cfg.get('vehicle_area', 6000)
+            )
+        if system.detector is None:
+            if system.fallback_counter is None:
+                raise RuntimeError("YOLO detector unavailable and fallback counter disabled")
+            set_degraded(True, "detector failed to load")
         
         logger.info("Initializing sensing pipeline...")
-        system.vehicle_counter = VehicleCounter(config.num_lanes)
-        system.obs_builder = ObservationBuilder(config.num_lanes)
-        system.state_manager = StateManager(config.num_lanes, config.num_phases)
+        smoothing_cfg = config.sensing['sensing'].get('count_smoothing', {})
+        system.vehicle_counter = VehicleCounter(
+            config.num_lanes,
+            smoothing_window=smoothing_cfg.get('window', 3),
+            smoothing_filter=smoothing_cfg.get('filter', 'mean'),
+            ema_alpha=smoothing_cfg.get('ema_alpha', 0.5),
+            process_noise=smoothing_cfg.get('process_noise', 0.5),
+            measurement_noise=smoothing_cfg.get('measurement_noise', 1.0)
+        )
+        features_cfg = config.sensing['sensing'].get('lane_features', {})
+        observation_cfg = config.sensing['sensing'].get('observation', {})
+        system.obs_builder = ObservationBuilder(
+            config.num_lanes,
+            max_distance=features_cfg.get('max_distance', 60.0),
+            features=config.observation_features,
+            num_phases=config.num_phases,
+            max_phase_time=observation_cfg.get('max_phase_time', 60.0),
+            frame_stack=observation_cfg.get('frame_stack', 1)
+        )
+        if features_cfg.get('enabled', False) or system.obs_builder.feature_channels:
+            system.lane_features = LaneFeatureExtractor(
+                system.roi_mapper.lane_configs,
+                stop_speed=features_cfg.get('stop_speed', 1.0),
+                match_radius=features_cfg.get('match_radius', 3.0),
+                max_distance=features_cfg.get('max_distance', 60.0)
+            )
+            refresh_lane_rois()
+        system.state_manager = StateManager(config.num_lanes, config.num_phases, clock=system.clock)
+        
+        tracker_cfg = yolo_cfg.get('tracker', {})
+        if tracker_cfg.get('enabled', False):
+            system.tracker = VehicleTracker(
+                high_threshold=tracker_cfg.get('high_threshold', 0.5),
+                low_threshold=tracker_cfg.get('low_threshold', 0.1),
+                match_iou=tracker_cfg.get('match_iou', 0.3),
+                low_match_iou=tracker_cfg.get('low_match_iou', 0.5),
+                min_hits=tracker_cfg.get('min_hits', 3),
+                max_age=tracker_cfg.get('max_age', 30),
+                stop_speed=tracker_cfg.get('stop_speed', 1.0),
+                stop_speed_px=tracker_cfg.get('stop_speed_px', 15.0)
+            )
+            system.junction_radius = tracker_cfg.get('junction_radius', 12.0)
+        counter_cfg = config.sensing['sensing'].get('stop_line_counter', {})
+        if counter_cfg.get('enabled', False):
+            if system.tracker is None:
+                logger.warning("Stop line counter needs the vehicle tracker (yolo.tracker) - disabled")
+            else:
+                system.stop_line_counter = StopLineCounter(
+                    system.roi_mapper.lane_configs,
+                    max_gap=counter_cfg.get('max_gap', 5)
+                )
+        reward_cfg = config.sensing['sensing'].get('reward', {})
+        if reward_cfg.get('enabled', False):
+            system.reward_calculator = RewardCalculator(
+                config.num_lanes,
+                config.intersection['intersection']['traffic_phases'],
+                weights=reward_cfg.get('weights')
+            )
+            traffic_weights = [name for name in ('waiting_time', 'throughput') if reward_cfg.get('weights', {}).get(name)]
+            if traffic_weights and system.tracker is None:
+                logger.warning(f"Reward components {traffic_weights} need the vehicle tracker (yolo.tracker) - they stay 0")
+        history_cfg = config.sensing['sensing'].get('history', {})
+        if history_cfg.get('enabled', True):
+            system.history = MetricsHistory(
+                resolutions=history_cfg.get('resolutions'),
+                max_series=history_cfg.get('max_series', 64)
+            )
         
         system.initialized = True
+        system.startup_report['startup_time_s'] = time.time() - system.start_time
         logger.success("All systems initialized successfully!")
+        logger.info(f"Startup report: {system.startup_report}")
         
     except Exception as e:
         logger.error(f"Failed to initialize systems: {e}")
@@ -153,6 +316,10 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down...")
     
+    if system.inference_server:
+        system.inference_server.stop()
+    system.detector_executor.shutdown(wait=False)
+    
     if system.camera_manager:
         system.camera_manager.cleanup()
     
@@ -160,6 +327,537 @@ async def shutdown_event():
         system.carla_client.cleanup()
 
 
+def init_detector(yolo_cfg: dict):
+    """Load the YOLO detector and the inference components built around it"""
+    system.detector = VehicleDetector(
+        model_path=yolo_cfg['weights'],
+        confidence_threshold=yolo_cfg['detection']['confidence_threshold'],
+        iou_threshold=yolo_cfg['detection']['iou_threshold'],
+        target_classes=yolo_cfg['detection']['target_classes'],
+        device=yolo_cfg['device'],
+        fuse=yolo_cfg.get('fuse_layers', False),
+        half=yolo_cfg.get('half_precision', False)
+    )
+    
+    cascade = yolo_cfg.get('cascade', {})
+    if cascade.get('enabled', False):
+        system.detector.enable_cascade(
+            refine_model_path=cascade.get('refine_weights', 'yolov8m.pt'),
+            low_confidence=cascade.get('low_confidence', 0.15),
+            high_confidence=cascade.get('high_confidence'),
+            crowd_iou=cascade.get('crowd_iou', 0.3),
+            crop_size=cascade.get('crop_size', 320),
+            context=cascade.get('context', 0.5),
+            max_crops=cascade.get('max_crops', 8)
+        )
+    
+    preprocess = yolo_cfg.get('preprocess', {})
+    preprocessors = system.preprocessors
+    if preprocess.get('ingest_time', False):
+        for cam_config in config.intersection['intersection']['cameras']:
+            preprocessors[cam_config['name']] = LetterboxPreprocessor(
+                image_size=preprocess.get('image_size', 640),
+                num_buffers=system.camera_manager.num_frame_buffers
+            )
+    
+    slo = yolo_cfg.get('slo', {})
+    if slo.get('enabled', False):
+        system.slo_controller = LatencySLOController(
+            slo_ms=slo.get('latency_ms', 50.0),
+            levels=slo.get('levels'),
+            start_level=slo.get('start_level', 1),
+            window=slo.get('window', 20),
+            high_water=slo.get('high_water', 0.9),
+            low_water=slo.get('low_water', 0.5),
+            max_queue_depth=slo.get('max_queue_depth', 4),
+            upgrade_patience=slo.get('upgrade_patience', 40)
+        )
+    
+    # Warm up every input size and tiled setting the SLO controller may switch to
+    batching = yolo_cfg.get('batching', {})
+    main_cam = config.intersection['intersection']['cameras'][0]
+    system.detector.warmup(
+        image_shape=(main_cam['resolution']['height'], main_cam['resolution']['width']),
+        runs=yolo_cfg.get('warmup_runs', 0),
+        batch_size=batching.get('max_batch_size', 1) if batching.get('enabled', False) else 1,
+        preprocessor=next(iter(preprocessors.values()), None),
+        levels=system.slo_controller.levels if system.slo_controller is not None else None
+    )
+    if system.slo_controller is not None:
+        apply_inference_settings()
+    system.startup_report['detector'] = system.detector.get_load_report()
+    
+    for camera_id, preprocessor in preprocessors.items():
+        system.camera_manager.set_preprocessor(camera_id, ingest_preprocessor(preprocessor))
+    
+    if batching.get('enabled', False):
+        system.inference_server = InferenceServer(
+            system.detector,
+            max_batch_size=batching.get('max_batch_size', 8),
+            max_wait_ms=batching.get('max_wait_ms', 5.0)
+        )
+        system.inference_server.start()
+    
+    cache_cfg = yolo_cfg.get('cache', {})
+    if cache_cfg.get('enabled', False):
+        system.detection_cache = DetectionCache(
+            max_frames=cache_cfg.get('max_frames', 16),
+            base_conf=min(
+                cache_cfg.get('base_confidence', 0.2),
+                yolo_cfg['detection']['confidence_threshold']
+            )
+        )
+    
+
+def set_degraded(degraded: bool, reason: str = ""):
+    """Switch /observation between YOLO and the classical fallback counter"""
+    if degraded == system.degraded:
+        return
+    system.degraded = degraded
+    system.degraded_reason = reason if degraded else None
+    system.degraded_steps = 0
+    if degraded:
+        logger.warning(f"Entering degraded mode (fallback counter): {reason}")
+    else:
+        logger.success("YOLO detector recovered - leaving degraded mode")
+
+
+def sync_clock():
+    """Advance the simulation clock to the world's latest snapshot"""
+    if isinstance(system.clock, SimClock):
+        system.clock.sync(system.carla_client.world.get_snapshot())
+
+
+def tick_simulation(ticks: int = 1) -> int:
+    """
+    Advance CARLA and the simulation clock; camera frames of all but the last
+    tick are dropped without being converted or preprocessed
+    
+    Args:
+        ticks: Number of world ticks
+        
+    Returns:
+        Frame ID of the last tick
+    """
+    if ticks > 1:
+        system.camera_manager.ingest_enabled = False
+        try:
+            for _ in range(ticks - 1):
+                system.carla_client.tick()
+        finally:
+            system.camera_manager.ingest_enabled = True
+    frame = system.carla_client.tick()
+    sync_clock()
+    return frame
+
+
+def refresh_lane_rois():
+    """
+    Regenerate lane ROIs for the overhead camera's current pose (with auto ROIs)
+    and point the lane feature extractor at the current stop lines
+    """
+    location = system.traffic_controller.intersection_location
+    if system.lane_roi_generator is not None:
+        camera = system.camera_manager.get_camera_model("intersection_overhead")
+        if camera is None:
+            logger.warning("No camera model for 'intersection_overhead' - keeping current ROIs")
+        else:
+            lanes = system.lane_roi_generator.generate(
+                camera, location, config.intersection['intersection']['lanes']
+            )
+            if lanes is not None and lanes is not system.roi_mapper.lane_configs:
+                system.roi_mapper.set_lanes(lanes)
+    
+    if system.lane_features is not None:
+        system.lane_features.intersection_center = (location.x, location.y)
+        system.lane_features.set_lanes(system.roi_mapper.lane_configs)
+    if system.stop_line_counter is not None:
+        system.stop_line_counter.set_lanes(system.roi_mapper.lane_configs)
+
+
+def analyze_step(degraded: bool) -> Optional[dict]:
+    """
+    Per-vehicle analysis of the current step's detections: tracking (throughput
+    and waiting time into the state manager), stop-line crossings and lane queue features
+    
+    Returns:
+        Lane features for the observation (the last ones are held while degraded),
+        or None when lane features are disabled
+    """
+    if system.stop_line_counter is not None:
+        system.stop_line_counter.step_counts[:] = 0
+    system.step_vehicles_served = 0
+    system.step_waiting_time = 0.0
+    detections = None if degraded else system.step_detections
+    # Reused detections show an earlier frame: feeding them at the current time
+    # would make every vehicle look stopped
+    if detections is None or system.step_detections_reused or (system.tracker is None and system.lane_features is None):
+        return system.lane_features.last_features if system.lane_features is not None else None
+    
+    sim_time = system.clock.now()
+    camera = system.camera_manager.get_camera_model("intersection_overhead")
+    positions = camera.detections_to_ground(detections) if camera is not None else None
+    lanes = system.roi_mapper.assign_lanes(detections)
+    
+    if system.tracker is not None:
+        track_ids = system.tracker.update(
+            detections, sim_time, lanes=lanes, positions=positions, junction=junction_mask(positions, lanes)
+        )
+        if system.stop_line_counter is not None and positions is not None:
+            system.stop_line_counter.update(track_ids, positions)
+            system.tracker.mark_departed(system.stop_line_counter.last_crossed_ids)
+        served = len(system.tracker.pop_exit_events())
+        system.state_manager.record_traffic(served, system.tracker.last_waiting_time)
+        system.step_vehicles_served = served
+        system.step_waiting_time = system.tracker.last_waiting_time
+    
+    if system.lane_features is None:
+        return None
+    if positions is None:
+        return system.lane_features.last_features
+    # Queue features use the counting threshold; weaker boxes only serve the tracker
+    confident = np.array([d.confidence >= system.detector.confidence_threshold for d in detections], dtype=bool)
+    return system.lane_features.update(positions[confident], lanes[confident], sim_time)
+
+
+def junction_mask(positions: Optional[np.ndarray], lanes: np.ndarray) -> np.ndarray:
+    """
+    Detections inside the junction: within junction_radius of the intersection
+    center on the ground plane, or outside every lane ROI without a camera model
+    
+    Args:
+        positions: (N, 2) world XY of the detections, or None
+        lanes: (N,) lane of every detection (-1 = outside all lanes)
+        
+    Returns:
+        (N,) boolean mask
+    """
+    if positions is None:
+        return np.asarray(lanes) < 0
+    center = system.traffic_controller.intersection_location
+    distance = np.hypot(positions[:, 0] - center.x, positions[:, 1] - center.y)
+    return ~np.isnan(distance) & (distance <= system.junction_radius)
+
+
+def record_history(obs_dict: dict, smoothed_counts: np.ndarray, lane_features: Optional[dict], latency: dict):
+    """
+    Record one RL step into the metrics history at the current simulation time
+    
+    Args:
+        obs_dict: Observation of the step (raw counts, reward)
+        smoothed_counts: Smoothed counts per lane
+        lane_features: Lane feature channels, if enabled
+        latency: Stage name -> seconds spent in the step
+    """
+    sample = {
+        'counts': smoothed_counts,
+        'raw_counts': obs_dict.get('raw_counts_fractional', obs_dict['raw_counts']),
+        'phase': system.state_manager.current_phase,
+        'degraded': float(obs_dict['degraded'])
+    }
+    if lane_features is not None and 'queue_length' in lane_features:
+        sample['queue_length'] = lane_features['queue_length']
+    if 'reward' in obs_dict:
+        sample['reward'] = obs_dict['reward']
+        for name, value in obs_dict['reward_components'].items():
+            sample[f'reward.{name}'] = value
+    for stage, seconds in latency.items():
+        sample[f'latency.{stage}_ms'] = seconds * 1000.0
+    system.history.record(system.clock.now(), sample)
+
+
+def apply_inference_settings():
+    """Push the SLO controller's current input size to the detector and ingest preprocessors"""
+    image_size = system.slo_controller.image_size
+    system.detector.image_size = image_size
+    # Read once per frame by the sensor thread (see ingest_preprocessor); the preprocessors are not touched
+    system.ingest_image_size = image_size
+
+
+def ingest_preprocessor(preprocessor: LetterboxPreprocessor):
+    """Sensor-thread preprocessing of one camera at the current ingest_image_size snapshot"""
+    def prepare(image: np.ndarray):
+        return preprocessor(image, image_size=system.ingest_image_size)
+    return prepare
+
+
+async def detect_vehicles(
+    image: Optional[np.ndarray] = None,
+    conf: Optional[float] = None,
+    camera_id: Optional[str] = None,
+    prepared: Optional[tuple] = None,
+    tiles: Optional[tuple] = None
+):
+    """
+    Run detection through the batching inference server when enabled,
+    otherwise on the detector in the detector executor thread (never on the
+    event loop, so callers can time out). A prepared (tensor, meta) pair from
+    ingest-time preprocessing is used instead of the raw image when given.
+    """
+    if tiles is not None:
+        prepared = None
+    elif prepared is not None and max(prepared[1].input_shape) != system.detector.image_size:
+        prepared = None  # Tensor was built before an input-size change
+    
+    if system.inference_server is not None:
+        return await asyncio.wrap_future(
+            system.inference_server.submit(
+                image, conf=conf, camera_id=camera_id, prepared=prepared, tiles=tiles
+            )
+        )
+    detector = system.detector
+    stage1_conf = detector.stage1_conf(conf)
+    
+    def run():
+        if prepared is not None:
+            detections = detector.detect_preprocessed(prepared[0], prepared[1], conf_override=stage1_conf)
+        elif tiles is not None:
+            detections = detector.detect_tiled(image, tiles, conf_override=stage1_conf)
+        else:
+            detections, _ = detector.detect(image, visualize=False, conf_override=stage1_conf)
+        if detector.cascade is not None:
+            detections = detector.refine_batch([image], [detections], conf_override=conf)[0]
+        return detections
+        
+    return await asyncio.get_running_loop().run_in_executor(system.detector_executor, run)
+
+
+async def detect_cached(
+    image: np.ndarray,
+    camera_id: str,
+    frame_id: Optional[int],
+    conf: Optional[float] = None,
+    prepared: Optional[tuple] = None,
+    tiles: Optional[tuple] = None
+):
+    """
+    Detection keyed by (camera, frame): the first consumer of a frame runs
+    inference at the cache's base threshold, later consumers of the same
+    frame (at any threshold) only filter the cached boxes. frame_id must be
+    the id of `image` (from CameraManager.get_frame). If the consumer running
+    the inference is cancelled, a waiting consumer takes over.
+    """
+    cache = system.detection_cache
+    if cache is None or frame_id is None:
+        return await detect_vehicles(image, conf=conf, camera_id=camera_id, prepared=prepared, tiles=tiles)
+    
+    if conf is None:
+        conf = system.detector.confidence_threshold
+    cached = cache.get(camera_id, frame_id, conf)
+    if cached is not None:
+        return cached
+    
+    key = (camera_id, frame_id)
+    while key in system.inflight_detections:
+        pending = system.inflight_detections[key]
+        try:
+            detections = await asyncio.shield(pending)
+            return filter_detections(detections, conf)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise  # This consumer was cancelled
+            # The consumer running inference was cancelled: run it here unless another waiter already does
+    
+    pending = asyncio.get_running_loop().create_future()
+    system.inflight_detections[key] = pending
+    try:
+        detections = await detect_vehicles(
+            image, conf=cache.base_conf, camera_id=camera_id, prepared=prepared, tiles=tiles
+        )
+        cache.put(camera_id, frame_id, detections, cache.base_conf)
+        pending.set_result(detections)
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        # Cancelled (e.g. the stream client disconnected): release the waiters
+        if not pending.done():
+            pending.cancel()
+        system.inflight_detections.pop(key, None)
+    
+    return filter_detections(detections, conf)
+
+
+async def detect_gated(
+    image: np.ndarray,
+    camera_id: str,
+    frame_id: Optional[int],
+    prepared: Optional[tuple] = None,
+    tiles: Optional[tuple] = None,
+    conf: Optional[float] = None,
+    abandoned: Optional[asyncio.Event] = None
+):
+    """
+    Detection behind the motion gate: lanes whose pixels have not changed keep
+    their previous detections, changed lanes are re-detected on a crop.
+    Once `abandoned` is set the gate state is left untouched
+    """
+    gate = system.motion_gate
+    if gate is None:
+        return await detect_cached(image, camera_id, frame_id, conf=conf, prepared=prepared, tiles=tiles)
+    
+    plan = gate.plan(image)
+    if plan.action == GatePlan.REUSE:
+        return gate.commit(plan)
+    
+    if plan.action == GatePlan.FULL:
+        detections = await detect_cached(image, camera_id, frame_id, conf=conf, prepared=prepared, tiles=tiles)
+    else:
+        x1, y1, x2, y2 = plan.crop
+        crop_detections = await detect_vehicles(
+            np.ascontiguousarray(image[y1:y2, x1:x2]), conf=conf, camera_id=camera_id
+        )
+        detections = offset_detections(crop_detections, x1, y1)
+    if abandoned is not None and abandoned.is_set():
+        return detections  # Nobody uses the result: keep the reference frame of the step that replaced it
+    return gate.commit(plan, detections)
+
+
+def step_confidence() -> Optional[float]:
+    """
+    Confidence the RL step detects at: with the tracker down to the cache's base
+    threshold (or the tracker's low threshold), so its second association stage
+    sees the weak boxes; counts filter at confidence_threshold on top.
+    None (detector default) without the tracker
+    """
+    if system.tracker is None:
+        return None
+    if system.detection_cache is not None:
+        return system.detection_cache.base_conf
+    return min(system.tracker.low_threshold, system.detector.confidence_threshold)
+
+
+def count_detections(detections: list) -> Tuple[np.ndarray, list]:
+    """
+    Lane counts of a step's detections at the detector's confidence threshold
+    
+    Returns:
+        Tuple of (counts per lane, the detections counted)
+    """
+    confident = filter_detections(detections, system.detector.confidence_threshold)
+    return system.roi_mapper.count_vehicles_per_lane(confident), confident
+
+
+async def detect_for_step(
+    image: np.ndarray,
+    camera_id: str,
+    frame_id: Optional[int],
+    prepared: Optional[tuple],
+    abandoned: Optional[asyncio.Event] = None
+):
+    """
+    Detection for one RL step, governed by the latency SLO controller:
+    skips inference on strided steps and adapts input size/tiling to measured latency
+    
+    Steps run one at a time. A step whose caller gave up on it (`abandoned`
+    set, e.g. after the fallback timeout) still fills the detection cache but
+    leaves the motion gate, the SLO samples and last_detections to the steps
+    that replaced it.
+    
+    Args:
+        image, frame_id, prepared: Frame snapshot from CameraManager.get_frame
+        abandoned: Set by the caller when it stops waiting for the result
+        
+    Returns:
+        Tuple of (detections at step_confidence, reused) - reused is True on
+        strided steps, whose detections are the previous inference's (an earlier frame)
+    """
+    async with system.step_lock:
+        if abandoned is not None and abandoned.is_set():
+            return [], False  # Given up while an earlier step still ran
+        
+        controller = system.slo_controller
+        conf = step_confidence()
+        if controller is None:
+            detections = await detect_gated(
+                image, camera_id, frame_id, prepared=prepared, conf=conf, abandoned=abandoned
+            )
+            return detections, False
+        
+        if not controller.should_infer() and system.last_detections is not None:
+            return system.last_detections, True
+        
+        start = time.perf_counter()
+        detections = await detect_gated(
+            image, camera_id, frame_id, prepared=prepared, tiles=controller.tiling, conf=conf,
+            abandoned=abandoned
+        )
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        if abandoned is not None and abandoned.is_set():
+            return detections, False
+        system.last_detections = detections
+    
+        queue_depth = system.inference_server.queue_depth if system.inference_server else 0
+        if controller.observe(latency_ms, queue_depth):
+            apply_inference_settings()
+        return detections, False
+
+
+def consume_task_exception(task: asyncio.Future):
+    """Done callback retrieving the exception of a task nobody awaits any more"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Abandoned detection failed: {task.exception()}")
+
+
+async def count_for_step(image: np.ndarray, camera_id: str, frame_id: Optional[int], prepared: Optional[tuple]):
+    """
+    Vehicle counts per lane for one RL step (image, frame_id and prepared are
+    one snapshot from CameraManager.get_frame)
+    
+    YOLO counts are used while the detector answers within the fallback
+    latency budget; after repeated failures or timeouts (or if the detector
+    never loaded) the classical fallback counter takes over, and YOLO is
+    probed again every probe_interval steps.
+    
+    Returns:
+        Tuple of (counts per lane, degraded flag)
+    """
+    fallback = system.fallback_counter
+    system.step_detections = None
+    system.step_detections_reused = False
+    if fallback is None:
+        detections, reused = await detect_for_step(image, camera_id, frame_id, prepared)
+        system.step_detections = detections
+        system.step_detections_reused = reused
+        return count_detections(detections)[0], False
+    
+    fallback_cfg = config.yolo['yolo'].get('fallback', {})
+    fallback_counts = fallback.count(image, degraded=system.degraded)
+    if system.detector is None:
+        return fallback_counts, True
+    
+    if system.degraded:
+        system.degraded_steps += 1
+        if system.degraded_steps % fallback_cfg.get('probe_interval', 20) != 0:
+            return fallback_counts, True
+    
+    # Not cancelled on timeout: a late result still fills the detection cache,
+    # but the abandoned step no longer commits gate, SLO or last_detections state
+    abandoned = asyncio.Event()
+    task = asyncio.ensure_future(detect_for_step(image, camera_id, frame_id, prepared, abandoned))
+    task.add_done_callback(consume_task_exception)
+    done, _ = await asyncio.wait({task}, timeout=fallback_cfg.get('max_latency_ms', 200.0) / 1000.0)
+    if not done:
+        abandoned.set()
+    if not done or task.exception() is not None:
+        reason = "detection timed out" if not done else f"detection failed: {task.exception()}"
+        system.detector_failures += 1
+        if system.detector_failures >= fallback_cfg.get('failure_limit', 3):
+            set_degraded(True, reason)
+        return fallback_counts, True
+    
+    system.detector_failures = 0
+    set_degraded(False)
+    detections, reused = task.result()
+    system.step_detections = detections
+    system.step_detections_reused = reused
+    counts, confident = count_detections(detections)
+    if not reused:
+        # Detections of an earlier frame would calibrate against the wrong pixels
+        fallback.observe_detections(confident, counts)
+    return counts, False
+
+
 @app.get("/", tags=["General"])
 async def root():
     """Root endpoint"""
@@ -174,23 +872,30 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["General"])
 async def health_check():
     """Health check endpoint"""
+    status = "initializing"
+    if system.initialized:
+        status = "degraded" if system.degraded else "healthy"
     return HealthResponse(
-        status="healthy" if system.initialized else "initializing",
+        status=status,
         carla_connected=system.carla_client is not None,
         yolo_loaded=system.detector is not None,
+        degraded_reason=system.degraded_reason,
         num_lanes=config.num_lanes,
         num_phases=config.num_phases,
-        uptime=time.time() - system.start_time
+        uptime=time.time() - system.start_time,
+        startup_report=system.startup_report or None
     )
 
 
 @app.get("/config", response_model=ConfigResponse, tags=["Configuration"])
 async def get_config():
     """Get intersection configuration"""
+    space = system.obs_builder.get_observation_space_info() if system.obs_builder is not None else None
     return ConfigResponse(
         num_lanes=config.num_lanes,
         num_phases=config.num_phases,
-        observation_shape=list(config.observation_shape),
+        observation_shape=list(space['shape'] if space is not None else config.observation_shape),
+        observation_space=space,
         action_space_size=config.action_space_size,
         lanes=config.intersection['intersection']['lanes'],
         phases=config.intersection['intersection']['traffic_phases']
@@ -207,23 +912,61 @@ async def get_observation():
         raise HTTPException(status_code=503, detail="System not initialized")
     
     try:
-        system.carla_client.tick()
-        
-        image = system.camera_manager.get_latest_image("intersection_overhead", timeout=2.0)
+        stage_start = time.perf_counter()
+        ticks = config.ticks_per_step
+        frame = tick_simulation(ticks)
+        latency = {'tick': time.perf_counter() - stage_start}
         
-        if image is None:
+        # Skipped ticks leave no usable frame behind - wait for this step's one
+        snapshot = system.camera_manager.get_frame(
+            "intersection_overhead", min_frame=frame if ticks > 1 else None, timeout=2.0,
+            consumer="observation"
+        )
+        if snapshot is None:
             raise HTTPException(status_code=500, detail="Failed to get camera image")
+        image, frame_id, prepared = snapshot
         
-        detections, _ = system.detector.detect(image, visualize=False)
-        
-        raw_counts = system.roi_mapper.count_vehicles_per_lane(detections)
+        latency['frame'] = time.perf_counter() - stage_start - latency['tick']
+        raw_counts, degraded = await count_for_step(image, "intersection_overhead", frame_id, prepared)
+        latency['count'] = time.perf_counter() - stage_start - latency['tick'] - latency['frame']
         
         smoothed_counts = system.vehicle_counter.update(raw_counts)
         
-        obs_dict = system.obs_builder.build_observation(smoothed_counts)
+        lane_features = analyze_step(degraded)
+        obs_dict = system.obs_builder.build_observation(
+            smoothed_counts,
+            degraded=degraded,
+            lane_features=lane_features,
+            raw_counts=raw_counts,
+            phase=system.state_manager.current_phase,
+            phase_elapsed=system.state_manager.get_phase_elapsed_time()
+        )
+        
+        if system.vehicle_counter.smoothing_filter == "kalman":
+            obs_dict['count_variance'] = system.vehicle_counter.get_variance().tolist()
+        if system.stop_line_counter is not None:
+            obs_dict['stop_line_crossings'] = system.stop_line_counter.step_counts.tolist()
+        if system.reward_calculator is not None:
+            # Stop-line crossings are the more precise discharge count when available
+            served = (
+                int(system.stop_line_counter.step_counts.sum()) if system.stop_line_counter is not None
+                else system.step_vehicles_served
+            )
+            step_reward = system.reward_calculator.compute(
+                lane_features['stopped'] if lane_features is not None and 'stopped' in lane_features else smoothed_counts,
+                system.state_manager.current_phase,
+                waiting_time=system.step_waiting_time,
+                vehicles_served=served
+            )
+            obs_dict['reward'] = step_reward['reward']
+            obs_dict['reward_components'] = step_reward['components']
         
         system.state_manager.update_state(smoothed_counts, system.state_manager.current_phase)
         
+        if system.history is not None:
+            latency['total'] = time.perf_counter() - stage_start
+            record_history(obs_dict, smoothed_counts, lane_features, latency)
+        
         return ObservationResponse(**obs_dict)
         
     except Exception as e:
@@ -255,6 +998,8 @@ async def set_action(action_request: ActionRequest):
         phases = config.intersection['intersection']['traffic_phases']
         phase_config = phases[phase_id]
         
+        if system.stop_line_counter is not None and phase_id != system.state_manager.current_phase:
+            system.stop_line_counter.start_phase()
         system.traffic_controller.set_phase(phase_id, phase_config)
         system.state_manager.set_phase(phase_id, duration or phase_config['duration'])
         
@@ -279,6 +1024,10 @@ async def get_state():
         raise HTTPException(status_code=503, detail="System not initialized")
     
     state_dict = system.state_manager.get_state_dict()
+    if system.stop_line_counter is not None:
+        counts = system.stop_line_counter.get_counts()
+        state_dict['stop_line_crossings_phase'] = counts['phase']
+        state_dict['stop_line_crossings_episode'] = counts['episode']
     return StateResponse(**state_dict)
 
 
@@ -289,9 +1038,62 @@ async def get_metrics():
         raise HTTPException(status_code=503, detail="System not initialized")
     
     metrics = system.state_manager.get_metrics()
+    if system.inference_server is not None:
+        metrics['inference'] = system.inference_server.get_metrics()
+    metrics['ingest'] = system.camera_manager.get_ingest_stats()
+    if system.slo_controller is not None:
+        metrics['slo'] = system.slo_controller.get_metrics()
+    if system.detection_cache is not None:
+        metrics['detection_cache'] = system.detection_cache.get_metrics()
+    if system.detector is not None and system.detector.cascade is not None:
+        metrics['cascade'] = system.detector.get_cascade_metrics()
+    if system.motion_gate is not None:
+        metrics['motion_gate'] = system.motion_gate.get_metrics()
+    if system.tracker is not None:
+        metrics['tracker'] = system.tracker.get_metrics()
+    if isinstance(system.clock, SimClock):
+        training = config.carla['carla'].get('training', {})
+        metrics['simulation'] = {
+            **system.clock.get_metrics(),
+            'ticks_per_step': config.ticks_per_step,
+            'resolution_scale': training.get('resolution_scale', 1.0) if training.get('enabled', False) else 1.0,
+            'no_rendering_mode': config.carla['carla'].get('no_rendering_mode', False),
+            'frames_skipped': system.camera_manager.frames_skipped
+        }
+    if system.reward_calculator is not None:
+        metrics['reward'] = system.reward_calculator.get_metrics()
+    if system.history is not None:
+        metrics['history'] = system.history.get_metrics()
+    if system.fallback_counter is not None:
+        metrics['fallback'] = {
+            **system.fallback_counter.get_metrics(),
+            'degraded': system.degraded,
+            'degraded_reason': system.degraded_reason
+        }
     return MetricsResponse(**metrics)
 
 
+@app.get("/metrics/history", response_model=HistoryResponse, tags=["Monitoring"])
+async def get_metrics_history(
+    series: Optional[str] = Query(None, description="Comma-separated series names or patterns (e.g. counts,latency.*); all if omitted"),
+    start: Optional[float] = Query(None, alias="from", description="Earliest timestamp (simulation seconds)"),
+    end: Optional[float] = Query(None, alias="to", description="Latest timestamp (simulation seconds)"),
+    step: Optional[float] = Query(None, gt=0, description="Bucket size in seconds (samples averaged per bucket)"),
+    encoding: str = Query("json", description="json or base64 (float64 timestamps, float32 columns)")
+):
+    """Get recorded step metrics over a time range, optionally downsampled"""
+    if not system.initialized:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    if system.history is None:
+        raise HTTPException(status_code=404, detail="Metrics history disabled (sensing.history.enabled)")
+    
+    patterns = [name.strip() for name in series.split(',') if name.strip()] if series else None
+    try:
+        return HistoryResponse(**system.history.query(patterns, start=start, end=end, step=step, encoding=encoding))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/camera/position", tags=["Visualization"])
 async def get_camera_position():
     """Get current overhead camera position (x, y, z)."""
@@ -312,6 +1114,7 @@ async def set_camera_position(req: CameraPositionRequest):
         system.camera_manager.set_camera_position(
             "intersection_overhead", req.x, req.y, req.z
         )
+        refresh_lane_rois()
         return {"status": "success", "x": req.x, "y": req.y, "z": req.z}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -336,6 +1139,7 @@ async def move_camera_to_intersection():
         system.camera_manager.set_camera_position(
             "intersection_overhead", center[0], center[1], center[2]
         )
+        refresh_lane_rois()
         return {
             "status": "success",
             "x": center[0], "y": center[1], "z": center[2],
@@ -428,47 +1232,63 @@ async def camera_stream():
         raise HTTPException(status_code=503, detail="System not initialized")
     
     async def generate():
-        while True:
-            try:
-                system.carla_client.tick()
-                image = system.camera_manager.get_latest_image("intersection_overhead", timeout=1.0)
-                
-                if image is not None:
-                    # Lower confidence (0.2) for stream - overhead view needs lower threshold
-                    detections, annotated = system.detector.detect(
-                        image, visualize=True, conf_override=0.2
-                    )
-                    at_intersection = len(system.traffic_controller.traffic_lights) > 0
-                    vis_image = system.roi_mapper.visualize_rois(
-                        annotated, detections, show_rois=at_intersection
+        consumer = f"stream-{uuid.uuid4().hex[:8]}"  # one snapshot ring per client
+        try:
+            while True:
+                try:
+                    tick_simulation()
+                    snapshot = system.camera_manager.get_frame(
+                        "intersection_overhead", timeout=1.0, consumer=consumer
                     )
                     
-                    # Overlay camera position (x, y, z) below YOLO label
-                    pos = system.camera_manager.get_camera_position("intersection_overhead")
-                    if pos is not None:
-                        text = f"Camera: x={pos[0]:.1f}  y={pos[1]:.1f}  z={pos[2]:.1f}"
-                        cv2.putText(
-                            vis_image, text, (10, 75),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2, cv2.LINE_AA
-                        )
-                    # Hint when not at intersection
-                    if not at_intersection:
-                        hint = "Open /camera -> Click 'Move to intersection'"
-                        cv2.putText(
-                            vis_image, hint, (10, 110),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2, cv2.LINE_AA
+                    if snapshot is not None:
+                        image, frame_id, _ = snapshot
+                        if system.detector is not None and not system.degraded:
+                            # Lower confidence (0.2) for stream - overhead view needs lower threshold
+                            detections = await detect_cached(
+                                image, "intersection_overhead", frame_id, conf=0.2
+                            )
+                            annotated = system.detector.annotate(image, detections)
+                        else:
+                            detections = []
+                            annotated = image  # this client's own snapshot: drawn on in place
+                            cv2.putText(
+                                annotated, "DEGRADED: fallback counter", (15, 38),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 2, cv2.LINE_AA
+                            )
+                        at_intersection = len(system.traffic_controller.traffic_lights) > 0
+                        vis_image = system.roi_mapper.visualize_rois(
+                            annotated, detections, show_rois=at_intersection, in_place=True
                         )
+                        
+                        # Overlay camera position (x, y, z) below YOLO label
+                        pos = system.camera_manager.get_camera_position("intersection_overhead")
+                        if pos is not None:
+                            text = f"Camera: x={pos[0]:.1f}  y={pos[1]:.1f}  z={pos[2]:.1f}"
+                            cv2.putText(
+                                vis_image, text, (10, 75),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2, cv2.LINE_AA
+                            )
+                        # Hint when not at intersection
+                        if not at_intersection:
+                            hint = "Open /camera -> Click 'Move to intersection'"
+                            cv2.putText(
+                                vis_image, hint, (10, 110),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2, cv2.LINE_AA
+                            )
+                        
+                        _, buffer = cv2.imencode('.jpg', vis_image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                        
+                        yield (b'--frame\r\n'
+                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
                     
-                    _, buffer = cv2.imencode('.jpg', vis_image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                    await asyncio.sleep(0.05)
                     
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                
-                await asyncio.sleep(0.05)
-                
-            except Exception as e:
-                logger.error(f"Error in camera stream: {e}")
-                break
+                except Exception as e:
+                    logger.error(f"Error in camera stream: {e}")
+                    break
+        finally:
+            system.camera_manager.release_snapshots("intersection_overhead", consumer)
     
     return StreamingResponse(
         generate(),
@@ -486,6 +1306,21 @@ async def reset_episode():
         system.vehicle_counter.reset()
         system.obs_builder.reset()
         system.state_manager.reset()
+        if isinstance(system.clock, SimClock):
+            system.clock.restart_measurement()
+        system.last_detections = None
+        if system.motion_gate is not None:
+            system.motion_gate.reset()
+        if system.fallback_counter is not None:
+            system.fallback_counter.reset()
+        if system.lane_features is not None:
+            system.lane_features.reset()
+        if system.tracker is not None:
+            system.tracker.reset()
+        if system.stop_line_counter is not None:
+            system.stop_line_counter.reset()
+        if system.reward_calculator is not None:
+            system.reward_calculator.reset()
         
         system.traffic_controller.set_all_red()
         
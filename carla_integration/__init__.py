@@ -5,6 +5,8 @@ Handles connection to CARLA simulator, camera setup, and traffic control
 
 from .carla_client import CarlaClient
 from .camera_setup import CameraManager
+from .camera_model import CameraModel
+from .lane_roi_generator import LaneROIGenerator
 from .traffic_light_controller import TrafficLightController
 
-__all__ = ['CarlaClient', 'CameraManager', 'TrafficLightController']
+__all__ = ['CarlaClient', 'CameraManager', 'CameraModel', 'LaneROIGenerator', 'TrafficLightController']
@@ -0,0 +1,137 @@
+"""
+Camera Model - Pinhole geometry of a static CARLA camera
+Maps detections between image pixels and world coordinates (meters)
+"""
+
+import numpy as np
+from typing import List, Tuple
+
+
+def rotation_matrix(pitch: float, yaw: float, roll: float) -> np.ndarray:
+    """
+    World-from-local rotation of a CARLA/Unreal transform (same as carla.Transform.get_matrix)
+    
+    Args:
+        pitch, yaw, roll: Rotation in degrees
+        
+    Returns:
+        (3, 3) rotation matrix; local axes are x forward, y right, z up
+    """
+    cp, sp = np.cos(np.radians(pitch)), np.sin(np.radians(pitch))
+    cy, sy = np.cos(np.radians(yaw)), np.sin(np.radians(yaw))
+    cr, sr = np.cos(np.radians(roll)), np.sin(np.radians(roll))
+    return np.array([
+        [cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr],
+        [cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr],
+        [sp, -cp * sr, cp * cr]
+    ])
+
+
+# Optical camera axes (x right, y down, z forward) expressed in Unreal local axes
+OPTICAL_TO_LOCAL = np.array([
+    [0.0, 0.0, 1.0],
+    [1.0, 0.0, 0.0],
+    [0.0, -1.0, 0.0]
+])
+
+
+class CameraModel:
+    """Intrinsics and pose of one camera, with batch pixel <-> world projection"""
+    
+    def __init__(
+        self,
+        position: Tuple[float, float, float],
+        rotation: Tuple[float, float, float],
+        width: int,
+        height: int,
+        fov: float
+    ):
+        """
+        Initialize camera model
+        
+        Args:
+            position: (x, y, z) camera location in meters
+            rotation: (pitch, yaw, roll) in degrees
+            width: Image width in pixels
+            height: Image height in pixels
+            fov: Horizontal field of view in degrees
+        """
+        self.position = np.asarray(position, dtype=np.float64)
+        self.rotation = tuple(float(v) for v in rotation)
+        self.width = width
+        self.height = height
+        self.fov = fov
+        
+        focal = width / (2.0 * np.tan(np.radians(fov) / 2.0))
+        self.K = np.array([
+            [focal, 0.0, width / 2.0],
+            [0.0, focal, height / 2.0],
+            [0.0, 0.0, 1.0]
+        ])
+        
+        # World-from-optical rotation, and the pixel -> world ray matrix built from it
+        self.R = rotation_matrix(*self.rotation) @ OPTICAL_TO_LOCAL
+        self.ray_matrix = self.R @ np.linalg.inv(self.K)
+        self.projection = self.K @ self.R.T
+    
+    def pixels_to_ground(self, pixels: np.ndarray, ground_z: float = 0.0) -> np.ndarray:
+        """
+        Intersect the viewing rays of many pixels with a horizontal ground plane
+        
+        Args:
+            pixels: (N, 2) pixel coordinates (u, v)
+            ground_z: Height of the ground plane in meters
+            
+        Returns:
+            (N, 2) world XY in meters; NaN for rays that never reach the plane
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        rays = pixels @ self.ray_matrix[:, :2].T + self.ray_matrix[:, 2]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (ground_z - self.position[2]) / rays[:, 2]
+        ground = self.position[:2] + t[:, None] * rays[:, :2]
+        ground[~(t > 0)] = np.nan
+        return ground
+    
+    def world_to_pixels(self, points: np.ndarray) -> np.ndarray:
+        """
+        Project world points into the image
+        
+        Args:
+            points: (N, 3) world coordinates in meters
+            
+        Returns:
+            (N, 2) pixel coordinates; NaN for points behind the camera
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        projected = (points - self.position) @ self.projection.T
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pixels = projected[:, :2] / projected[:, 2:3]
+        pixels[projected[:, 2] <= 0] = np.nan
+        return pixels
+    
+    def detections_to_ground(self, detections: List, ground_z: float = 0.0) -> np.ndarray:
+        """
+        World position of every detection, taken at the bottom center of its box
+        (where the vehicle touches the road)
+        
+        Args:
+            detections: List of Detection objects
+            ground_z: Height of the road surface in meters
+            
+        Returns:
+            (N, 2) world XY in meters
+        """
+        if not detections:
+            return np.zeros((0, 2), dtype=np.float64)
+        boxes = np.array([detection.bbox for detection in detections], dtype=np.float64).reshape(-1, 4)
+        pixels = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2.0, boxes[:, 3]], axis=1)
+        return self.pixels_to_ground(pixels, ground_z)
+    
+    def meters_per_pixel(self, ground_z: float = 0.0) -> float:
+        """Approximate ground sampling distance at the image center"""
+        center = np.array([[self.width / 2.0, self.height / 2.0], [self.width / 2.0 + 1.0, self.height / 2.0]])
+        ground = self.pixels_to_ground(center, ground_z)
+        return float(np.linalg.norm(ground[1] - ground[0]))
@@ -4,26 +4,39 @@ Camera Manager - Sets up and manages cameras in CARLA
 
 import carla
 import numpy as np
-import queue
-from typing import Optional, Callable, Dict
+import threading
+from typing import Optional, Callable, Dict, Tuple
 from loguru import logger
 
+from .frame_buffer import FrameBufferPool, SnapshotRing
+from .camera_model import CameraModel
+
 
 class CameraManager:
     """Manages camera sensors in CARLA"""
     
-    def __init__(self, world: carla.World):
+    def __init__(self, world: carla.World, num_frame_buffers: int = 4):
         """
         Initialize camera manager
         
         Args:
             world: CARLA world instance
+            num_frame_buffers: Preallocated BGR buffers per camera (frame ring size)
         """
         self.world = world
+        self.num_frame_buffers = num_frame_buffers
         self.cameras: Dict[str, carla.Actor] = {}
-        self.image_queues: Dict[str, queue.Queue] = {}
         self.latest_images: Dict[str, np.ndarray] = {}
         self.camera_positions: Dict[str, tuple] = {}  # camera_id -> (x, y, z)
+        self.frame_pools: Dict[str, FrameBufferPool] = {}
+        self.snapshot_rings: Dict[Tuple[str, str], SnapshotRing] = {}  # (camera_id, consumer) -> ring
+        self.preprocessors: Dict[str, Callable] = {}
+        self.latest_prepared: Dict[str, tuple] = {}  # camera_id -> (tensor, meta)
+        self.latest_frame_ids: Dict[str, int] = {}  # camera_id -> simulator frame number
+        self.camera_models: Dict[str, CameraModel] = {}  # world-mounted cameras only
+        self.ingest_enabled = True  # False drops incoming frames (ticks without an observation)
+        self.frames_skipped = 0
+        self._frame_arrived = threading.Condition()
         
     def create_camera(
         self,
@@ -68,11 +81,13 @@ class CameraManager:
             else:
                 camera = self.world.spawn_actor(camera_bp, transform)
             
-            self.image_queues[camera_id] = queue.Queue()
+            self.frame_pools[camera_id] = FrameBufferPool(width, height, self.num_frame_buffers)
             camera.listen(lambda image: self._on_image_received(camera_id, image))
             
             self.cameras[camera_id] = camera
             self.camera_positions[camera_id] = position
+            if attach_to is None:
+                self.camera_models[camera_id] = CameraModel(position, rotation, width, height, fov)
             logger.success(f"Camera '{camera_id}' created at {position}")
             
             return camera
@@ -89,14 +104,87 @@ class CameraManager:
             camera_id: Camera identifier
             carla_image: CARLA image data
         """
-        image_array = np.frombuffer(carla_image.raw_data, dtype=np.uint8)
-        image_array = image_array.reshape((carla_image.height, carla_image.width, 4))
-        image_array = image_array[:, :, :3]  # Remove alpha channel (BGRA -> BGR)
+        if not self.ingest_enabled:
+            self.frames_skipped += 1
+            return
+        
+        # BGRA -> contiguous BGR in a preallocated buffer (single copy, no allocation)
+        image_array = self.frame_pools[camera_id].ingest(
+            carla_image.raw_data, carla_image.width, carla_image.height
+        )
         
-        self.latest_images[camera_id] = image_array
+        # Model preprocessing runs here, on the otherwise idle sensor thread
+        prepared = None
+        preprocessor = self.preprocessors.get(camera_id)
+        if preprocessor is not None:
+            try:
+                prepared = preprocessor(image_array)
+            except Exception as e:
+                logger.error(f"Preprocessing failed for camera '{camera_id}': {e}")
         
-        if self.image_queues[camera_id].qsize() < 2:
-            self.image_queues[camera_id].put(image_array)
+        # Image, tensor and frame id are published together (see get_frame)
+        with self._frame_arrived:
+            self.latest_frame_ids[camera_id] = carla_image.frame
+            self.latest_images[camera_id] = image_array
+            if prepared is not None:
+                self.latest_prepared[camera_id] = prepared
+            else:
+                self.latest_prepared.pop(camera_id, None)
+            self._frame_arrived.notify_all()
+    
+    def get_frame(
+        self,
+        camera_id: str,
+        min_frame: Optional[int] = None,
+        timeout: float = 1.0,
+        consumer: Optional[str] = None
+    ) -> Optional[Tuple[np.ndarray, int, Optional[tuple]]]:
+        """
+        Snapshot of a camera's latest frame: image, simulator frame id and
+        model-ready tensor, taken together under the ingest lock
+        
+        The image and tensor are copied out of the ingest rings, so they stay
+        valid however many frames arrive while the caller works on them. A named
+        consumer gets its copies in its own reusable ring (valid until it takes
+        num_frame_buffers - 1 more snapshots); without one every copy is a new
+        allocation the caller owns. Both count in get_ingest_stats.
+        
+        Args:
+            camera_id: Camera identifier
+            min_frame: Wait for this simulator frame (or a later one); None = any frame
+            timeout: Timeout in seconds
+            consumer: Name of the snapshot ring to copy into (see release_snapshots)
+            
+        Returns:
+            Tuple of (image (H, W, 3), frame id, (tensor, meta) or None), or None if timeout
+        """
+        def ready():
+            frame_id = self.latest_frame_ids.get(camera_id)
+            return frame_id is not None and (min_frame is None or frame_id >= min_frame)
+            
+        with self._frame_arrived:
+            if not self._frame_arrived.wait_for(ready, timeout=timeout):
+                target = f"frame {min_frame}" if min_frame is not None else "image"
+                logger.warning(f"Timeout waiting for {target} from camera '{camera_id}'")
+                return None
+            key = (camera_id, consumer or "unpooled")
+            ring = self.snapshot_rings.get(key)
+            if ring is None:
+                ring = SnapshotRing(self.num_frame_buffers if consumer else 0)
+                self.snapshot_rings[key] = ring
+                
+            prepared = self.latest_prepared.get(camera_id)
+            if prepared is not None:
+                prepared = (ring.copy(prepared[0], slot="tensor"), prepared[1])
+            return ring.copy(self.latest_images[camera_id]), self.latest_frame_ids[camera_id], prepared
+    
+    def release_snapshots(self, camera_id: str, consumer: str):
+        """
+        Free a consumer's snapshot ring (e.g. when a stream client disconnects);
+        its copies are not counted in get_ingest_stats any more
+        """
+        with self._frame_arrived:
+            self.snapshot_rings.pop((camera_id, consumer), None)
     
     def get_latest_image(self, camera_id: str, timeout: float = 1.0) -> Optional[np.ndarray]:
         """
@@ -109,15 +197,51 @@ class CameraManager:
         Returns:
             Image as numpy array (H, W, 3) or None if timeout
         """
-        try:
-            if camera_id in self.latest_images:
-                return self.latest_images[camera_id]
+        frame = self.get_frame(camera_id, timeout=timeout)
+        return frame[0] if frame is not None else None
+    
+    def set_preprocessor(self, camera_id: str, preprocessor: Optional[Callable]):
+        """
+        Run a preprocessor on every new frame of a camera (on the sensor thread)
+        
+        Args:
+            camera_id: Camera identifier
+            preprocessor: Callable mapping a BGR frame to (tensor, meta), or None to disable
+        """
+        if preprocessor is None:
+            self.preprocessors.pop(camera_id, None)
+            self.latest_prepared.pop(camera_id, None)
+        else:
+            self.preprocessors[camera_id] = preprocessor
+    
+    def wait_for_frame(self, camera_id: str, frame: int, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """
+        Wait until a camera delivered the image of a simulator frame (or a later one)
+        
+        Args:
+            camera_id: Camera identifier
+            frame: Simulator frame number (e.g. returned by world.tick())
+            timeout: Timeout in seconds
             
-            image = self.image_queues[camera_id].get(timeout=timeout)
-            return image
-        except queue.Empty:
-            logger.warning(f"Timeout waiting for image from camera '{camera_id}'")
-            return None
+        Returns:
+            Image as numpy array (H, W, 3) or None if timeout
+        """
+        snapshot = self.get_frame(camera_id, min_frame=frame, timeout=timeout)
+        return snapshot[0] if snapshot is not None else None
+    
+    def get_latest_frame_id(self, camera_id: str) -> Optional[int]:
+        """Get the simulator frame number of the latest image from a camera"""
+        return self.latest_frame_ids.get(camera_id)
+    
+    def get_latest_prepared(self, camera_id: str) -> Optional[tuple]:
+        """
+        Get the model-ready tensor of the latest frame (owned by the preprocessor's
+        ring; use get_frame for a tensor that matches a particular image)
+        
+        Returns:
+            (tensor, meta) tuple, or None if no preprocessor is set or no frame arrived yet
+        """
+        return self.latest_prepared.get(camera_id)
     
     def create_intersection_camera(self, camera_config: dict) -> carla.Actor:
         """
@@ -166,8 +290,47 @@ class CameraManager:
         )
         cam.set_transform(new_transform)
         self.camera_positions[camera_id] = (x, y, z)
+        
+        model = self.camera_models.get(camera_id)
+        if model is not None:
+            self.camera_models[camera_id] = CameraModel(
+                (x, y, z), model.rotation, model.width, model.height, model.fov
+            )
         logger.info(f"Camera '{camera_id}' moved to ({x:.1f}, {y:.1f}, {z:.1f})")
     
+    def get_camera_model(self, camera_id: str) -> Optional[CameraModel]:
+        """
+        Get the cached geometry of a world-mounted camera
+        
+        Returns:
+            CameraModel (rebuilt only when the camera moves), or None for unknown or attached cameras
+        """
+        return self.camera_models.get(camera_id)
+    
+    def get_ingest_stats(self) -> Dict[str, Dict]:
+        """
+        Get frame ingest statistics per camera: the ingest pool's allocations and
+        bytes copied, each consumer's snapshot copies, and the totals of both
+        per ingested frame
+        """
+        stats = {}
+        for camera_id, pool in self.frame_pools.items():
+            camera_stats = pool.get_stats()
+            snapshots = {
+                consumer: ring.get_stats()
+                for (ring_camera, consumer), ring in list(self.snapshot_rings.items()) if ring_camera == camera_id
+            }
+            frames = max(1, pool.frames_ingested)
+            camera_stats['snapshots'] = snapshots
+            camera_stats['total_allocations_per_frame'] = (
+                pool.allocations + sum(s['allocations'] for s in snapshots.values())
+            ) / frames
+            camera_stats['total_bytes_copied_per_frame'] = (
+                pool.bytes_copied + sum(s['bytes_copied'] for s in snapshots.values())
+            ) / frames
+            stats[camera_id] = camera_stats
+        return stats
+    
     def get_camera_position(self, camera_id: str) -> Optional[tuple]:
         """Get current camera position (x, y, z)."""
         if camera_id in self.camera_positions:
@@ -183,11 +346,17 @@ class CameraManager:
             if self.cameras[camera_id].is_alive:
                 self.cameras[camera_id].destroy()
             del self.cameras[camera_id]
-            del self.image_queues[camera_id]
             if camera_id in self.camera_positions:
                 del self.camera_positions[camera_id]
             if camera_id in self.latest_images:
                 del self.latest_images[camera_id]
+            self.frame_pools.pop(camera_id, None)
+            for key in [key for key in self.snapshot_rings if key[0] == camera_id]:
+                del self.snapshot_rings[key]
+            self.preprocessors.pop(camera_id, None)
+            self.latest_prepared.pop(camera_id, None)
+            self.latest_frame_ids.pop(camera_id, None)
+            self.camera_models.pop(camera_id, None)
             logger.info(f"Camera '{camera_id}' destroyed")
     
     def cleanup(self):
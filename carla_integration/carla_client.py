@@ -74,19 +74,25 @@ class CarlaClient:
             logger.error(f"Failed to load map {map_name}: {e}")
             return False
     
-    def setup_synchronous_mode(self, fixed_delta_seconds: float = 0.05):
+    def setup_synchronous_mode(self, fixed_delta_seconds: float = 0.05, no_rendering_mode: bool = False):
         """
         Enable synchronous mode for deterministic simulation
         
         Args:
             fixed_delta_seconds: Fixed time step (0.05 = 20 FPS)
+            no_rendering_mode: Disable server-side rendering (note: camera sensors
+                deliver no images in this mode)
         """
         settings = self.world.get_settings()
         settings.synchronous_mode = True
         settings.fixed_delta_seconds = fixed_delta_seconds
+        settings.no_rendering_mode = no_rendering_mode
         self.world.apply_settings(settings)
         self.traffic_manager.set_synchronous_mode(True)
-        logger.info(f"Synchronous mode enabled: {1/fixed_delta_seconds:.0f} FPS")
+        logger.info(
+            f"Synchronous mode enabled: {1/fixed_delta_seconds:.0f} FPS"
+            + (", rendering disabled" if no_rendering_mode else "")
+        )
     
     def spawn_vehicles(self, num_vehicles: int = 50, autopilot: bool = True) -> int:
         """
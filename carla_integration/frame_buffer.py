@@ -0,0 +1,161 @@
+"""
+Frame Buffer Pool - Preallocated contiguous BGR buffers for camera frame ingest
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, List
+from loguru import logger
+
+
+class FrameBufferPool:
+    """Ring of preallocated BGR buffers reused across frames of one camera"""
+    
+    def __init__(self, width: int, height: int, num_buffers: int = 4):
+        """
+        Initialize frame buffer pool
+        
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            num_buffers: Number of buffers in the ring. A frame handed out by
+                ingest() stays valid until num_buffers - 1 newer frames arrive.
+        """
+        self.num_buffers = max(2, int(num_buffers))
+        self.width = 0
+        self.height = 0
+        self.buffers = []
+        self._next = 0
+        
+        self.frames_ingested = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self.bytes_copied = 0
+        
+        self._allocate(width, height)
+    
+    def _allocate(self, width: int, height: int):
+        """(Re)allocate the ring for a new resolution"""
+        self.width = width
+        self.height = height
+        self.buffers = [
+            np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.num_buffers)
+        ]
+        self._next = 0
+        self.allocations += self.num_buffers
+        self.bytes_allocated += self.num_buffers * height * width * 3
+        logger.debug(f"Allocated {self.num_buffers} frame buffers of {width}x{height}")
+    
+    def ingest(self, raw_data, width: int, height: int) -> np.ndarray:
+        """
+        Convert a raw BGRA frame into the next buffer of the ring
+        
+        Args:
+            raw_data: Raw BGRA bytes (e.g. carla.Image.raw_data)
+            width: Frame width in pixels
+            height: Frame height in pixels
+            
+        Returns:
+            Contiguous (H, W, 3) BGR array owned by the pool
+        """
+        if width != self.width or height != self.height:
+            self._allocate(width, height)
+            
+        bgra = np.frombuffer(raw_data, dtype=np.uint8).reshape((height, width, 4))
+        dst = self.buffers[self._next]
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=dst)
+        self._next = (self._next + 1) % self.num_buffers
+        
+        self.frames_ingested += 1
+        self.bytes_copied += dst.nbytes
+        return dst
+    
+    def get_stats(self) -> Dict:
+        """
+        Get ingest statistics
+        
+        Returns:
+            Dictionary with allocation and copy counters (totals and per frame)
+        """
+        frames = max(1, self.frames_ingested)
+        return {
+            'resolution': [self.width, self.height],
+            'num_buffers': self.num_buffers,
+            'frames_ingested': self.frames_ingested,
+            'allocations': self.allocations,
+            'bytes_allocated': self.bytes_allocated,
+            'bytes_copied': self.bytes_copied,
+            'allocations_per_frame': self.allocations / frames,
+            'bytes_copied_per_frame': self.bytes_copied / frames
+        }
+
+
+class SnapshotRing:
+    """
+    Ring of reusable buffers one consumer's frame snapshots are copied into,
+    so taking a snapshot does not allocate once the ring is warm
+    """
+    
+    def __init__(self, num_buffers: int = 4):
+        """
+        Initialize snapshot ring
+        
+        Args:
+            num_buffers: Buffers per slot. A copy stays valid until num_buffers - 1
+                newer copies of the same slot are made; 0 allocates every copy
+                (the caller owns it)
+        """
+        self.num_buffers = max(2, int(num_buffers)) if num_buffers > 0 else 0
+        self.buffers: Dict[str, List[np.ndarray]] = {}
+        self._next: Dict[str, int] = {}
+        
+        self.copies = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self.bytes_copied = 0
+    
+    def copy(self, array: np.ndarray, slot: str = "image") -> np.ndarray:
+        """
+        Copy an array into the next buffer of a slot's ring
+        
+        Args:
+            array: Array to copy (e.g. a pool-owned frame or a prepared tensor)
+            slot: Ring to use; each kind of array gets its own
+            
+        Returns:
+            Copy of the array, owned by the ring unless num_buffers is 0
+        """
+        self.copies += 1
+        self.bytes_copied += array.nbytes
+        if self.num_buffers == 0:
+            self.allocations += 1
+            self.bytes_allocated += array.nbytes
+            return array.copy()
+        
+        ring = self.buffers.get(slot)
+        if ring is None or ring[0].shape != array.shape or ring[0].dtype != array.dtype:
+            ring = [np.empty_like(array) for _ in range(self.num_buffers)]
+            self.buffers[slot] = ring
+            self._next[slot] = 0
+            self.allocations += self.num_buffers
+            self.bytes_allocated += self.num_buffers * array.nbytes
+            
+        dst = ring[self._next[slot]]
+        np.copyto(dst, array)
+        self._next[slot] = (self._next[slot] + 1) % self.num_buffers
+        return dst
+    
+    def get_stats(self) -> Dict:
+        """
+        Get snapshot statistics
+        
+        Returns:
+            Dictionary with copy and allocation counters
+        """
+        return {
+            'num_buffers': self.num_buffers,
+            'copies': self.copies,
+            'allocations': self.allocations,
+            'bytes_allocated': self.bytes_allocated,
+            'bytes_copied': self.bytes_copied
+        }
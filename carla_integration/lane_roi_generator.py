@@ -0,0 +1,232 @@
+"""
+Lane ROI Generator - Builds lane ROIs from the CARLA road network
+Approach lanes of the controlled junction are read once per map/junction from
+waypoints; projecting them into a camera pose only costs a few matrix products
+"""
+
+import time
+import carla
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+
+from .camera_model import CameraModel
+
+
+DIRECTIONS = ("north", "east", "south", "west")
+MOVEMENT_ORDER = {"left": 0, "straight": 1, "right": 2}  # innermost lane first
+
+
+def approach_side(offset: np.ndarray) -> str:
+    """
+    Compass side of the junction an approach lies on (CARLA: +x east, +y south)
+    
+    Args:
+        offset: (dx, dy) from the junction center to the approach
+        
+    Returns:
+        'north', 'east', 'south' or 'west'
+    """
+    dx, dy = offset
+    if abs(dx) >= abs(dy):
+        return "east" if dx > 0 else "west"
+    return "south" if dy > 0 else "north"
+
+
+class LaneROIGenerator:
+    """Generates per-lane ROI polygons of a junction's approach lanes for a camera"""
+    
+    def __init__(
+        self,
+        world: carla.World,
+        approach_length: float = 30.0,
+        waypoint_step: float = 2.0,
+        search_radius: float = 40.0
+    ):
+        """
+        Initialize generator
+        
+        Args:
+            world: CARLA world instance
+            approach_length: Length of each lane ROI upstream of the stop line (meters)
+            waypoint_step: Waypoint spacing along the lane (meters)
+            search_radius: How far from the intersection location to look for the junction (meters)
+        """
+        self.world = world
+        self.approach_length = approach_length
+        self.waypoint_step = waypoint_step
+        self.search_radius = search_radius
+        
+        self._approach_cache: Dict[Tuple, List[Dict]] = {}  # (map, junction) -> world-space approaches
+        self._roi_cache: Dict[Tuple, List[Dict]] = {}  # (map, junction, camera pose) -> lane configs
+    
+    def find_junction(self, location: carla.Location) -> Optional[carla.Junction]:
+        """
+        Find the junction at (or nearest along the road to) a location
+        
+        Args:
+            location: Intersection location
+            
+        Returns:
+            CARLA junction or None if there is none within search_radius
+        """
+        waypoint = self.world.get_map().get_waypoint(
+            location, project_to_road=True, lane_type=carla.LaneType.Driving
+        )
+        if waypoint is None:
+            return None
+        if waypoint.is_junction:
+            return waypoint.get_junction()
+            
+        for distance in np.arange(self.waypoint_step, self.search_radius, self.waypoint_step):
+            for candidate in waypoint.next(float(distance)) + waypoint.previous(float(distance)):
+                if candidate.is_junction:
+                    return candidate.get_junction()
+        return None
+    
+    def _lane_polygon(self, waypoints: List[carla.Waypoint]) -> np.ndarray:
+        """Left edge forward, right edge backward: a closed (2M, 3) world polygon"""
+        centers = np.array([[w.transform.location.x, w.transform.location.y, w.transform.location.z]
+                            for w in waypoints])
+        rights = np.array([[v.x, v.y, 0.0] for v in (w.transform.get_right_vector() for w in waypoints)])
+        half_widths = np.array([w.lane_width / 2.0 for w in waypoints])[:, None]
+        left = centers - rights * half_widths
+        right = centers + rights * half_widths
+        return np.concatenate([left, right[::-1]], axis=0)
+    
+    def get_approaches(self, junction: carla.Junction) -> List[Dict]:
+        """
+        Incoming driving lanes of a junction in world coordinates (cached per map and junction)
+        
+        Args:
+            junction: CARLA junction
+            
+        Returns:
+            List of {side, lane_rank, polygon (M, 3), stop_line (2, 3)} sorted by
+            side and then from the innermost lane outwards
+        """
+        key = (self.world.get_map().name, junction.id)
+        if key in self._approach_cache:
+            return self._approach_cache[key]
+            
+        center = junction.bounding_box.location
+        approaches = {}
+        for entry, _ in junction.get_waypoints(carla.LaneType.Driving):
+            upstream = entry.previous(self.waypoint_step)
+            if not upstream or upstream[0].is_junction:
+                continue
+            lane_key = (upstream[0].road_id, upstream[0].section_id, upstream[0].lane_id)
+            if lane_key in approaches:
+                continue  # several connections leave the same incoming lane
+                
+            waypoints = [entry]
+            for _ in range(int(self.approach_length / self.waypoint_step)):
+                previous = waypoints[-1].previous(self.waypoint_step)
+                if not previous or previous[0].is_junction:
+                    break
+                waypoints.append(previous[0])
+                
+            polygon = self._lane_polygon(waypoints)
+            count = len(waypoints)
+            middle = polygon[:count].mean(axis=0)
+            approaches[lane_key] = {
+                'side': approach_side(middle[:2] - np.array([center.x, center.y])),
+                'lane_rank': abs(upstream[0].lane_id),
+                'polygon': polygon,
+                'stop_line': np.stack([polygon[0], polygon[-1]])
+            }
+            
+        result = sorted(
+            approaches.values(),
+            key=lambda a: (DIRECTIONS.index(a['side']), a['lane_rank'])
+        )
+        self._approach_cache[key] = result
+        logger.info(f"Junction {junction.id}: found {len(result)} approach lanes")
+        return result
+    
+    def assign_to_lanes(self, approaches: List[Dict], lane_configs: List[Dict]) -> List[List[Dict]]:
+        """
+        Match approach lanes to the configured lanes (keeps the observation layout fixed)
+        
+        Configured lanes of a direction take that side's approaches from the innermost
+        lane outwards in left/straight/right order; surplus approaches join the
+        outermost configured lane of the side. Lanes without a direction take the
+        remaining approaches in order.
+        
+        Returns:
+            Approaches of every configured lane (possibly empty)
+        """
+        matched: List[List[Dict]] = [[] for _ in lane_configs]
+        remaining = []
+        
+        for side in DIRECTIONS:
+            slots = sorted(
+                (i for i, lane in enumerate(lane_configs) if lane.get('direction') == side),
+                key=lambda i: MOVEMENT_ORDER.get(lane_configs[i].get('movement'), len(MOVEMENT_ORDER))
+            )
+            side_approaches = [a for a in approaches if a['side'] == side]
+            if not slots:
+                remaining.extend(side_approaches)
+                continue
+            for rank, approach in enumerate(side_approaches):
+                matched[slots[min(rank, len(slots) - 1)]].append(approach)
+                
+        free = [i for i, lane in enumerate(lane_configs) if lane.get('direction') not in DIRECTIONS]
+        for slot, approach in zip(free, remaining):
+            matched[slot].append(approach)
+        return matched
+    
+    def generate(
+        self,
+        camera: CameraModel,
+        intersection_location: carla.Location,
+        lane_configs: List[Dict]
+    ) -> Optional[List[Dict]]:
+        """
+        Lane configurations with ROIs projected into the camera
+        
+        Args:
+            camera: Camera model of the counting camera
+            intersection_location: Location of the controlled intersection
+            lane_configs: Configured lanes (ids, names, directions, movements)
+            
+        Returns:
+            Copies of lane_configs with generated pixel 'roi' polygons plus world
+            'stop_line_world' segments, or None if no junction was found
+        """
+        start = time.perf_counter()
+        junction = self.find_junction(intersection_location)
+        if junction is None:
+            logger.warning("No junction found near the intersection - keeping configured ROIs")
+            return None
+            
+        key = (
+            self.world.get_map().name, junction.id,
+            tuple(np.round(camera.position, 2)), camera.rotation,
+            camera.width, camera.height, camera.fov
+        )
+        if key in self._roi_cache:
+            return self._roi_cache[key]
+            
+        matched = self.assign_to_lanes(self.get_approaches(junction), lane_configs)
+        lanes = []
+        for lane, approaches in zip(lane_configs, matched):
+            generated = {k: v for k, v in lane.items() if k not in ('roi', 'exclude')}
+            generated['roi'] = []
+            generated['stop_line_world'] = []
+            for approach in approaches:
+                pixels = camera.world_to_pixels(approach['polygon'])
+                pixels = pixels[~np.isnan(pixels).any(axis=1)]
+                if len(pixels) >= 3:
+                    generated['roi'].append(np.round(pixels).astype(int).tolist())
+                generated['stop_line_world'].append(approach['stop_line'][:, :2].tolist())
+            if not generated['roi']:
+                logger.warning(f"Lane {lane['id']} ({lane.get('name', '')}) has no visible approach lane")
+            lanes.append(generated)
+            
+        self._roi_cache[key] = lanes
+        logger.info(
+            f"Generated lane ROIs for junction {junction.id} in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return lanes
@@ -7,6 +7,7 @@ import os
 import yaml
 from pathlib import Path
 from typing import Dict, Any
+from loguru import logger
 
 PROJECT_ROOT = Path(__file__).parent
 CONFIG_DIR = PROJECT_ROOT / "config"
@@ -20,7 +21,10 @@ class Config:
         self.carla = self._load_yaml("carla_config.yaml")
         self.yolo = self._load_yaml("yolo_config.yaml")
         self.intersection = self._load_yaml("intersection_config.yaml")
+        self.sensing = self._load_yaml("sensing_config.yaml")
         self._apply_env_overrides()
+        self._apply_training_mode()
+        self._apply_rendering_mode()
     
     def _load_dotenv(self) -> None:
         """
@@ -51,7 +55,7 @@ class Config:
         
         with open(filepath, 'r') as f:
             return yaml.safe_load(f)
-
+    
     def _apply_env_overrides(self) -> None:
         """Override YAML configs from environment variables when provided."""
         carla_cfg = self.carla.setdefault("carla", {})
@@ -73,6 +77,48 @@ class Config:
         if os.getenv("YOLO_CONFIDENCE"):
             yolo_cfg.setdefault("detection", {})["confidence_threshold"] = float(os.environ["YOLO_CONFIDENCE"])
     
+    def _apply_training_mode(self) -> None:
+        """Scale camera resolutions and pixel ROIs for the training mode's reduced sensor resolution"""
+        training = self.carla['carla'].get('training', {})
+        scale = training.get('resolution_scale', 1.0)
+        if not training.get('enabled', False) or scale == 1.0:
+            return
+        
+        def scale_region(region):
+            return [scale_region(value) for value in region] if isinstance(region, list) else int(round(region * scale))
+        
+        intersection = self.intersection['intersection']
+        for camera in intersection.get('cameras', []):
+            camera['resolution']['width'] = int(round(camera['resolution']['width'] * scale))
+            camera['resolution']['height'] = int(round(camera['resolution']['height'] * scale))
+        for lane in intersection.get('lanes', []):
+            for key in ('roi', 'exclude'):
+                if lane.get(key):
+                    lane[key] = scale_region(lane[key])
+        if intersection.get('exclusion_zones'):
+            intersection['exclusion_zones'] = scale_region(intersection['exclusion_zones'])
+    
+    def _apply_rendering_mode(self) -> None:
+        """
+        Force no_rendering_mode off while observations come from cameras: CARLA
+        camera sensors deliver no images without rendering, so every
+        /observation (and every training step) would time out
+        """
+        carla_cfg = self.carla['carla']
+        cameras = self.intersection['intersection'].get('cameras', [])
+        if carla_cfg.get('no_rendering_mode', False) and cameras:
+            logger.warning(
+                "no_rendering_mode is ignored: observations are built from camera images, "
+                "which CARLA does not deliver without rendering"
+            )
+            carla_cfg['no_rendering_mode'] = False
+    
+    @property
+    def ticks_per_step(self) -> int:
+        """World ticks per observation (more than one only in training mode)"""
+        training = self.carla['carla'].get('training', {})
+        return max(1, training.get('ticks_per_step', 1)) if training.get('enabled', False) else 1
+    
     @property
     def num_lanes(self) -> int:
         """Get number of lanes (observation vector size)"""
@@ -83,10 +129,27 @@ class Config:
         """Get number of traffic light phases (action space size)"""
         return len(self.intersection['intersection']['traffic_phases'])
     
+    @property
+    def observation_channels(self) -> list:
+        """Lane feature channels appended to the vehicle counts (empty when disabled)"""
+        features = self.sensing['sensing'].get('lane_features', {})
+        return list(features.get('channels', [])) if features.get('enabled', False) else []
+    
+    @property
+    def observation_features(self) -> list:
+        """Feature blocks of one observation frame (default: counts, then lane feature channels)"""
+        features = self.sensing['sensing'].get('observation', {}).get('features') or []
+        return list(features) or ['counts'] + self.observation_channels
+    
     @property
     def observation_shape(self) -> tuple:
         """Shape of observation vector for RL agent"""
-        return (self.num_lanes,)
+        from sensing_pipeline.observation_builder import observation_layout
+        
+        observation_cfg = self.sensing['sensing'].get('observation', {})
+        layout = observation_layout(self.observation_features, self.num_lanes, self.num_phases)
+        frame_size = sum(block['size'] for block in layout)
+        return (frame_size * max(1, observation_cfg.get('frame_stack', 1)),)
     
     @property
     def action_space_size(self) -> int:
@@ -97,7 +97,7 @@ def simple_reward_function(vehicle_counts: list, action: int) -> float:
     Example reward function - Team A should customize this!
     
     Args:
-        vehicle_counts: Raw vehicle counts per lane
+        vehicle_counts: Raw vehicle counts per lane (integers)
         action: Action taken
         
     Returns:
@@ -132,7 +132,10 @@ def demo_manual_control(api_url: str, num_steps: int = 50):
         
         client.send_action(action, duration=5.0)
         
-        reward = simple_reward_function(obs_data['raw_counts'], action)
+        # Server-side reward when sensing.reward is enabled
+        reward = obs_data.get('reward')
+        if reward is None:
+            reward = simple_reward_function(obs_data['raw_counts'], action)
         total_reward += reward
         
         if step % 10 == 0:
@@ -192,7 +195,8 @@ def demo_greedy_policy(api_url: str, num_steps: int = 100):
     
     for step in range(num_steps):
         obs, obs_data = client.get_observation()
-        vehicle_counts = obs_data['raw_counts']
+        # Integer counts; fractional lane assignment adds the unrounded ones
+        vehicle_counts = obs_data.get('raw_counts_fractional') or obs_data['raw_counts']
         
         best_action = 0
         best_score = -float('inf')
@@ -15,7 +15,7 @@ sys.path.append(str(PROJECT_ROOT))
 from config import config
 from carla_integration import CarlaClient, CameraManager, TrafficLightController
 from yolo_detection import VehicleDetector, ROIMapper
-from sensing_pipeline import VehicleCounter, ObservationBuilder, StateManager
+from sensing_pipeline import VehicleCounter, ObservationBuilder, StateManager, SimClock, create_clock
 
 
 class VisionSystem:
@@ -31,6 +31,7 @@ class VisionSystem:
         self.vehicle_counter = None
         self.obs_builder = None
         self.state_manager = None
+        self.clock = None
         
     def initialize(self):
         """Initialize all systems"""
@@ -51,7 +52,8 @@ class VisionSystem:
         
         logger.info("Setting up synchronous mode...")
         self.carla_client.setup_synchronous_mode(
-            fixed_delta_seconds=config.carla['carla']['fixed_delta_seconds']
+            fixed_delta_seconds=config.carla['carla']['fixed_delta_seconds'],
+            no_rendering_mode=config.carla['carla'].get('no_rendering_mode', False)
         )
         
         logger.info("Setting weather...")
@@ -89,12 +91,35 @@ class VisionSystem:
         
         logger.info("Initializing ROI mapper...")
         lanes = config.intersection['intersection']['lanes']
-        self.roi_mapper = ROIMapper(lanes)
+        assign_cfg = config.intersection['intersection'].get('lane_assignment', {})
+        self.roi_mapper = ROIMapper(
+            lanes,
+            exclusion_zones=config.intersection['intersection'].get('exclusion_zones', []),
+            assignment=assign_cfg.get('mode', 'center'),
+            min_overlap=assign_cfg.get('min_overlap', 0.1),
+            integral_downsample=assign_cfg.get('integral_downsample', 4)
+        )
         
         logger.info("Initializing sensing pipeline...")
-        self.vehicle_counter = VehicleCounter(config.num_lanes)
-        self.obs_builder = ObservationBuilder(config.num_lanes)
-        self.state_manager = StateManager(config.num_lanes, config.num_phases)
+        smoothing_cfg = config.sensing['sensing'].get('count_smoothing', {})
+        self.vehicle_counter = VehicleCounter(
+            config.num_lanes,
+            smoothing_window=smoothing_cfg.get('window', 3),
+            smoothing_filter=smoothing_cfg.get('filter', 'mean'),
+            ema_alpha=smoothing_cfg.get('ema_alpha', 0.5),
+            process_noise=smoothing_cfg.get('process_noise', 0.5),
+            measurement_noise=smoothing_cfg.get('measurement_noise', 1.0)
+        )
+        observation_cfg = config.sensing['sensing'].get('observation', {})
+        self.obs_builder = ObservationBuilder(
+            config.num_lanes,
+            features=config.observation_features,
+            num_phases=config.num_phases,
+            max_phase_time=observation_cfg.get('max_phase_time', 60.0),
+            frame_stack=observation_cfg.get('frame_stack', 1)
+        )
+        self.clock = create_clock(config.carla['carla'].get('clock', 'simulation'))
+        self.state_manager = StateManager(config.num_lanes, config.num_phases, clock=self.clock)
         
         logger.success("All systems initialized!")
         return True
@@ -106,9 +131,19 @@ class VisionSystem:
         camera_name = config.intersection['intersection']['cameras'][0]['name']
         
         for i in range(num_iterations):
-            self.carla_client.tick()
+            ticks = config.ticks_per_step
+            self.camera_manager.ingest_enabled = ticks <= 1
+            for _ in range(ticks - 1):
+                self.carla_client.tick()
+            self.camera_manager.ingest_enabled = True
+            frame = self.carla_client.tick()
+            if isinstance(self.clock, SimClock):
+                self.clock.sync(self.carla_client.world.get_snapshot())
             
-            image = self.camera_manager.get_latest_image(camera_name, timeout=2.0)
+            if ticks > 1:
+                image = self.camera_manager.wait_for_frame(camera_name, frame, timeout=2.0)
+            else:
+                image = self.camera_manager.get_latest_image(camera_name, timeout=2.0)
             
             if image is None:
                 logger.warning(f"Frame {i}: No image received")
@@ -120,7 +155,12 @@ class VisionSystem:
             
             smoothed_counts = self.vehicle_counter.update(raw_counts)
             
-            obs_dict = self.obs_builder.build_observation(smoothed_counts)
+            obs_dict = self.obs_builder.build_observation(
+                smoothed_counts,
+                raw_counts=raw_counts,
+                phase=self.state_manager.current_phase,
+                phase_elapsed=self.state_manager.get_phase_elapsed_time()
+            )
             
             self.state_manager.update_state(smoothed_counts, self.state_manager.current_phase)
             
@@ -135,6 +175,8 @@ class VisionSystem:
                 phases = config.intersection['intersection']['traffic_phases']
                 self.traffic_controller.set_phase(phase, phases[phase])
         
+        if isinstance(self.clock, SimClock):
+            logger.info(f"Realtime factor: {self.clock.get_metrics()['realtime_factor']:.1f}x")
         logger.success("Loop complete!")
     
     def cleanup(self):
@@ -0,0 +1,325 @@
+"""
+Detector Benchmark - accuracy vs. latency sweep on a DatasetGenerator dataset
+Sweeps weights, input sizes, backends and inference modes; writes a
+machine-readable results table and a Pareto-front summary
+"""
+
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import cv2
+import numpy as np
+import psutil
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config import config
+from yolo_detection import VehicleDetector, ROIMapper, LetterboxPreprocessor
+from yolo_detection.detect_vehicles import filter_detections
+from yolo_detection.evaluation import (
+    load_yolo_labels, labels_to_detections, compute_map, count_mae, pareto_front
+)
+from loguru import logger
+
+
+MODES = ("full", "letterbox", "tiled")
+
+
+class PeakMemorySampler:
+    """Samples process RSS in a background thread to find the peak of one run"""
+    
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.peak_rss = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+            self._stop.wait(self.interval_s)
+    
+    def __enter__(self):
+        self.peak_rss = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def load_dataset(dataset_dir: str, max_frames: int) -> List[Dict]:
+    """
+    Load frames and labels written by DatasetGenerator
+    
+    Args:
+        dataset_dir: Dataset root containing images/ and labels/
+        max_frames: Maximum number of frames to load
+        
+    Returns:
+        List of {name, image, boxes, classes}
+    """
+    root = Path(dataset_dir)
+    frames = []
+    for image_path in sorted((root / "images").glob("*.jpg"))[:max_frames]:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            logger.warning(f"Skipping unreadable image {image_path}")
+            continue
+        height, width = image.shape[:2]
+        boxes, classes = load_yolo_labels(root / "labels" / f"{image_path.stem}.txt", width, height)
+        frames.append({'name': image_path.stem, 'image': image, 'boxes': boxes, 'classes': classes})
+        
+    logger.info(f"Loaded {len(frames)} labeled frames from {root}")
+    return frames
+
+
+def run_configuration(
+    detector: VehicleDetector,
+    frames: List[Dict],
+    mode: str,
+    image_size: int,
+    map_conf: float,
+    warmup: int
+):
+    """
+    Run one configuration over all frames
+    
+    Returns:
+        Tuple of (detections per frame, latencies in ms, peak RSS in bytes)
+    """
+    preprocessor = LetterboxPreprocessor(image_size=image_size) if mode == "letterbox" else None
+    
+    def infer(image):
+        if mode == "letterbox":
+            tensor, meta = preprocessor(image)
+            return detector.detect_preprocessed(tensor, meta, conf_override=map_conf)
+        if mode == "tiled":
+            return detector.detect_tiled(image, (2, 2), conf_override=map_conf)
+        detections, _ = detector.detect(image, conf_override=map_conf)
+        return detections
+        
+    for frame in frames[:warmup]:
+        infer(frame['image'])
+        
+    predictions, latencies = [], []
+    with PeakMemorySampler() as memory:
+        for frame in frames:
+            start = time.perf_counter()
+            predictions.append(infer(frame['image']))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            
+    return predictions, np.array(latencies), memory.peak_rss
+
+
+def benchmark(
+    dataset_dir: str,
+    weights: List[str],
+    image_sizes: List[int],
+    backends: List[str],
+    modes: List[str],
+    conf: float,
+    map_conf: float,
+    max_frames: int,
+    warmup: int,
+    output_dir: str
+) -> List[Dict]:
+    """
+    Sweep detector configurations and write results
+    
+    Args:
+        dataset_dir: DatasetGenerator output directory
+        weights: Model weights (any format ultralytics loads, e.g. .pt, .onnx, .engine)
+        image_sizes: Inference sizes
+        backends: 'cpu', 'cuda' or 'cuda-fp16'
+        modes: Inference modes (full, letterbox, tiled)
+        conf: Operating confidence threshold used for lane counts
+        map_conf: Low threshold used to collect detections for mAP
+        max_frames: Maximum frames evaluated per configuration
+        warmup: Untimed frames run before each configuration
+        output_dir: Where results.json, results.csv and pareto.md are written
+        
+    Returns:
+        Result rows
+    """
+    frames = load_dataset(dataset_dir, max_frames)
+    if not frames:
+        logger.error("No labeled frames found - run scripts/generate_dataset.py first")
+        return []
+        
+    roi_mapper = ROIMapper(config.intersection['intersection']['lanes'])
+    ground_truths = [(frame['boxes'], frame['classes']) for frame in frames]
+    
+    rows = []
+    for weight in weights:
+        for backend in backends:
+            device = "cpu" if backend == "cpu" else "cuda"
+            try:
+                detector = VehicleDetector(
+                    model_path=weight,
+                    confidence_threshold=conf,
+                    device=device,
+                    fuse=True,
+                    half=backend == "cuda-fp16"
+                )
+            except Exception as e:
+                logger.error(f"Skipping {weight} on {backend}: {e}")
+                continue
+                
+            true_counts = np.array([
+                roi_mapper.count_vehicles_per_lane(
+                    labels_to_detections(frame['boxes'], frame['classes'], detector.class_names)
+                )
+                for frame in frames
+            ])
+            
+            for image_size in image_sizes:
+                detector.image_size = image_size
+                for mode in modes:
+                    if device == "cuda":
+                        import torch
+                        torch.cuda.reset_peak_memory_stats()
+                        
+                    predictions, latencies, peak_rss = run_configuration(
+                        detector, frames, mode, image_size, map_conf, warmup
+                    )
+                    
+                    predicted_counts = np.array([
+                        roi_mapper.count_vehicles_per_lane(filter_detections(dets, conf))
+                        for dets in predictions
+                    ])
+                    accuracy = compute_map(predictions, ground_truths)
+                    
+                    row = {
+                        'weights': Path(weight).name,
+                        'backend': backend,
+                        'image_size': image_size,
+                        'mode': mode,
+                        'frames': len(frames),
+                        'map50': accuracy['map50'],
+                        'map50_95': accuracy['map50_95'],
+                        **count_mae(predicted_counts, true_counts),
+                        'p50_latency_ms': float(np.percentile(latencies, 50)),
+                        'p99_latency_ms': float(np.percentile(latencies, 99)),
+                        'peak_rss_mb': peak_rss / 2**20,
+                        'peak_gpu_mb': (
+                            torch.cuda.max_memory_allocated() / 2**20 if device == "cuda" else 0.0
+                        )
+                    }
+                    rows.append(row)
+                    logger.info(
+                        f"{row['weights']} {backend} {image_size} {mode}: "
+                        f"mAP50-95={row['map50_95']:.3f} count MAE={row['count_mae']:.2f} "
+                        f"p50={row['p50_latency_ms']:.1f}ms p99={row['p99_latency_ms']:.1f}ms"
+                    )
+                    
+    if rows:
+        write_results(rows, output_dir, dataset_dir)
+    return rows
+
+
+def write_results(rows: List[Dict], output_dir: str, dataset_dir: str):
+    """Write results.json, results.csv and a Markdown Pareto-front summary"""
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    front = pareto_front(rows)
+    
+    machine = {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': psutil.cpu_count(),
+        'memory_gb': psutil.virtual_memory().total / 2**30
+    }
+    try:
+        import torch
+        if torch.cuda.is_available():
+            machine['gpu'] = torch.cuda.get_device_name(0)
+    except ImportError:
+        pass
+        
+    with open(out / "results.json", 'w') as f:
+        json.dump({
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'dataset': str(dataset_dir),
+            'machine': machine,
+            'results': rows,
+            'pareto_front': front
+        }, f, indent=2)
+        
+    columns = [key for key in rows[0] if key != 'count_mae_per_lane']
+    with open(out / "results.csv", 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns + ['count_mae_per_lane', 'pareto'])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                **{key: row[key] for key in columns},
+                'count_mae_per_lane': ";".join(f"{v:.3f}" for v in row['count_mae_per_lane']),
+                'pareto': any(row is other for other in front)
+            })
+            
+    lines = [
+        "# Detector benchmark - Pareto front",
+        "",
+        f"Dataset: `{dataset_dir}` ({rows[0]['frames']} frames) on {machine['platform']}"
+        + (f", {machine['gpu']}" if 'gpu' in machine else ""),
+        "",
+        "Configurations not beaten on p50 latency, mAP50-95 and count MAE at once:",
+        "",
+        "| weights | backend | size | mode | mAP50 | mAP50-95 | count MAE | p50 ms | p99 ms | peak RSS MB | peak GPU MB |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for row in front:
+        lines.append(
+            f"| {row['weights']} | {row['backend']} | {row['image_size']} | {row['mode']} | "
+            f"{row['map50']:.3f} | {row['map50_95']:.3f} | {row['count_mae']:.2f} | "
+            f"{row['p50_latency_ms']:.1f} | {row['p99_latency_ms']:.1f} | "
+            f"{row['peak_rss_mb']:.0f} | {row['peak_gpu_mb']:.0f} |"
+        )
+    with open(out / "pareto.md", 'w') as f:
+        f.write("\n".join(lines) + "\n")
+        
+    logger.success(f"Wrote {len(rows)} results ({len(front)} on the Pareto front) to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detector accuracy vs. latency")
+    parser.add_argument("--dataset", default="./datasets/carla_vehicles", help="DatasetGenerator output directory")
+    parser.add_argument("--weights", nargs="+", default=["yolov8n.pt", "yolov8s.pt"], help="Model weights to compare")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640], help="Inference sizes")
+    parser.add_argument("--backends", nargs="+", default=["cuda"], choices=["cpu", "cuda", "cuda-fp16"])
+    parser.add_argument("--modes", nargs="+", default=["full", "letterbox"], choices=MODES)
+    parser.add_argument(
+        "--conf", type=float,
+        default=config.yolo['yolo']['detection']['confidence_threshold'],
+        help="Operating confidence threshold for lane counts"
+    )
+    parser.add_argument("--map-conf", type=float, default=0.01, help="Confidence threshold for mAP")
+    parser.add_argument("--frames", type=int, default=200, help="Maximum frames per configuration")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed warmup frames per configuration")
+    parser.add_argument("--output", default="./benchmark_results", help="Output directory")
+    
+    args = parser.parse_args()
+    
+    benchmark(
+        dataset_dir=args.dataset,
+        weights=args.weights,
+        image_sizes=args.imgsz,
+        backends=args.backends,
+        modes=args.modes,
+        conf=args.conf,
+        map_conf=args.map_conf,
+        max_frames=args.frames,
+        warmup=args.warmup,
+        output_dir=args.output
+    )
@@ -22,7 +22,8 @@ class ROICalibrator:
     def __init__(self):
         self.image = None
         self.current_roi = []
-        self.all_rois = {}
+        self.all_rois = {}  # lane_id -> list of polygons
+        self.all_exclusions = {}  # lane_id -> list of polygons cut out of the lane
         self.current_lane = 0
         self.num_lanes = 8
     
@@ -31,26 +32,30 @@ class ROICalibrator:
         if event == cv2.EVENT_LBUTTONDOWN:
             self.current_roi.append((x, y))
             print(f"Point added: ({x}, {y})")
-            
-            if len(self.current_roi) == 4:
-                self.save_current_roi()
     
-    def save_current_roi(self):
-        """Save current ROI and move to next lane"""
-        x1, y1 = self.current_roi[0]
-        x2, y2 = self.current_roi[2]
-        
-        roi_rect = [
-            min(x1, x2), min(y1, y2),
-            max(x1, x2), max(y1, y2)
-        ]
+    def close_polygon(self, exclude: bool = False):
+        """Store the clicked vertices as a region (or exclusion) of the current lane"""
+        if len(self.current_roi) < 3:
+            print("A polygon needs at least 3 points")
+            return
         
-        self.all_rois[self.current_lane] = roi_rect
+        polygon = [[int(x), int(y)] for x, y in self.current_roi]
+        target = self.all_exclusions if exclude else self.all_rois
+        target.setdefault(self.current_lane, []).append(polygon)
         
-        print(f"Lane {self.current_lane} ROI saved: {roi_rect}")
+        kind = "exclusion" if exclude else "region"
+        print(f"Lane {self.current_lane} {kind} saved: {polygon}")
+        self.current_roi = []
+    
+    def next_lane(self):
+        """Finish the current lane and move to the next one"""
+        if self.current_roi:
+            self.close_polygon()
+        if not self.all_rois.get(self.current_lane):
+            print(f"Lane {self.current_lane} has no region yet")
+            return
         
         self.current_lane += 1
-        self.current_roi = []
         
         if self.current_lane >= self.num_lanes:
             print("\nAll ROIs defined!")
@@ -65,20 +70,30 @@ class ROICalibrator:
             (255, 0, 255), (0, 255, 255), (128, 128, 0), (128, 0, 128)
         ]
         
-        for lane_id, roi in self.all_rois.items():
-            x1, y1, x2, y2 = roi
+        for lane_id, polygons in self.all_rois.items():
             color = colors[lane_id % len(colors)]
-            cv2.rectangle(result, (x1, y1), (x2, y2), color, 3)
-            cv2.putText(result, f"Lane {lane_id}", (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        
+            for polygon in polygons:
+                points = np.array(polygon, dtype=np.int32)
+                cv2.polylines(result, [points], isClosed=True, color=color, thickness=3)
+                x, y = points.min(axis=0)
+                cv2.putText(result, f"Lane {lane_id}", (int(x), int(y) - 10),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        
+        for polygons in self.all_exclusions.values():
+            for polygon in polygons:
+                cv2.polylines(result, [np.array(polygon, dtype=np.int32)], isClosed=True,
+                              color=(128, 128, 128), thickness=2)
+        
+        if len(self.current_roi) > 1:
+            cv2.polylines(result, [np.array(self.current_roi, dtype=np.int32)], isClosed=False,
+                          color=(0, 255, 0), thickness=1)
         for i, (x, y) in enumerate(self.current_roi):
             cv2.circle(result, (x, y), 5, (0, 255, 0), -1)
             cv2.putText(result, f"P{i+1}", (x + 10, y),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
         if self.current_lane < self.num_lanes:
-            cv2.putText(result, f"Defining Lane {self.current_lane} - Click 4 corners",
+            cv2.putText(result, f"Defining Lane {self.current_lane} - click vertices, Enter to close polygon",
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
         
         return result
@@ -88,15 +103,18 @@ class ROICalibrator:
         output_path = PROJECT_ROOT / "config" / "rois_calibrated.yaml"
         
         lanes_config = []
-        for lane_id, roi in self.all_rois.items():
-            lanes_config.append({
+        for lane_id, polygons in self.all_rois.items():
+            lane = {
                 'id': lane_id,
                 'name': f"Lane_{lane_id}",
-                'roi': [roi]
-            })
+                'roi': polygons
+            }
+            if self.all_exclusions.get(lane_id):
+                lane['exclude'] = self.all_exclusions[lane_id]
+            lanes_config.append(lane)
         
         with open(output_path, 'w') as f:
-            yaml.dump({'lanes': lanes_config}, f, default_flow_style=False)
+            yaml.dump({'lanes': lanes_config}, f, default_flow_style=None)
         
         print(f"\n✓ ROIs exported to: {output_path}")
         print("\nCopy these to config/intersection_config.yaml")
@@ -155,10 +173,11 @@ class ROICalibrator:
         print("ROI Calibration Tool")
         print("=" * 60)
         print("\nInstructions:")
-        print("1. Click 4 corners of each lane ROI (top-left, top-right, bottom-right, bottom-left)")
-        print("2. After 4 clicks, the ROI is saved automatically")
-        print("3. Repeat for all 8 lanes")
-        print("4. Press 'q' to quit, 'r' to reset current lane")
+        print("1. Click the vertices of a lane region (any number, in order around the region)")
+        print("2. Press Enter to close the polygon; add more polygons for the same lane if needed")
+        print("3. Press 'x' instead of Enter to close the polygon as an exclusion zone of the lane")
+        print("4. Press 'n' to move to the next lane (repeat for all 8 lanes)")
+        print("5. Press 'u' to undo the last point, 'r' to reset the polygon, 's' to export, 'q' to quit")
         print("\n")
         
         cv2.namedWindow("ROI Calibration")
@@ -172,6 +191,16 @@ class ROICalibrator:
             
             if key == ord('q'):
                 break
+            elif key in (13, 10):
+                self.close_polygon()
+            elif key == ord('x'):
+                self.close_polygon(exclude=True)
+            elif key == ord('n'):
+                self.next_lane()
+            elif key == ord('u') and self.current_roi:
+                self.current_roi.pop()
+            elif key == ord('s'):
+                self.export_rois()
             elif key == ord('r'):
                 self.current_roi = []
                 print("Current ROI reset")
@@ -85,7 +85,7 @@ def test_full_pipeline():
                 
                 smoothed_counts = vehicle_counter.update(raw_counts)
                 
-                obs_dict = obs_builder.build_observation(smoothed_counts)
+                obs_dict = obs_builder.build_observation(smoothed_counts, raw_counts=raw_counts)
                 
                 logger.info(f"Frame {i}: Detected {len(detections)} vehicles, counts={raw_counts}")
         
@@ -6,5 +6,11 @@ Builds observations for RL agent from camera detections
 from .vehicle_counter import VehicleCounter
 from .observation_builder import ObservationBuilder
 from .state_manager import StateManager
+from .lane_features import LaneFeatureExtractor
+from .stop_line_counter import StopLineCounter
+from .sim_clock import SimClock, WallClock, create_clock
+from .reward import RewardCalculator
+from .metrics_history import MetricsHistory
 
-__all__ = ['VehicleCounter', 'ObservationBuilder', 'StateManager']
+__all__ = ['VehicleCounter', 'ObservationBuilder', 'StateManager', 'LaneFeatureExtractor', 'StopLineCounter',
+           'SimClock', 'WallClock', 'create_clock', 'RewardCalculator', 'MetricsHistory']
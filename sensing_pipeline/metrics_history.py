@@ -0,0 +1,255 @@
+"""
+Metrics History - Fixed-memory time-series store
+Every series is kept at several resolutions: raw per-record samples and
+bucket means (e.g. per second and per minute), each in a preallocated numpy
+ring, so memory stays bounded however long the process runs
+"""
+
+import base64
+import fnmatch
+import numpy as np
+from typing import Dict, List, Optional, Union
+from loguru import logger
+
+
+DEFAULT_RESOLUTIONS = [
+    {'name': 'tick', 'interval': 0.0, 'capacity': 3600},
+    {'name': 'second', 'interval': 1.0, 'capacity': 3600},
+    {'name': 'minute', 'interval': 60.0, 'capacity': 1440}
+]
+
+
+class SeriesRing:
+    """Ring buffer of timestamped samples of one series at one resolution"""
+    
+    def __init__(self, capacity: int, width: int):
+        """
+        Initialize ring
+        
+        Args:
+            capacity: Samples kept (older ones are overwritten)
+            width: Values per sample (e.g. num_lanes)
+        """
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, width), dtype=np.float32)
+        self.cursor = 0
+        self.size = 0
+    
+    def append(self, timestamp: float, values: np.ndarray):
+        """Store one sample, overwriting the oldest when full"""
+        self.timestamps[self.cursor] = timestamp
+        self.values[self.cursor] = values
+        self.cursor = (self.cursor + 1) % len(self.timestamps)
+        self.size = min(self.size + 1, len(self.timestamps))
+    
+    def ordered(self):
+        """
+        Samples in insertion order
+        
+        Returns:
+            (N,) timestamps and (N, width) values
+        """
+        if self.size < len(self.timestamps):
+            return self.timestamps[:self.size], self.values[:self.size]
+        order = np.roll(np.arange(self.size), -self.cursor)
+        return self.timestamps[order], self.values[order]
+    
+    def oldest(self) -> Optional[float]:
+        """Timestamp of the oldest retained sample"""
+        if self.size == 0:
+            return None
+        return float(self.timestamps[self.cursor if self.size == len(self.timestamps) else 0])
+
+
+class MetricsHistory:
+    """Time series of step metrics at several resolutions"""
+    
+    def __init__(self, resolutions: Optional[List[Dict]] = None, max_series: int = 64):
+        """
+        Initialize store
+        
+        Args:
+            resolutions: Resolutions, finest first: {'name', 'interval' (seconds,
+                0 = every record), 'capacity' (samples kept)}
+            max_series: Series accepted; records of further names are dropped
+        """
+        self.resolutions = sorted(resolutions or DEFAULT_RESOLUTIONS, key=lambda r: r['interval'])
+        self.max_series = max_series
+        self.rings: Dict[str, List[SeriesRing]] = {}
+        # Per series and bucketed resolution: [bucket index, value sum, sample count]
+        self._buckets: Dict[str, List[list]] = {}
+        self.dropped = 0
+        
+        logger.info(
+            "Metrics history initialized: "
+            + ", ".join(f"{r['name']} x{r['capacity']}" for r in self.resolutions)
+        )
+    
+    def record(self, timestamp: float, values: Dict[str, Union[float, np.ndarray]]):
+        """
+        Record one sample of several series
+        
+        Args:
+            timestamp: Sample time in seconds
+            values: Series name -> scalar or (width,) values; a sample of another
+                width than the series' earlier ones (e.g. after the lane ROIs were
+                regenerated) restarts that series
+        """
+        for name, value in values.items():
+            value = np.asarray(value, dtype=np.float32).reshape(-1)
+            if name not in self.rings and not self._add_series(name, len(value)):
+                continue
+            rings = self.rings[name]
+            if len(value) != rings[0].values.shape[1]:
+                logger.warning(
+                    f"Series '{name}' changed width from {rings[0].values.shape[1]} to {len(value)} - restarting its history"
+                )
+                self._allocate_series(name, len(value))
+                rings = self.rings[name]
+                
+            for resolution, ring, bucket in zip(self.resolutions, rings, self._buckets[name]):
+                if resolution['interval'] <= 0:
+                    ring.append(timestamp, value)
+                    continue
+                index = int(np.floor(timestamp / resolution['interval']))
+                if bucket[0] != index:
+                    if bucket[2]:
+                        ring.append(bucket[0] * resolution['interval'], bucket[1] / bucket[2])
+                    bucket[0] = index
+                    bucket[1][:] = 0.0
+                    bucket[2] = 0
+                bucket[1] += value
+                bucket[2] += 1
+    
+    def _add_series(self, name: str, width: int) -> bool:
+        """Allocate the rings of a new series (False when max_series is reached)"""
+        if len(self.rings) >= self.max_series:
+            if self.dropped == 0:
+                logger.warning(f"Metrics history holds {self.max_series} series - dropping '{name}' and further new ones")
+            self.dropped += 1
+            return False
+        self._allocate_series(name, width)
+        return True
+    
+    def _allocate_series(self, name: str, width: int):
+        """(Re)allocate empty rings and buckets of a series"""
+        self.rings[name] = [SeriesRing(r['capacity'], width) for r in self.resolutions]
+        self._buckets[name] = [[None, np.zeros(width, dtype=np.float64), 0] for _ in self.resolutions]
+    
+    def series_names(self, patterns: Optional[List[str]] = None) -> List[str]:
+        """
+        Recorded series matching name patterns
+        
+        Args:
+            patterns: Names or shell-style patterns (e.g. 'latency.*'); None = all
+            
+        Returns:
+            Matching series names, in recording order
+        """
+        if not patterns:
+            return list(self.rings)
+        return [name for name in self.rings if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+    
+    def _samples(self, name: str, level: int):
+        """Samples of a series at a resolution, including the open bucket's running mean"""
+        timestamps, values = self.rings[name][level].ordered()
+        resolution = self.resolutions[level]
+        index, total, count = self._buckets[name][level]
+        if resolution['interval'] > 0 and count:
+            timestamps = np.append(timestamps, index * resolution['interval'])
+            values = np.vstack([values, (total / count)[None].astype(np.float32)])
+        return timestamps, values
+    
+    def _select_level(self, names: List[str], start: Optional[float], step: Optional[float]) -> int:
+        """Coarsest resolution whose interval does not exceed step, else the finest one reaching back to start"""
+        if step:
+            return max(i for i, r in enumerate(self.resolutions) if r['interval'] <= step or i == 0)
+        if start is None:
+            return 0
+        for level in range(len(self.resolutions)):
+            oldest = [self.rings[name][level].oldest() for name in names]
+            if all(t is not None and t <= start for t in oldest):
+                return level
+        return len(self.resolutions) - 1
+    
+    def query(
+        self,
+        patterns: Optional[List[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        step: Optional[float] = None,
+        encoding: str = "json"
+    ) -> Dict:
+        """
+        Read series in a time range, optionally downsampled
+        
+        Args:
+            patterns: Series names or patterns (None = all)
+            start: Earliest timestamp (inclusive)
+            end: Latest timestamp (inclusive)
+            step: Bucket size in seconds; samples are averaged per bucket and
+                stamped with the bucket start
+            encoding: 'json' (lists) or 'base64' (little-endian float64
+                timestamps, float32 values, one column per value index)
+                
+        Returns:
+            Dictionary with the resolution used, the step and per series its
+            width, timestamps and columns (one per value index)
+        """
+        if encoding not in ("json", "base64"):
+            raise ValueError(f"Unknown encoding '{encoding}', expected 'json' or 'base64'")
+        names = self.series_names(patterns)
+        level = self._select_level(names, start, step) if names else 0
+        
+        result = {}
+        for name in names:
+            timestamps, values = self._samples(name, level)
+            keep = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps <= end
+            timestamps, values = timestamps[keep], values[keep]
+            if step and len(timestamps):
+                buckets, inverse = np.unique(np.floor(timestamps / step), return_inverse=True)
+                sums = np.zeros((len(buckets), values.shape[1]), dtype=np.float64)
+                np.add.at(sums, inverse, values)
+                values = (sums / np.bincount(inverse)[:, None]).astype(np.float32)
+                timestamps = buckets * step
+                
+            columns = np.ascontiguousarray(values.T)
+            if encoding == "base64":
+                result[name] = {
+                    'width': columns.shape[0],
+                    'length': columns.shape[1],
+                    'timestamps': base64.b64encode(timestamps.astype('<f8').tobytes()).decode('ascii'),
+                    'columns': [base64.b64encode(column.astype('<f4').tobytes()).decode('ascii') for column in columns]
+                }
+            else:
+                result[name] = {
+                    'width': columns.shape[0],
+                    'length': columns.shape[1],
+                    'timestamps': timestamps.round(3).tolist(),
+                    'columns': columns.astype(np.float64).round(4).tolist()
+                }
+        return {
+            'resolution': self.resolutions[level]['name'],
+            'step': step,
+            'encoding': encoding,
+            'series': result
+        }
+    
+    def get_metrics(self) -> Dict:
+        """
+        Store size
+        
+        Returns:
+            Dictionary with series count, preallocated bytes, resolutions and dropped records
+        """
+        nbytes = sum(ring.timestamps.nbytes + ring.values.nbytes for rings in self.rings.values() for ring in rings)
+        return {
+            'series': len(self.rings),
+            'bytes': nbytes,
+            'resolutions': {r['name']: {'interval': r['interval'], 'capacity': r['capacity']} for r in self.resolutions},
+            'dropped_records': self.dropped
+        }
@@ -1,18 +1,97 @@
 """
 Observation Builder - Creates observation vectors for RL agent
 This is the critical interface with Team A's PPO agent
+
+The observation is a declared list of feature blocks (counts, lane feature
+channels, phase one-hot, phase elapsed time) written in place into a
+preallocated float32 frame; optional frame stacking keeps the last k frames in
+a double-written ring buffer so the stacked history is always a contiguous view
 """
 
 import numpy as np
 import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 from loguru import logger
 
+from .lane_features import FEATURE_CHANNELS
+
+
+# Feature block -> (size: 'lanes' | 'phases' | int, normalization scale parameter or constant)
+OBSERVATION_FEATURES = {
+    'counts': ('lanes', 'max_vehicles_per_lane'),
+    'queue_length': ('lanes', 'max_distance'),
+    'stopped': ('lanes', 'max_vehicles_per_lane'),
+    'moving': ('lanes', 'max_vehicles_per_lane'),
+    'nearest_distance': ('lanes', 'max_distance'),
+    'phase_one_hot': ('phases', 1.0),
+    'phase_elapsed': (1, 'max_phase_time'),
+}
+
+
+def observation_layout(
+    features: List[Union[str, Dict]],
+    num_lanes: int,
+    num_phases: int = 0,
+    max_vehicles_per_lane: float = 20.0,
+    max_distance: float = 60.0,
+    max_phase_time: float = 60.0
+) -> List[Dict]:
+    """
+    Resolve a feature list into the blocks of one observation frame
+    
+    Args:
+        features: Feature names (see OBSERVATION_FEATURES) or {name, scale} dicts,
+            in observation order
+        num_lanes: Number of lanes
+        num_phases: Number of traffic light phases (size of phase_one_hot)
+        max_vehicles_per_lane: Default scale of the count blocks
+        max_distance: Default scale of the distance blocks, meters
+        max_phase_time: Default scale of phase_elapsed, seconds
+        
+    Returns:
+        List of {name, offset, size, scale} in frame order
+    """
+    defaults = {
+        'max_vehicles_per_lane': max_vehicles_per_lane,
+        'max_distance': max_distance,
+        'max_phase_time': max_phase_time
+    }
+    sizes = {'lanes': num_lanes, 'phases': num_phases}
+    
+    layout = []
+    offset = 0
+    for feature in features:
+        spec = {'name': feature} if isinstance(feature, str) else dict(feature)
+        name = spec['name']
+        if name not in OBSERVATION_FEATURES:
+            raise ValueError(f"Unknown observation feature '{name}', expected one of {list(OBSERVATION_FEATURES)}")
+        if any(block['name'] == name for block in layout):
+            raise ValueError(f"Observation feature '{name}' is listed twice")
+        size, scale = OBSERVATION_FEATURES[name]
+        size = sizes.get(size, size)
+        if size == 0:
+            raise ValueError(f"Observation feature '{name}' needs num_phases")
+        scale = float(spec.get('scale', defaults.get(scale, scale)))
+        layout.append({'name': name, 'offset': offset, 'size': size, 'scale': scale})
+        offset += size
+    return layout
+
 
 class ObservationBuilder:
     """Builds standardized observations for reinforcement learning agent"""
     
-    def __init__(self, num_lanes: int, normalize: bool = True, max_vehicles_per_lane: int = 20):
+    def __init__(
+        self,
+        num_lanes: int,
+        normalize: bool = True,
+        max_vehicles_per_lane: int = 20,
+        feature_channels: Optional[List[str]] = None,
+        max_distance: float = 60.0,
+        features: Optional[List[Union[str, Dict]]] = None,
+        num_phases: int = 0,
+        max_phase_time: float = 60.0,
+        frame_stack: int = 1
+    ):
         """
         Initialize observation builder
         
@@ -20,24 +99,79 @@ class ObservationBuilder:
             num_lanes: Number of lanes (observation vector size)
             normalize: If True, normalize counts to [0, 1]
             max_vehicles_per_lane: Maximum expected vehicles per lane (for normalization)
+            feature_channels: Optional lane feature channels appended after the counts,
+                num_lanes values each (see LaneFeatureExtractor: queue_length, stopped,
+                moving, nearest_distance); ignored when features is given
+            max_distance: Normalization scale of the distance channels, meters
+            features: Feature blocks of a frame in order (see OBSERVATION_FEATURES);
+                defaults to counts followed by feature_channels
+            num_phases: Number of traffic light phases (for phase_one_hot)
+            max_phase_time: Normalization scale of phase_elapsed, seconds
+            frame_stack: Number of most recent frames in each observation (oldest first)
         """
         self.num_lanes = num_lanes
         self.normalize = normalize
         self.max_vehicles_per_lane = max_vehicles_per_lane
+        self.max_distance = max_distance
+        self.num_phases = num_phases
+        self.max_phase_time = max_phase_time
+        self.frame_stack = max(1, frame_stack)
+        
+        if features is None:
+            unknown = set(feature_channels or []) - set(FEATURE_CHANNELS)
+            if unknown:
+                raise ValueError(f"Unknown observation feature channels {sorted(unknown)}, expected {FEATURE_CHANNELS}")
+            features = ['counts'] + list(feature_channels or [])
+        self.layout = observation_layout(
+            features, num_lanes, num_phases, max_vehicles_per_lane, max_distance, max_phase_time
+        )
+        self.feature_channels = [block['name'] for block in self.layout if block['name'] in FEATURE_CHANNELS]
+        self.frame_size = sum(block['size'] for block in self.layout)
+        
+        # Every frame is written twice (rows i and i + k), so after writing slot i
+        # rows [i + 1, i + 1 + k) hold the last k frames in order as one contiguous block
+        self._frames = np.zeros((2 * self.frame_stack, self.frame_size), dtype=np.float32)
+        self._cursor = 0
         
         self.frame_id = 0
         self.last_observation: Optional[np.ndarray] = None
         self.last_timestamp: float = 0.0
         
-        logger.info(f"Observation builder initialized: {num_lanes} lanes, normalize={normalize}")
+        logger.info(
+            f"Observation builder initialized: {num_lanes} lanes, normalize={normalize}, "
+            f"features={[block['name'] for block in self.layout]}, frame_stack={self.frame_stack}"
+        )
+    
+    @property
+    def observation_size(self) -> int:
+        """Length of the (flattened) observation vector"""
+        return self.frame_size * self.frame_stack
     
-    def build_observation(self, vehicle_counts: np.ndarray, additional_features: Dict = None) -> Dict:
+    def build_observation(
+        self,
+        vehicle_counts: np.ndarray,
+        additional_features: Dict = None,
+        degraded: bool = False,
+        lane_features: Optional[Dict[str, np.ndarray]] = None,
+        raw_counts: Optional[np.ndarray] = None,
+        phase: Optional[int] = None,
+        phase_elapsed: float = 0.0
+    ) -> Dict:
         """
         Build observation dictionary for RL agent
         
         Args:
-            vehicle_counts: Vehicle counts per lane
+            vehicle_counts: Vehicle counts per lane (smoothed; what the agent observes)
             additional_features: Optional additional state features
+            degraded: True when the counts come from the fallback counter instead of YOLO
+            lane_features: Per-lane feature arrays for the configured feature channels
+                (missing channels are filled with zeros)
+            raw_counts: Unsmoothed counts of the current frame, reported as
+                integer 'raw_counts' (defaults to vehicle_counts); fractional
+                counts ('fractional' lane assignment) are rounded there and
+                reported unrounded as 'raw_counts_fractional'
+            phase: Current traffic light phase (phase_one_hot; None = all zeros)
+            phase_elapsed: Seconds since the current phase started (phase_elapsed)
             
         Returns:
             Observation dictionary with standardized format
@@ -45,42 +179,94 @@ class ObservationBuilder:
         if len(vehicle_counts) != self.num_lanes:
             logger.error(f"Invalid vehicle counts size: expected {self.num_lanes}, got {len(vehicle_counts)}")
             vehicle_counts = np.zeros(self.num_lanes, dtype=np.float32)
+        lane_features = lane_features or {}
         
-        observation = vehicle_counts.astype(np.float32)
-        
-        if self.normalize:
-            observation = np.clip(observation / self.max_vehicles_per_lane, 0.0, 1.0)
+        frame = self._frames[self._cursor + self.frame_stack]
+        for block in self.layout:
+            out = frame[block['offset']:block['offset'] + block['size']]
+            name = block['name']
+            if name == 'counts':
+                out[:] = vehicle_counts
+            elif name == 'phase_one_hot':
+                out[:] = 0.0
+                if phase is not None and 0 <= phase < block['size']:
+                    out[phase] = 1.0
+            elif name == 'phase_elapsed':
+                out[0] = phase_elapsed
+            else:
+                out[:] = lane_features.get(name, 0.0)
+            if self.normalize:
+                np.divide(out, block['scale'], out=out)
+                np.clip(out, 0.0, 1.0, out=out)
+                
+        if self.frame_id == 0:
+            self._frames[:] = frame  # first frame of an episode fills the whole history
+        else:
+            self._frames[self._cursor] = frame
+        self._cursor = (self._cursor + 1) % self.frame_stack
+        observation = self.get_stacked().reshape(-1)
         
         self.last_observation = observation
         self.last_timestamp = time.time()
         self.frame_id += 1
         
+        raw = np.asarray(vehicle_counts if raw_counts is None else raw_counts)
         obs_dict = {
             'observation': observation.tolist(),
             'frame_id': self.frame_id,
             'timestamp': self.last_timestamp,
             'num_lanes': self.num_lanes,
-            'raw_counts': vehicle_counts.tolist()
+            'raw_counts': np.rint(raw).astype(np.int64).tolist(),
+            'degraded': degraded
         }
+        if raw_counts is not None and not np.issubdtype(raw.dtype, np.integer):
+            obs_dict['raw_counts_fractional'] = raw.astype(np.float32).tolist()
         
+        if self.feature_channels:
+            obs_dict['lane_features'] = {
+                name: np.asarray(lane_features.get(name, np.zeros(self.num_lanes))).tolist()
+                for name in self.feature_channels
+            }
+            
         if additional_features:
             obs_dict['additional_features'] = additional_features
-        
+            
         return obs_dict
     
+    def get_stacked(self) -> np.ndarray:
+        """
+        The last frame_stack frames, oldest first
+        
+        Returns:
+            (frame_stack, frame_size) view into the ring buffer (overwritten by the
+            next build_observation; copy it to keep it)
+        """
+        return self._frames[self._cursor:self._cursor + self.frame_stack]
+    
     def get_observation_space_info(self) -> Dict:
         """
         Get information about observation space for RL agent configuration
         
         Returns:
-            Dictionary with observation space specifications
+            Dictionary with observation space specifications; 'schema' lists the
+            feature blocks of one frame with their offsets, sizes and scales
         """
+        names = [block['name'] for block in self.layout]
+        description = 'Vehicle counts per lane (normalized)' if self.normalize else 'Vehicle counts per lane'
+        if names != ['counts']:
+            description = 'Feature blocks ' + ', '.join(names) + (' (normalized)' if self.normalize else '')
+        if self.frame_stack > 1:
+            description += f', last {self.frame_stack} frames (oldest first)'
         return {
-            'shape': (self.num_lanes,),
+            'shape': (self.observation_size,),
             'dtype': 'float32',
             'low': 0.0,
-            'high': 1.0 if self.normalize else float(self.max_vehicles_per_lane),
-            'description': 'Vehicle counts per lane (normalized)' if self.normalize else 'Vehicle counts per lane'
+            'high': 1.0 if self.normalize else float(max(self.max_vehicles_per_lane, self.max_distance, self.max_phase_time)),
+            'description': description,
+            'channels': names,
+            'frame_size': self.frame_size,
+            'frame_stack': self.frame_stack,
+            'schema': [dict(block) for block in self.layout]
         }
     
     def validate_observation(self, observation: np.ndarray) -> bool:
@@ -96,20 +282,22 @@ class ObservationBuilder:
         if not isinstance(observation, np.ndarray):
             logger.error("Observation must be numpy array")
             return False
-        
-        if observation.shape != (self.num_lanes,):
-            logger.error(f"Invalid shape: expected ({self.num_lanes},), got {observation.shape}")
+            
+        if observation.shape != (self.observation_size,):
+            logger.error(f"Invalid shape: expected ({self.observation_size},), got {observation.shape}")
             return False
-        
+            
         if self.normalize:
             if np.any(observation < 0) or np.any(observation > 1):
                 logger.error("Normalized observation must be in [0, 1]")
                 return False
-        
+                
         return True
     
     def reset(self):
         """Reset observation builder state"""
+        self._frames[:] = 0.0
+        self._cursor = 0
         self.frame_id = 0
         self.last_observation = None
         self.last_timestamp = 0.0
@@ -118,15 +306,19 @@ class ObservationBuilder:
 
 if __name__ == "__main__":
     # Test observation builder
-    builder = ObservationBuilder(num_lanes=8, normalize=True)
+    builder = ObservationBuilder(
+        num_lanes=8, normalize=True,
+        features=['counts', 'phase_one_hot', 'phase_elapsed'], num_phases=5, frame_stack=3
+    )
     
     test_counts = np.array([3, 5, 2, 4, 1, 0, 3, 2])
     
-    obs_dict = builder.build_observation(test_counts)
-    
+    for step in range(3):
+        obs_dict = builder.build_observation(test_counts + step, phase=step, phase_elapsed=10.0 * step)
+        
     print("Observation:")
     print(f"  Raw counts: {obs_dict['raw_counts']}")
-    print(f"  Normalized: {obs_dict['observation']}")
+    print(f"  Stacked frames:\n{builder.get_stacked()}")
     print(f"  Frame ID: {obs_dict['frame_id']}")
     print(f"  Timestamp: {obs_dict['timestamp']}")
     
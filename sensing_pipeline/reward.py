@@ -0,0 +1,129 @@
+"""
+Reward Calculator - Weighted sum of built-in reward components
+Components are raw per-step measurements computed over all lanes at once;
+the reward is the sum of each component times its configured weight (negative
+weights penalize), so e.g. {queue: -0.1, phase_switch: -1.0} reproduces a
+queue-plus-switching-cost reward without any client-side code
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+REWARD_COMPONENTS = ('queue', 'pressure', 'waiting_time', 'throughput', 'phase_switch')
+
+
+def green_lane_mask(phases: List[Dict], num_lanes: int) -> np.ndarray:
+    """
+    Green lanes of every phase as a matrix
+    
+    Args:
+        phases: Phase configurations with 'green_lanes'
+        num_lanes: Number of lanes
+        
+    Returns:
+        (num_phases, num_lanes) float32 mask, 1 where the lane is green
+    """
+    mask = np.zeros((len(phases), num_lanes), dtype=np.float32)
+    for index, phase in enumerate(phases):
+        lanes = [lane for lane in phase.get('green_lanes', []) if 0 <= lane < num_lanes]
+        mask[index, lanes] = 1.0
+    return mask
+
+
+class RewardCalculator:
+    """Computes the per-step reward and keeps its components for analysis"""
+    
+    def __init__(self, num_lanes: int, phases: List[Dict], weights: Optional[Dict[str, float]] = None):
+        """
+        Initialize reward calculator
+        
+        Args:
+            num_lanes: Number of lanes
+            phases: Phase configurations with 'green_lanes' (for pressure)
+            weights: Component name -> weight; components without a weight are
+                still computed and recorded but do not contribute
+        """
+        weights = weights or {'queue': -0.1}
+        unknown = sorted(set(weights) - set(REWARD_COMPONENTS))
+        if unknown:
+            raise ValueError(f"Unknown reward components {unknown}, expected some of {list(REWARD_COMPONENTS)}")
+            
+        self.num_lanes = num_lanes
+        self.weights = np.array([weights.get(name, 0.0) for name in REWARD_COMPONENTS], dtype=np.float64)
+        # Pressure sign per phase and lane: +1 for vehicles held at red, -1 for those being served
+        self.pressure_signs = 1.0 - 2.0 * green_lane_mask(phases, num_lanes)
+        
+        self.reset()
+        
+        active = {name: weight for name, weight in zip(REWARD_COMPONENTS, self.weights) if weight}
+        logger.info(f"Reward calculator initialized: {active}")
+    
+    def compute(
+        self,
+        queue: np.ndarray,
+        phase: int,
+        waiting_time: float = 0.0,
+        vehicles_served: int = 0
+    ) -> Dict:
+        """
+        Compute the reward of one step
+        
+        Args:
+            queue: (num_lanes,) queued vehicles per lane (stopped vehicles when
+                lane features are available, otherwise the vehicle counts)
+            phase: Phase active during the step
+            waiting_time: Vehicle-seconds spent stopped during the step
+            vehicles_served: Vehicles that left the intersection during the step
+            
+        Returns:
+            Dictionary with 'reward' and 'components' (raw component values)
+        """
+        queue = np.asarray(queue, dtype=np.float32).reshape(-1)[:self.num_lanes]
+        pressure = float(queue @ self.pressure_signs[phase]) if 0 <= phase < len(self.pressure_signs) else 0.0
+        switched = self._last_phase is not None and phase != self._last_phase
+        self._last_phase = phase
+        
+        values = np.array([
+            float(queue.sum()),
+            pressure,
+            float(waiting_time),
+            float(vehicles_served),
+            float(switched)
+        ])
+        reward = float(values @ self.weights)
+        
+        self.last_values = values
+        self.last_reward = reward
+        self.episode_values += values
+        self.episode_reward += reward
+        self.steps += 1
+        return {'reward': reward, 'components': dict(zip(REWARD_COMPONENTS, values.tolist()))}
+    
+    def get_metrics(self) -> Dict:
+        """
+        Reward statistics of the current episode
+        
+        Returns:
+            Dictionary with the last and episode rewards, the weights and the
+            episode totals and weighted contributions of every component
+        """
+        return {
+            'steps': self.steps,
+            'last_reward': self.last_reward,
+            'episode_reward': self.episode_reward,
+            'mean_reward': self.episode_reward / max(1, self.steps),
+            'weights': dict(zip(REWARD_COMPONENTS, self.weights.tolist())),
+            'episode_components': dict(zip(REWARD_COMPONENTS, self.episode_values.tolist())),
+            'episode_contributions': dict(zip(REWARD_COMPONENTS, (self.episode_values * self.weights).tolist()))
+        }
+    
+    def reset(self):
+        """Reset episode totals and the phase-switch reference"""
+        self._last_phase: Optional[int] = None
+        self.last_values = np.zeros(len(REWARD_COMPONENTS))
+        self.last_reward = 0.0
+        self.episode_values = np.zeros(len(REWARD_COMPONENTS))
+        self.episode_reward = 0.0
+        self.steps = 0
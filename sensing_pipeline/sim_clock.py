@@ -0,0 +1,120 @@
+"""
+Simulation Clock - Time source for phase timing and episode metrics
+SimClock follows the CARLA world snapshot (simulated seconds and frame), so
+phase timing does not depend on wall-clock speed or API latency; WallClock
+keeps the old time.time() behaviour
+"""
+
+import time
+from typing import Dict, Optional
+from loguru import logger
+
+
+class WallClock:
+    """Wall-clock time (seconds since the epoch)"""
+    
+    frame: Optional[int] = None
+    
+    def now(self) -> float:
+        """Current time in seconds"""
+        return time.time()
+
+
+class SimClock:
+    """Simulated time, advanced from CARLA world snapshots"""
+    
+    def __init__(self):
+        """Initialize clock at simulation time 0 (before the first snapshot)"""
+        self.elapsed_seconds = 0.0
+        self.frame: Optional[int] = None
+        self.ticks = 0
+        
+        # Throughput window: simulated vs. wall seconds since the first sync after a restart
+        self._wall_start: Optional[float] = None
+        self._sim_start = 0.0
+        self._window_ticks = 0
+    
+    def sync(self, snapshot) -> float:
+        """
+        Advance to a world snapshot
+        
+        Args:
+            snapshot: carla.WorldSnapshot (e.g. world.get_snapshot() after a tick)
+            
+        Returns:
+            Simulation time in seconds
+        """
+        return self.advance(snapshot.timestamp.elapsed_seconds, snapshot.frame)
+    
+    def advance(self, elapsed_seconds: float, frame: Optional[int] = None) -> float:
+        """
+        Advance to a simulation timestamp
+        
+        Args:
+            elapsed_seconds: Simulated seconds since the simulation started
+            frame: Simulation frame number
+            
+        Returns:
+            Simulation time in seconds
+        """
+        if elapsed_seconds < self.elapsed_seconds:
+            logger.warning(
+                f"Simulation time went back ({self.elapsed_seconds:.3f}s -> {elapsed_seconds:.3f}s), world reloaded?"
+            )
+            self._wall_start = None
+        if self._wall_start is None:
+            self._wall_start = time.perf_counter()
+            self._sim_start = float(elapsed_seconds)
+            self._window_ticks = 0
+            
+        self.elapsed_seconds = float(elapsed_seconds)
+        self.frame = frame
+        self.ticks += 1
+        self._window_ticks += 1
+        return self.elapsed_seconds
+    
+    def now(self) -> float:
+        """Current simulation time in seconds"""
+        return self.elapsed_seconds
+    
+    def restart_measurement(self):
+        """Start a new throughput window at the next sync (e.g. on episode reset)"""
+        self._wall_start = None
+    
+    def get_metrics(self) -> Dict:
+        """
+        Simulation progress and throughput
+        
+        Returns:
+            Dictionary with sim_time, frame, ticks and, over the current window,
+            sim_seconds, wall_seconds, ticks_per_second and realtime_factor
+            (simulated seconds per wall-clock second)
+        """
+        wall = time.perf_counter() - self._wall_start if self._wall_start is not None else 0.0
+        sim = self.elapsed_seconds - self._sim_start if self._wall_start is not None else 0.0
+        return {
+            'sim_time': self.elapsed_seconds,
+            'frame': self.frame,
+            'ticks': self.ticks,
+            'sim_seconds': sim,
+            'wall_seconds': wall,
+            'ticks_per_second': self._window_ticks / wall if wall > 0 else 0.0,
+            'realtime_factor': sim / wall if wall > 0 else 0.0
+        }
+
+
+def create_clock(kind: str = "simulation"):
+    """
+    Create the clock used for phase timing
+    
+    Args:
+        kind: 'simulation' (SimClock, needs syncing after every tick) or 'wall'
+        
+    Returns:
+        SimClock or WallClock
+    """
+    if kind == "simulation":
+        return SimClock()
+    if kind == "wall":
+        return WallClock()
+    raise ValueError(f"Unknown clock '{kind}', expected 'simulation' or 'wall'")
@@ -2,35 +2,39 @@
 State Manager - Manages overall intersection state
 """
 
-import time
 import numpy as np
 from typing import Dict, Optional
 from loguru import logger
 
+from .sim_clock import WallClock
+
 
 class StateManager:
     """Manages the complete state of the intersection system"""
     
-    def __init__(self, num_lanes: int, num_phases: int):
+    def __init__(self, num_lanes: int, num_phases: int, clock=None):
         """
         Initialize state manager
         
         Args:
             num_lanes: Number of lanes
             num_phases: Number of traffic light phases
+            clock: Time source with now() in seconds (SimClock for simulated time);
+                defaults to wall-clock time
         """
         self.num_lanes = num_lanes
         self.num_phases = num_phases
+        self.clock = clock if clock is not None else WallClock()
         
         self.current_phase: int = 0
         self.phase_start_time: float = 0.0
         self.phase_duration: float = 0.0
         
-        self.vehicle_counts: np.ndarray = np.zeros(num_lanes, dtype=np.int32)
+        self.vehicle_counts: np.ndarray = np.zeros(num_lanes, dtype=np.float32)
         self.total_vehicles_served: int = 0
         self.total_waiting_time: float = 0.0
         
-        self.episode_start_time: float = time.time()
+        self.episode_start_time: float = self.clock.now()
         self.step_count: int = 0
         
         logger.info(f"State manager initialized: {num_lanes} lanes, {num_phases} phases")
@@ -46,12 +50,23 @@ class StateManager:
         self.vehicle_counts = vehicle_counts
         
         if current_phase != self.current_phase:
-            self.phase_start_time = time.time()
+            self.phase_start_time = self.clock.now()
             self.current_phase = current_phase
             logger.info(f"Phase changed to {current_phase}")
         
         self.step_count += 1
     
+    def record_traffic(self, vehicles_served: int, waiting_time: float):
+        """
+        Accumulate tracked throughput and waiting time
+        
+        Args:
+            vehicles_served: Vehicles that left the intersection since the last call
+            waiting_time: Vehicle-seconds spent stopped since the last call
+        """
+        self.total_vehicles_served += vehicles_served
+        self.total_waiting_time += waiting_time
+    
     def set_phase(self, phase_id: int, duration: float = 30.0):
         """
         Set traffic light phase
@@ -66,13 +81,13 @@ class StateManager:
         
         self.current_phase = phase_id
         self.phase_duration = duration
-        self.phase_start_time = time.time()
+        self.phase_start_time = self.clock.now()
         
         logger.info(f"Phase set to {phase_id} for {duration}s")
     
     def get_phase_elapsed_time(self) -> float:
         """Get time elapsed in current phase"""
-        return time.time() - self.phase_start_time
+        return self.clock.now() - self.phase_start_time
     
     def should_change_phase(self) -> bool:
         """Check if current phase duration has expired"""
@@ -86,13 +101,13 @@ class StateManager:
             State dictionary
         """
         return {
-            'vehicle_counts': self.vehicle_counts.tolist(),
+            'vehicle_counts': np.asarray(self.vehicle_counts, dtype=np.float32).tolist(),
             'current_phase': self.current_phase,
             'phase_elapsed_time': self.get_phase_elapsed_time(),
             'phase_duration': self.phase_duration,
             'step_count': self.step_count,
-            'total_vehicles': int(np.sum(self.vehicle_counts)),
-            'episode_runtime': time.time() - self.episode_start_time
+            'total_vehicles': int(round(float(np.sum(self.vehicle_counts)))),
+            'episode_runtime': self.clock.now() - self.episode_start_time
         }
     
     def get_metrics(self) -> Dict:
@@ -107,18 +122,18 @@ class StateManager:
             'total_waiting_time': self.total_waiting_time,
             'average_waiting_time': self.total_waiting_time / max(1, self.total_vehicles_served),
             'steps': self.step_count,
-            'runtime': time.time() - self.episode_start_time
+            'runtime': self.clock.now() - self.episode_start_time
         }
     
     def reset(self):
         """Reset state for new episode"""
         self.current_phase = 0
-        self.phase_start_time = time.time()
+        self.phase_start_time = self.clock.now()
         self.phase_duration = 0.0
-        self.vehicle_counts = np.zeros(self.num_lanes, dtype=np.int32)
+        self.vehicle_counts = np.zeros(self.num_lanes, dtype=np.float32)
         self.total_vehicles_served = 0
         self.total_waiting_time = 0.0
-        self.episode_start_time = time.time()
+        self.episode_start_time = self.clock.now()
         self.step_count = 0
         
         logger.info("State manager reset")
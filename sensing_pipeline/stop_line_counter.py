@@ -0,0 +1,163 @@
+"""
+Stop Line Counter - Virtual stop-line crossing counts per lane
+Every tracked vehicle's movement since its previous observation is tested
+against all stop-line segments at once; a track is counted the first time it
+crosses a stop line, for the lane that stop line belongs to
+"""
+
+import numpy as np
+from typing import List, Dict
+from loguru import logger
+
+from .lane_features import stop_line_segments
+
+
+def segments_cross(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    line_starts: np.ndarray,
+    line_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Which movement segments cross which line segments
+    
+    Touching a line counts on one side only, so a vehicle that stops exactly
+    on the line and then drives on is counted once.
+    
+    Args:
+        starts: (T, 2) movement start points
+        ends: (T, 2) movement end points
+        line_starts: (S, 2) line segment start points
+        line_ends: (S, 2) line segment end points
+        
+    Returns:
+        (T, S) boolean crossing matrix
+    """
+    def cross(a, b):
+        return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+        
+    line = (line_ends - line_starts)[None, :, :]
+    move = (ends - starts)[:, None, :]
+    # Sides of the line the movement ends lie on, and sides of the movement the line ends lie on
+    side_start = cross(line, starts[:, None, :] - line_starts[None]) > 0
+    side_end = cross(line, ends[:, None, :] - line_starts[None]) > 0
+    side_a = cross(move, line_starts[None] - starts[:, None, :]) > 0
+    side_b = cross(move, line_ends[None] - starts[:, None, :]) > 0
+    return (side_start != side_end) & (side_a != side_b)
+
+
+class StopLineCounter:
+    """Counts vehicles discharged over each lane's stop line, per step, phase and episode"""
+    
+    def __init__(self, lane_configs: List[Dict], max_gap: int = 5):
+        """
+        Initialize counter
+        
+        Args:
+            lane_configs: Lane configurations with 'stop_line_world' or 'stop_line'
+                segments in world meters (see stop_line_segments)
+            max_gap: Updates a track may go unseen and still be tested against
+                the position it was last seen at
+        """
+        self.num_lanes = len(lane_configs)
+        self.max_gap = max_gap
+        
+        self.set_lanes(lane_configs)
+        self.reset()
+        
+        logger.info(f"Stop line counter initialized: {self.num_lanes} lanes, {len(self.segment_lanes)} stop lines")
+    
+    def set_lanes(self, lane_configs: List[Dict]):
+        """(Re)load the stop-line segments of every lane"""
+        self.segment_starts, self.segment_ends, self.segment_lanes = stop_line_segments(lane_configs)
+        missing = sorted(set(range(self.num_lanes)) - set(self.segment_lanes.tolist()))
+        if missing:
+            logger.warning(f"Lanes {missing} have no stop line - their crossings are not counted")
+    
+    def update(self, track_ids: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """
+        Count the stop-line crossings of one observation
+        
+        Args:
+            track_ids: (N,) track id of every detection (-1 = untracked, ignored)
+            positions: (N, 2) world XY of the detections in meters (NaN rows are ignored)
+            
+        Returns:
+            (num_lanes,) vehicles that crossed each lane's stop line in this update
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        valid = (track_ids >= 0) & ~np.isnan(positions).any(axis=1)
+        ids, points = track_ids[valid], positions[valid]
+        ids, first = np.unique(ids, return_index=True)
+        points = points[first]
+        
+        crossings = np.zeros(self.num_lanes, dtype=np.int64)
+        self.last_crossed_ids = np.zeros(0, dtype=np.int64)
+        _, current, previous = np.intersect1d(ids, self._ids, assume_unique=True, return_indices=True)
+        if len(current) and len(self.segment_lanes):
+            fresh = ~np.isin(ids[current], self._counted, assume_unique=True)
+            current, previous = current[fresh], previous[fresh]
+            hits = segments_cross(
+                self._points[previous], points[current], self.segment_starts, self.segment_ends
+            )
+            crossed = hits.any(axis=1)
+            lanes = self.segment_lanes[hits[crossed].argmax(axis=1)]
+            crossings = np.bincount(lanes, minlength=self.num_lanes)[:self.num_lanes].astype(np.int64)
+            self.last_crossed_ids = ids[current[crossed]]
+            self._counted = np.union1d(self._counted, self.last_crossed_ids)
+            
+        # Remember the latest position of every track; unseen ones age out after max_gap updates
+        self._ages += 1
+        keep = ~np.isin(self._ids, ids, assume_unique=True) & (self._ages <= self.max_gap)
+        self._ids = np.concatenate([self._ids[keep], ids])
+        self._points = np.concatenate([self._points[keep], points])
+        self._ages = np.concatenate([self._ages[keep], np.zeros(len(ids), dtype=np.int64)])
+        order = np.argsort(self._ids)
+        self._ids, self._points, self._ages = self._ids[order], self._points[order], self._ages[order]
+        
+        self.step_counts = crossings
+        self.phase_counts += crossings
+        self.episode_counts += crossings
+        return crossings
+    
+    def start_phase(self):
+        """Start accumulating a new phase's counts"""
+        self.phase_counts = np.zeros(self.num_lanes, dtype=np.int64)
+    
+    def get_counts(self) -> Dict[str, List[int]]:
+        """
+        Crossing counts per lane
+        
+        Returns:
+            Dictionary with 'step' (last update), 'phase' (since the current phase
+            started) and 'episode' lists
+        """
+        return {
+            'step': self.step_counts.tolist(),
+            'phase': self.phase_counts.tolist(),
+            'episode': self.episode_counts.tolist()
+        }
+    
+    def reset(self):
+        """Forget tracks and counts (e.g. on episode reset)"""
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._points = np.zeros((0, 2), dtype=np.float64)
+        self._ages = np.zeros(0, dtype=np.int64)
+        self._counted = np.zeros(0, dtype=np.int64)
+        self.last_crossed_ids = np.zeros(0, dtype=np.int64)  # tracks that crossed in the last update
+        self.step_counts = np.zeros(self.num_lanes, dtype=np.int64)
+        self.phase_counts = np.zeros(self.num_lanes, dtype=np.int64)
+        self.episode_counts = np.zeros(self.num_lanes, dtype=np.int64)
+
+
+if __name__ == "__main__":
+    # Test stop line counter: two vehicles drive through lane 0's stop line (x = 0)
+    counter = StopLineCounter([
+        {'id': 0, 'stop_line': [[0.0, -2.0], [0.0, 2.0]]},
+        {'id': 1, 'stop_line': [[0.0, 3.0], [0.0, 7.0]]},
+    ])
+    for step, x in enumerate([6.0, 2.0, -2.0, -6.0]):
+        counts = counter.update(np.array([1, 2]), np.array([[x, 0.0], [x + 3.0, 1.0]]))
+        print(f"step {step}: {counts.tolist()}")
+    print(counter.get_counts())
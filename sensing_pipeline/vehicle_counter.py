@@ -1,102 +1,169 @@
 """
 Vehicle Counter - Maintains vehicle counts per lane
+Raw counts go into one (window, num_lanes) ring buffer and are smoothed for all
+lanes at once, so the cost of an update does not depend on how counts arrived
 """
 
 import numpy as np
-from typing import Dict, List
-from collections import deque
+from typing import Dict
 from loguru import logger
 
 
+SMOOTHING_FILTERS = ("mean", "median", "ema", "kalman")
+
+
 class VehicleCounter:
     """Counts and tracks vehicles per lane with temporal smoothing"""
     
-    def __init__(self, num_lanes: int, smoothing_window: int = 3):
+    def __init__(
+        self,
+        num_lanes: int,
+        smoothing_window: int = 3,
+        smoothing_filter: str = "mean",
+        ema_alpha: float = 0.5,
+        process_noise: float = 0.5,
+        measurement_noise: float = 1.0
+    ):
         """
         Initialize vehicle counter
         
         Args:
             num_lanes: Number of lanes to track
-            smoothing_window: Number of frames to average for smoothing
+            smoothing_window: Number of frames kept in the history (mean/median window)
+            smoothing_filter: 'mean' (moving average), 'median' (moving median),
+                'ema' (exponential moving average) or 'kalman' (per-lane 1-D random-walk
+                Kalman filter, which also reports the variance of its estimate)
+            ema_alpha: Weight of the newest count for the EMA filter
+            process_noise: Kalman process variance per update (how fast queues change)
+            measurement_noise: Kalman measurement variance (how noisy detector counts are)
         """
+        if smoothing_filter not in SMOOTHING_FILTERS:
+            raise ValueError(f"Unknown smoothing filter '{smoothing_filter}', expected one of {SMOOTHING_FILTERS}")
+            
         self.num_lanes = num_lanes
-        self.smoothing_window = smoothing_window
+        self.smoothing_window = max(1, smoothing_window)
+        self.smoothing_filter = smoothing_filter
+        self.ema_alpha = ema_alpha
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
         
-        self.history = {i: deque(maxlen=smoothing_window) for i in range(num_lanes)}
-        self.current_counts = np.zeros(num_lanes, dtype=np.int32)
+        self._clear()
         
-        logger.info(f"Vehicle counter initialized for {num_lanes} lanes")
+        logger.info(f"Vehicle counter initialized for {num_lanes} lanes ({smoothing_filter} filter)")
     
     def update(self, raw_counts: np.ndarray) -> np.ndarray:
         """
         Update vehicle counts with new observation
         
         Args:
-            raw_counts: Raw vehicle counts from current frame
+            raw_counts: Raw vehicle counts from current frame (integer or fractional)
             
         Returns:
-            Smoothed vehicle counts
+            Smoothed vehicle counts, float32
         """
+        raw_counts = np.asarray(raw_counts, dtype=np.float32).reshape(-1)
         if len(raw_counts) != self.num_lanes:
             logger.error(f"Expected {self.num_lanes} lanes, got {len(raw_counts)}")
             return self.current_counts
+            
+        # Ring buffer: overwrite the oldest row, keep the running sum in step
+        self.window_sum += raw_counts - self.history[self.cursor]
+        self.history[self.cursor] = raw_counts
+        self.cursor = (self.cursor + 1) % self.smoothing_window
+        self.filled = min(self.filled + 1, self.smoothing_window)
         
-        for lane_id in range(self.num_lanes):
-            self.history[lane_id].append(raw_counts[lane_id])
-        
-        smoothed_counts = np.array([
-            int(np.mean(self.history[i])) for i in range(self.num_lanes)
-        ], dtype=np.int32)
+        if self.smoothing_filter == "mean":
+            smoothed = self.window_sum / self.filled
+        elif self.smoothing_filter == "median":
+            smoothed = np.median(self.history[:self.filled], axis=0)
+        elif self.smoothing_filter == "ema":
+            previous = raw_counts if self.filled == 1 else self.current_counts
+            smoothed = previous + self.ema_alpha * (raw_counts - previous)
+        else:
+            smoothed = self._kalman_update(raw_counts)
+            
+        self.current_counts = np.maximum(smoothed, 0.0).astype(np.float32)
+        return self.current_counts
+    
+    def _kalman_update(self, raw_counts: np.ndarray) -> np.ndarray:
+        """One predict/correct step of the per-lane random-walk Kalman filter"""
+        if self.filled == 1:
+            self.variance[:] = self.measurement_noise
+            return raw_counts
+        predicted_variance = self.variance + self.process_noise
+        gain = predicted_variance / (predicted_variance + self.measurement_noise)
+        self.variance = ((1.0 - gain) * predicted_variance).astype(np.float32)
+        return self.current_counts + gain * (raw_counts - self.current_counts)
+    
+    def get_variance(self) -> np.ndarray:
+        """
+        Uncertainty of the smoothed counts
         
-        self.current_counts = smoothed_counts
-        return smoothed_counts
+        Returns:
+            Kalman estimate variance per lane, or the variance of the counts in
+            the window for the other filters
+        """
+        if self.smoothing_filter == "kalman":
+            return self.variance.copy()
+        if not self.filled:
+            return np.zeros(self.num_lanes, dtype=np.float32)
+        return self.history[:self.filled].var(axis=0)
     
     def get_counts(self) -> np.ndarray:
         """Get current vehicle counts"""
         return self.current_counts.copy()
     
-    def get_total_vehicles(self) -> int:
+    def get_total_vehicles(self) -> float:
         """Get total number of vehicles across all lanes"""
-        return int(np.sum(self.current_counts))
+        return float(np.sum(self.current_counts))
     
-    def get_lane_count(self, lane_id: int) -> int:
+    def get_lane_count(self, lane_id: int) -> float:
         """Get vehicle count for specific lane"""
         if 0 <= lane_id < self.num_lanes:
-            return int(self.current_counts[lane_id])
-        return 0
+            return float(self.current_counts[lane_id])
+        return 0.0
     
     def get_statistics(self) -> Dict:
         """Get statistics about current state"""
         return {
             'total_vehicles': self.get_total_vehicles(),
             'counts_per_lane': self.current_counts.tolist(),
-            'max_lane_count': int(np.max(self.current_counts)),
-            'min_lane_count': int(np.min(self.current_counts)),
+            'max_lane_count': float(np.max(self.current_counts)),
+            'min_lane_count': float(np.min(self.current_counts)),
             'avg_lane_count': float(np.mean(self.current_counts)),
-            'std_lane_count': float(np.std(self.current_counts))
+            'std_lane_count': float(np.std(self.current_counts)),
+            'filter': self.smoothing_filter
         }
     
+    def _clear(self):
+        """Allocate empty history and filter state"""
+        self.history = np.zeros((self.smoothing_window, self.num_lanes), dtype=np.float32)
+        self.window_sum = np.zeros(self.num_lanes, dtype=np.float64)
+        self.cursor = 0
+        self.filled = 0
+        self.current_counts = np.zeros(self.num_lanes, dtype=np.float32)
+        self.variance = np.zeros(self.num_lanes, dtype=np.float32)
+    
     def reset(self):
         """Reset all counts"""
-        for i in range(self.num_lanes):
-            self.history[i].clear()
-        self.current_counts = np.zeros(self.num_lanes, dtype=np.int32)
+        self._clear()
         logger.info("Vehicle counter reset")
 
 
 if __name__ == "__main__":
     # Test vehicle counter
-    counter = VehicleCounter(num_lanes=8, smoothing_window=3)
-    
     test_counts = [
         np.array([3, 5, 2, 4, 1, 0, 3, 2]),
         np.array([4, 5, 2, 3, 2, 1, 3, 2]),
         np.array([3, 6, 3, 4, 1, 0, 4, 3]),
     ]
     
-    for i, counts in enumerate(test_counts):
-        smoothed = counter.update(counts)
-        print(f"Frame {i}: Raw={counts}, Smoothed={smoothed}")
-    
+    for smoothing_filter in ("mean", "median", "ema", "kalman"):
+        counter = VehicleCounter(num_lanes=8, smoothing_window=3, smoothing_filter=smoothing_filter)
+        for i, counts in enumerate(test_counts):
+            smoothed = counter.update(counts)
+            print(f"[{smoothing_filter}] Frame {i}: Raw={counts}, Smoothed={np.round(smoothed, 2)}")
+        print(f"[{smoothing_filter}] Variance: {np.round(counter.get_variance(), 3)}")
+        
     print("\nStatistics:")
     print(counter.get_statistics())
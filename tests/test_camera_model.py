@@ -0,0 +1,57 @@
+"""
+Test camera geometry (pixel <-> world projection)
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from carla_integration.camera_model import CameraModel
+from yolo_detection.detect_vehicles import Detection
+from loguru import logger
+
+
+def test_overhead_camera():
+    """A straight-down camera maps the image center under itself and pixels to meters linearly"""
+    model = CameraModel((10.0, -5.0, 30.0), (-90.0, 0.0, 0.0), 1920, 1080, 90.0)
+    center = model.pixels_to_ground([[960, 540]])
+    assert np.allclose(center, [[10.0, -5.0]])
+    
+    # 90 degree FOV at 30 m covers 60 m across 1920 pixels
+    assert np.isclose(model.meters_per_pixel(), 60.0 / 1920)
+    logger.success("Overhead camera projection works")
+
+
+def test_round_trip_tilted_camera():
+    """Unprojecting projected ground points recovers them for an oblique camera"""
+    model = CameraModel((0.0, 0.0, 15.0), (-15.0, 40.0, 2.0), 1280, 720, 70.0)
+    rng = np.random.default_rng(0)
+    forward = rng.uniform(25, 120, 200)
+    side = rng.uniform(-10, 10, 200)
+    yaw = np.radians(40.0)
+    points = np.stack([
+        forward * np.cos(yaw) - side * np.sin(yaw),
+        forward * np.sin(yaw) + side * np.cos(yaw),
+        np.zeros(200)
+    ], axis=1)
+    
+    pixels = model.world_to_pixels(points)
+    assert np.allclose(model.pixels_to_ground(pixels), points[:, :2], atol=1e-6)
+    
+    # Rays above the horizon never reach the ground
+    assert np.isnan(model.pixels_to_ground([[640, 0]])).all()
+    
+    # Detections are located at the bottom center of their (integer) box
+    nearest = int(np.argmin(forward))
+    u, v = np.round(pixels[nearest]).astype(int)
+    detection = Detection((int(u) - 20, int(v) - 40, int(u) + 20, int(v)), 0.9, 2, "car")
+    assert np.allclose(model.detections_to_ground([detection]), points[nearest:nearest + 1, :2], atol=0.2)
+    logger.success("Tilted camera round trip works")
+
+
+if __name__ == "__main__":
+    test_overhead_camera()
+    test_round_trip_tilted_camera()
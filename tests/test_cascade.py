@@ -0,0 +1,77 @@
+"""
+Test cascade region selection and the NMS merge of crop/tile detections
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection, VehicleDetector, merge_detections
+from loguru import logger
+
+
+def cascade_detector(max_crops=8):
+    """Detector with cascade settings only (region selection needs no model)"""
+    detector = VehicleDetector.__new__(VehicleDetector)
+    detector.confidence_threshold = 0.5
+    detector.cascade = {
+        'low_confidence': 0.15,
+        'high_confidence': 0.5,
+        'crowd_iou': 0.3,
+        'crop_size': 320,
+        'context': 0.5,
+        'max_crops': max_crops
+    }
+    return detector
+
+
+def box(x1, y1, x2, y2, confidence):
+    return Detection((x1, y1, x2, y2), confidence, 2, "car")
+
+
+DETECTIONS = [
+    box(400, 400, 440, 430, 0.9),        # confident and isolated: trusted
+    box(100, 100, 140, 130, 0.3),        # uncertain
+    box(150, 150, 190, 180, 0.35),       # uncertain, inside the previous crop
+    box(1000, 500, 1100, 560, 0.9),      # confident but crowded
+    box(1010, 505, 1110, 565, 0.85),
+    box(1500, 700, 1900, 1000, 0.2),     # uncertain and large
+    box(700, 100, 740, 130, 0.1)         # below low_confidence: ignored
+]
+
+
+def test_cascade_regions():
+    """Uncertain and crowded boxes get context crops, least confident first, clipped to the frame"""
+    detector = cascade_detector()
+    regions = detector._cascade_regions(DETECTIONS, 1080, 1920)
+    assert regions.tolist() == [
+        [1120, 280, 1920, 1080],  # 400 px box with 50 % context per side, shifted inside the frame
+        [0, 0, 320, 320],
+        [900, 375, 1220, 695]  # around the less confident of the crowded pair, which covers both
+    ], regions.tolist()
+    
+    assert cascade_detector(max_crops=2)._cascade_regions(DETECTIONS, 1080, 1920).shape == (2, 4)
+    assert detector._cascade_regions([DETECTIONS[0]], 1080, 1920).shape == (0, 4)
+    assert detector._cascade_regions([], 1080, 1920).shape == (0, 4)
+    assert detector.stage1_conf(0.5) == 0.15 and detector.stage1_conf(0.1) == 0.1
+    logger.success("Cascade region selection works")
+
+
+def test_merge_detections():
+    """Overlapping boxes from different crops collapse onto the most confident one"""
+    a = box(100, 100, 200, 160, 0.6)
+    b = box(105, 102, 205, 162, 0.8)
+    c = box(400, 100, 500, 160, 0.7)
+    merged = merge_detections([a, b, c])
+    assert sorted(d.confidence for d in merged) == [0.7, 0.8]
+    assert merge_detections([a, b], iou_threshold=0.95) == [b, a]
+    assert merge_detections([a]) == [a] and merge_detections([]) == []
+    logger.success("Detection merge works")
+
+
+if __name__ == "__main__":
+    test_cascade_regions()
+    test_merge_detections()
@@ -0,0 +1,59 @@
+"""
+Test the per-frame detection cache (LRU eviction, threshold filtering)
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.detection_cache import DetectionCache
+from loguru import logger
+
+
+def detections(*confidences):
+    return [Detection((10 * i, 0, 10 * i + 8, 8), c, 2, "car") for i, c in enumerate(confidences)]
+
+
+def test_threshold_filtering():
+    """Consumers get the cached base-threshold boxes cut at their own threshold"""
+    cache = DetectionCache(max_frames=4, base_conf=0.2)
+    cache.put("cam", 7, detections(0.25, 0.45, 0.9), 0.2)
+    
+    assert [d.confidence for d in cache.get("cam", 7, 0.2)] == [0.25, 0.45, 0.9]
+    assert [d.confidence for d in cache.get("cam", 7, 0.5)] == [0.9]
+    assert cache.get("cam", 7, 0.95) == []
+    # Boxes below the entry's threshold were never computed: a lower cut is a miss
+    assert cache.get("cam", 7, 0.1) is None
+    # Frame ids and cameras are separate keys
+    assert cache.get("cam", 8, 0.5) is None and cache.get("other", 7, 0.5) is None
+    
+    cache.put("cam", 9, [], 0.2)
+    assert cache.get("cam", 9, 0.5) == []
+    metrics = cache.get_metrics()
+    assert metrics['hits'] == 4 and metrics['misses'] == 3
+    logger.success("Detection cache threshold filtering works")
+
+
+def test_lru_eviction():
+    """The least recently used frame is evicted first; lookups refresh an entry"""
+    cache = DetectionCache(max_frames=2)
+    cache.put("cam", 1, detections(0.9), 0.2)
+    cache.put("cam", 2, detections(0.9), 0.2)
+    assert cache.get("cam", 1, 0.5) is not None  # frame 1 is now the most recent
+    
+    cache.put("cam", 3, detections(0.9), 0.2)
+    assert cache.get("cam", 2, 0.5) is None
+    assert cache.get("cam", 1, 0.5) is not None and cache.get("cam", 3, 0.5) is not None
+    assert cache.get_metrics()['evictions'] == 1 and cache.get_metrics()['size'] == 2
+    
+    cache.clear()
+    assert cache.get("cam", 1, 0.5) is None
+    logger.success("Detection cache LRU eviction works")
+
+
+if __name__ == "__main__":
+    test_threshold_filtering()
+    test_lru_eviction()
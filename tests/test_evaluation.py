@@ -0,0 +1,80 @@
+"""
+Test detection evaluation (average precision, mAP, count error, Pareto front) on hand-made boxes
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.evaluation import average_precision, compute_map, count_mae, pareto_front
+from loguru import logger
+
+
+def car(x1, y1, x2, y2, confidence, class_id=2):
+    return Detection((x1, y1, x2, y2), confidence, class_id, "car")
+
+
+def test_average_precision():
+    """101-point interpolated area under the precision envelope"""
+    assert np.isclose(average_precision(np.array([0.5, 1.0]), np.array([1.0, 1.0])), 1.0)
+    # Only half of the objects found: recall points above 0.5 score zero
+    assert np.isclose(average_precision(np.array([0.5]), np.array([1.0])), 51 / 101)
+    # A false positive between two hits: the envelope lifts precision back to 2/3
+    ap = average_precision(np.array([0.5, 0.5, 1.0]), np.array([1.0, 0.5, 2 / 3]))
+    assert np.isclose(ap, (51 + 50 * 2 / 3) / 101)
+    logger.success("Average precision works")
+
+
+def test_compute_map():
+    """An exact hit, a false positive and a 0.67-IoU hit, scored per IoU threshold"""
+    ground_truth = (np.array([[0, 0, 100, 100], [200, 0, 300, 100]], dtype=np.float32), np.array([2, 2]))
+    predictions = [car(0, 0, 100, 100, 0.9), car(500, 500, 600, 600, 0.8), car(220, 0, 320, 100, 0.7)]
+    result = compute_map([predictions], [ground_truth])
+    
+    both_hits = (51 + 50 * 2 / 3) / 101  # IoU thresholds 0.5 - 0.65
+    one_hit = 51 / 101                   # 0.7 - 0.95: the shifted box no longer matches
+    assert np.isclose(result['map50'], both_hits)
+    assert np.isclose(result['map50_95'], (4 * both_hits + 6 * one_hit) / 10)
+    assert list(result['ap50_per_class']) == [2]
+    
+    # A class that is never predicted scores zero and halves the mean
+    missed = (np.array([[400, 0, 450, 50]], dtype=np.float32), np.array([7]))
+    result = compute_map([predictions, []], [ground_truth, missed])
+    assert result['ap50_per_class'][7] == 0.0
+    assert np.isclose(result['map50'], both_hits / 2)
+    
+    assert compute_map([[]], [(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64))])['map50'] == 0.0
+    logger.success("mAP works")
+
+
+def test_count_mae():
+    """Absolute count error averaged over frames, overall and per lane"""
+    result = count_mae(np.array([[1, 2], [3, 4]]), np.array([[1, 0], [4, 4]]))
+    assert result['count_mae'] == 0.75 and result['count_mae_per_lane'] == [0.5, 1.0]
+    assert count_mae(np.zeros((0, 2)), np.zeros((0, 2)))['count_mae'] == 0.0
+    logger.success("Count MAE works")
+
+
+def test_pareto_front():
+    """Only configurations not beaten on every objective survive, sorted by latency"""
+    rows = [
+        {'name': 'a', 'p50_latency_ms': 10.0, 'map50_95': 0.50, 'count_mae': 1.0},
+        {'name': 'b', 'p50_latency_ms': 20.0, 'map50_95': 0.60, 'count_mae': 1.0},
+        {'name': 'c', 'p50_latency_ms': 30.0, 'map50_95': 0.55, 'count_mae': 1.0},  # beaten by b
+        {'name': 'd', 'p50_latency_ms': 25.0, 'map50_95': 0.60, 'count_mae': 0.5}
+    ]
+    assert [row['name'] for row in pareto_front(rows)] == ['a', 'b', 'd']
+    # Without the count error, d only costs more than b
+    assert [row['name'] for row in pareto_front(rows, secondary_cost_key=None)] == ['a', 'b']
+    logger.success("Pareto front works")
+
+
+if __name__ == "__main__":
+    test_average_precision()
+    test_compute_map()
+    test_count_mae()
+    test_pareto_front()
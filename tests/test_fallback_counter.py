@@ -0,0 +1,57 @@
+"""
+Test the classical fallback counter (blob counts and vehicle-area calibration against YOLO)
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.roi_mapping import ROIMapper
+from yolo_detection.fallback_counter import FallbackCounter
+from loguru import logger
+
+
+LANES = [
+    {'id': 0, 'roi': [[0, 0, 160, 480]]},
+    {'id': 1, 'roi': [[480, 0, 640, 480]]},
+]
+
+# Two separate cars in lane 0, three queued cars merged into one blob in lane 1 (2400 px each)
+VEHICLES = [(20, 40, 80, 80), (20, 200, 80, 240), (500, 100, 620, 160)]
+
+
+def scene(vehicles):
+    frame = np.full((480, 640, 3), 60, dtype=np.uint8)
+    for x1, y1, x2, y2 in vehicles:
+        frame[y1:y2, x1:x2] = 220
+    return frame
+
+
+def test_calibration():
+    """The per-lane vehicle area converges to YOLO's view, so merged blobs count as several vehicles"""
+    mapper = ROIMapper(LANES, frame_shape=(480, 640))
+    counter = FallbackCounter(mapper, downsample=4, vehicle_area=6000, calibration_rate=1.0)
+    assert counter.count(scene([])).tolist() == [0, 0]  # first frame becomes the background
+    
+    frame = scene(VEHICLES)
+    # Uncalibrated: small blobs still count as one vehicle, the 7200 px queue as one
+    assert counter.count(frame).tolist() == [2, 1]
+    detections = [Detection(box, 0.9, 2, "car") for box in VEHICLES]
+    counter.observe_detections(detections, np.array([2, 3]))
+    # Morphological opening trims blob corners, so the calibrated area is slightly under 2400 px
+    assert np.allclose(counter.get_metrics()['vehicle_area_px'], [2400, 2400], rtol=0.05)
+    assert counter.get_metrics()['mae_vs_yolo'] == 1.0
+    
+    # Calibrated: the queue splits into three, and the vehicles did not leak into the background
+    assert counter.count(frame).tolist() == [2, 3]
+    counter.observe_detections(detections, np.array([2, 3]))
+    assert counter.get_metrics()['mae_vs_yolo'] == 0.5
+    logger.success("Fallback counter calibration works")
+
+
+if __name__ == "__main__":
+    test_calibration()
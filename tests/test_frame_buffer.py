@@ -0,0 +1,74 @@
+"""
+Test the preallocated frame buffer pool (BGRA ingest without per-frame allocation)
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from carla_integration.frame_buffer import FrameBufferPool, SnapshotRing
+from loguru import logger
+
+
+def random_bgra(height, width, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+
+
+def test_bgra_to_bgr():
+    """Ingested frames are the BGRA input without its alpha channel, contiguous"""
+    pool = FrameBufferPool(64, 48, num_buffers=3)
+    bgra = random_bgra(48, 64)
+    frame = pool.ingest(bgra.tobytes(), 64, 48)
+    assert frame.shape == (48, 64, 3) and frame.dtype == np.uint8
+    assert frame.flags['C_CONTIGUOUS']
+    assert np.array_equal(frame, bgra[:, :, :3])
+    logger.success("BGRA to BGR conversion works")
+
+
+def test_no_allocation_after_warmup():
+    """The ring is reused: no allocation per frame, only on a resolution change"""
+    pool = FrameBufferPool(64, 48, num_buffers=3)
+    allocations = pool.get_stats()['allocations']
+    frames = [pool.ingest(random_bgra(48, 64, seed).tobytes(), 64, 48) for seed in range(7)]
+    stats = pool.get_stats()
+    assert stats['allocations'] == allocations == 3
+    assert stats['frames_ingested'] == 7
+    assert stats['bytes_copied'] == 7 * 48 * 64 * 3
+    # Buffers cycle: the 4th frame reuses the 1st buffer
+    assert frames[3] is frames[0] and frames[6] is frames[0] and frames[1] is not frames[0]
+    assert np.array_equal(frames[6], random_bgra(48, 64, 6)[:, :, :3])
+    
+    pool.ingest(random_bgra(24, 32).tobytes(), 32, 24)
+    stats = pool.get_stats()
+    assert stats['resolution'] == [32, 24] and stats['allocations'] == 6
+    logger.success("Frame buffers are reused across frames")
+
+
+def test_snapshot_ring():
+    """Snapshots reuse their ring per slot; unpooled snapshots allocate every copy; both are counted"""
+    ring = SnapshotRing(num_buffers=2)
+    frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+    tensor = np.ones((1, 3, 32, 32), dtype=np.float32)
+    first = ring.copy(frame)
+    first_tensor = ring.copy(tensor, slot="tensor")
+    second = ring.copy(frame)
+    assert ring.copy(frame) is first and second is not first
+    assert ring.copy(tensor, slot="tensor") is not first_tensor
+    assert np.array_equal(first, frame) and first.base is None
+    stats = ring.get_stats()
+    assert stats['copies'] == 5 and stats['allocations'] == 4
+    assert stats['bytes_copied'] == 3 * frame.nbytes + 2 * tensor.nbytes
+    
+    unpooled = SnapshotRing(num_buffers=0)
+    assert unpooled.copy(frame) is not unpooled.copy(frame)
+    assert unpooled.get_stats()['allocations'] == 2
+    logger.success("Snapshot rings reuse buffers and count copies")
+
+
+if __name__ == "__main__":
+    test_bgra_to_bgr()
+    test_no_allocation_after_warmup()
+    test_snapshot_ring()
@@ -0,0 +1,186 @@
+"""
+Test the batching inference server (grouping, batch confidence, per-request filtering)
+"""
+
+import sys
+import time
+import threading
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.inference_server import InferenceServer, InferenceRequest
+from yolo_detection.preprocess import LetterboxMeta
+from loguru import logger
+
+
+class RecordingDetector:
+    """Detector double returning one weak and one confident box per frame and recording its calls"""
+    
+    confidence_threshold = 0.5
+    cascade = None
+    
+    def __init__(self):
+        self.calls = []
+    
+    def stage1_conf(self, conf=None):
+        return conf if conf is not None else self.confidence_threshold
+    
+    def _frame(self, conf):
+        return [
+            Detection((0, 0, 10, 10), 0.3, 2, "car"),
+            Detection((20, 20, 40, 40), 0.8, 2, "car")
+        ] if conf <= 0.3 else [Detection((20, 20, 40, 40), 0.8, 2, "car")]
+    
+    def batch_detect(self, images, conf_override=None, imgsz=None):
+        self.calls.append(('raw', len(images), conf_override, imgsz))
+        return [self._frame(conf_override) for _ in images]
+    
+    def batch_detect_preprocessed(self, tensors, metas, conf_override=None):
+        self.calls.append(('prepared', len(tensors), conf_override, None))
+        return [self._frame(conf_override) for _ in tensors]
+    
+    def detect_tiled(self, image, tiles, conf_override=None, imgsz=None):
+        self.calls.append(('tiled', 1, conf_override, imgsz))
+        return self._frame(conf_override)
+
+
+def prepared_input(size=640):
+    tensor = np.zeros((3, size, size), dtype=np.float32)
+    return tensor, LetterboxMeta(1.0, (0, 0), (size, size), (size, size))
+
+
+def test_grouping_by_kind():
+    """Raw images per input size, prepared tensors per shape and tiled frames run as separate calls"""
+    detector = RecordingDetector()
+    server = InferenceServer(detector, max_batch_size=8)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    batch = [
+        InferenceRequest(image, 0.5),
+        InferenceRequest(image, 0.5),
+        InferenceRequest(image, 0.5, imgsz=320),
+        InferenceRequest(None, 0.5, prepared=prepared_input()),
+        InferenceRequest(None, 0.5, prepared=prepared_input()),
+        InferenceRequest(image, 0.5, tiles=(2, 2))
+    ]
+    server._process_batch(batch)
+    
+    calls = sorted(detector.calls, key=lambda call: (call[0], call[3] or 0))
+    assert calls == [
+        ('prepared', 2, 0.5, None),
+        ('raw', 2, 0.5, None),
+        ('raw', 1, 0.5, 320),
+        ('tiled', 1, 0.5, None)
+    ], calls
+    assert all(request.future.done() for request in batch)
+    assert server.get_metrics()['total_frames'] == 6
+    logger.success("Requests are grouped by input kind")
+
+
+def test_batch_runs_at_min_conf():
+    """A group is predicted once at its lowest threshold; every request gets its own cut"""
+    detector = RecordingDetector()
+    server = InferenceServer(detector)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    strict, loose = InferenceRequest(image, 0.5), InferenceRequest(image, 0.2)
+    server._process_batch([strict, loose])
+    
+    assert detector.calls == [('raw', 2, 0.2, None)]
+    assert [d.confidence for d in loose.future.result()] == [0.3, 0.8]
+    assert [d.confidence for d in strict.future.result()] == [0.8]
+    logger.success("Per-request confidence is re-applied after a min-conf batch")
+
+
+def test_submit_and_failure():
+    """submit() resolves through the worker thread; a failing predict fails the futures"""
+    detector = RecordingDetector()
+    server = InferenceServer(detector, max_batch_size=4, max_wait_ms=20.0)
+    server.start()
+    try:
+        image = np.zeros((480, 640, 3), dtype=np.uint8)
+        futures = [server.submit(image, conf=conf) for conf in (0.5, 0.25)]
+        results = [future.result(timeout=2.0) for future in futures]
+        assert [len(r) for r in results] == [1, 2]
+        
+        def broken(*args, **kwargs):
+            raise RuntimeError("predict failed")
+        detector.batch_detect = broken
+        future = server.submit(image)
+        assert isinstance(future.exception(timeout=2.0), RuntimeError)
+    finally:
+        server.stop()
+    logger.success("Submit and failure propagation work")
+
+
+def test_cancelled_request():
+    """A request cancelled while queued is dropped and later requests are still served"""
+    detector = RecordingDetector()
+    release = threading.Event()
+    batch_detect = detector.batch_detect
+    
+    def blocking(images, **kwargs):
+        release.wait(timeout=2.0)
+        return batch_detect(images, **kwargs)
+    detector.batch_detect = blocking
+    
+    server = InferenceServer(detector, max_batch_size=1, max_wait_ms=0.0)
+    server.start()
+    try:
+        image = np.zeros((480, 640, 3), dtype=np.uint8)
+        busy = server.submit(image)
+        while server.queue_depth:
+            time.sleep(0.001)  # Until the worker takes the first request and blocks in predict
+        abandoned = server.submit(image)
+        assert abandoned.cancel()  # e.g. the awaiting coroutine timed out
+        release.set()
+        assert len(busy.result(timeout=2.0)) == 1
+        assert len(server.submit(image).result(timeout=2.0)) == 1
+        assert detector.calls == [('raw', 1, 0.5, None)] * 2
+    finally:
+        server.stop()
+        
+    # A future cancelled after the batch was collected is skipped when resolving
+    request = InferenceRequest(image, 0.5)
+    request.future.cancel()
+    server._process_batch([request, InferenceRequest(image, 0.5)])
+    logger.success("Cancelled requests do not stop the worker")
+
+
+
+class CascadeDetector(RecordingDetector):
+    """Detector double with a cascade: stage 1 at 0.2, refinement records the frames it cropped"""
+    
+    cascade = {'low_confidence': 0.2}
+    
+    def stage1_conf(self, conf=None):
+        return 0.2
+    
+    def refine_batch(self, images, detections, conf_override=None):
+        assert all(image is not None for image in images)
+        self.calls.append(('refine', len(images), conf_override, None))
+        return [[Detection((50, 50, 60, 60), 0.9, 2, "car")] for _ in images]
+
+
+def test_cascade_without_image():
+    """Prepared-only requests skip refinement and keep their first-stage boxes at the final threshold"""
+    detector = CascadeDetector()
+    server = InferenceServer(detector, max_batch_size=8)
+    framed = InferenceRequest(np.zeros((640, 640, 3), dtype=np.uint8), 0.5, prepared=prepared_input())
+    tensor_only = InferenceRequest(None, 0.5, prepared=prepared_input())
+    server._process_batch([framed, tensor_only])
+    
+    assert ('refine', 1, 0.5, None) in detector.calls
+    assert [d.bbox for d in framed.future.result()] == [(50, 50, 60, 60)]
+    assert [d.confidence for d in tensor_only.future.result()] == [0.8]
+    logger.success("Cascade skips refinement for requests without an image")
+
+
+if __name__ == "__main__":
+    test_grouping_by_kind()
+    test_batch_runs_at_min_conf()
+    test_submit_and_failure()
+    test_cancelled_request()
+    test_cascade_without_image()
@@ -0,0 +1,59 @@
+"""
+Test lane features (queue length, stopped/moving split, nearest distance)
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import LaneFeatureExtractor, ObservationBuilder
+from loguru import logger
+
+
+LANES = [
+    {'id': 0, 'stop_line': [[0.0, -2.0], [0.0, 2.0]]},
+    {'id': 1, 'stop_line_world': [[[0.0, 3.0], [0.0, 7.0]]]},
+    {'id': 2},  # no stop line: measured to the intersection center
+]
+
+
+def test_queue_features():
+    """Stopped vehicles form the queue; new and fast vehicles count as moving"""
+    extractor = LaneFeatureExtractor(LANES, intersection_center=(-10.0, 0.0), max_distance=60.0)
+    positions = np.array([[5.0, 0.0], [12.0, 0.5], [30.0, 5.0], [-10.0, 20.0], [np.nan, np.nan]])
+    lanes = np.array([0, 0, 1, 2, 0])
+    
+    first = extractor.update(positions, lanes, timestamp=0.0)
+    assert first['stopped'].tolist() == [0, 0, 0] and first['moving'].tolist() == [2, 1, 1]
+    
+    moved = positions + np.array([[0.0, 0.0], [0.2, 0.0], [-2.0, 0.0], [0.0, 0.1], [0.0, 0.0]])
+    features = extractor.update(moved, lanes, timestamp=0.5)
+    assert features['stopped'].tolist() == [2, 0, 1]
+    assert features['moving'].tolist() == [0, 1, 0]
+    assert np.allclose(features['queue_length'], [12.2, 0.0, 20.1], atol=1e-3)
+    assert np.allclose(features['nearest_distance'], [5.0, 28.0, 20.1], atol=1e-3)
+    
+    empty = extractor.update(np.zeros((0, 2)), np.zeros(0), timestamp=1.0)
+    assert empty['nearest_distance'].tolist() == [60.0] * 3
+    logger.success("Lane queue features work")
+
+
+def test_observation_channels():
+    """Enabled channels are appended to the counts, normalized"""
+    builder = ObservationBuilder(3, feature_channels=['queue_length', 'stopped'], max_distance=60.0)
+    obs = builder.build_observation(
+        np.array([2, 0, 4]),
+        lane_features={'queue_length': np.array([30.0, 0.0, 90.0]), 'stopped': np.array([2, 0, 4])}
+    )
+    assert np.allclose(obs['observation'], [0.1, 0.0, 0.2, 0.5, 0.0, 1.0, 0.1, 0.0, 0.2])
+    assert builder.get_observation_space_info()['shape'] == (9,)
+    assert obs['lane_features']['queue_length'] == [30.0, 0.0, 90.0]
+    logger.success("Observation feature channels work")
+
+
+if __name__ == "__main__":
+    test_queue_features()
+    test_observation_channels()
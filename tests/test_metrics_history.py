@@ -0,0 +1,97 @@
+"""
+Test the fixed-memory metrics history store
+"""
+
+import sys
+import base64
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import MetricsHistory
+from loguru import logger
+
+
+RESOLUTIONS = [
+    {'name': 'tick', 'interval': 0.0, 'capacity': 50},
+    {'name': 'second', 'interval': 1.0, 'capacity': 20}
+]
+
+
+def fill(history: MetricsHistory, steps: int, dt: float = 0.25):
+    """Record counts [t, 2t] and phase t // 5 every dt seconds"""
+    for step in range(steps):
+        t = step * dt
+        history.record(t, {'counts': np.array([t, 2 * t]), 'phase': t // 5, 'latency.detect_ms': 10.0})
+
+
+def test_bounded_rings():
+    """Old samples are overwritten, memory does not grow"""
+    history = MetricsHistory(RESOLUTIONS)
+    fill(history, 40)
+    size = history.get_metrics()['bytes']
+    fill(history, 400)
+    assert history.get_metrics()['bytes'] == size
+    
+    tick = history.query(['counts'])
+    assert tick['resolution'] == 'tick'
+    assert tick['series']['counts']['length'] == 50
+    assert tick['series']['counts']['timestamps'][0] == 87.5  # (400 - 50) * 0.25
+    assert history.query(['latency.*'])['series'].keys() == {'latency.detect_ms'}
+    logger.success("Bounded rings work")
+
+
+def test_downsampling():
+    """Per-second buckets hold means; queries pick the resolution and re-bucket"""
+    history = MetricsHistory(RESOLUTIONS)
+    fill(history, 40)  # t = 0 .. 9.75
+    
+    second = history.query(['counts'], start=2.0, end=4.0, step=1.0)
+    assert second['resolution'] == 'second'
+    assert second['series']['counts']['timestamps'] == [2.0, 3.0, 4.0]
+    assert second['series']['counts']['columns'] == [[2.375, 3.375, 4.375], [4.75, 6.75, 8.75]]
+    
+    # Open bucket (t = 9..9.75) is included; 5 s buckets average the second means
+    coarse = history.query(['phase'], step=5.0)
+    assert coarse['series']['phase']['timestamps'] == [0.0, 5.0]
+    assert coarse['series']['phase']['columns'] == [[0.0, 1.0]]
+    
+    # Starting before the tick ring's history falls back to a coarser resolution
+    history = MetricsHistory(RESOLUTIONS)
+    fill(history, 80)  # tick ring keeps t = 7.5 .. 19.75
+    assert history.query(['counts'], start=8.0)['resolution'] == 'tick'
+    assert history.query(['counts'], start=5.0)['resolution'] == 'second'
+    logger.success("Downsampling works")
+
+
+def test_base64_encoding():
+    """Binary columns decode to the same values as the JSON lists"""
+    history = MetricsHistory(RESOLUTIONS)
+    fill(history, 8)
+    encoded = history.query(['counts'], encoding='base64')['series']['counts']
+    timestamps = np.frombuffer(base64.b64decode(encoded['timestamps']), dtype='<f8')
+    lane_1 = np.frombuffer(base64.b64decode(encoded['columns'][1]), dtype='<f4')
+    assert np.allclose(timestamps, np.arange(8) * 0.25) and np.allclose(lane_1, timestamps * 2)
+    logger.success("Base64 encoding works")
+
+
+
+def test_width_change():
+    """A series whose width changes (lanes regenerated) restarts instead of failing the record"""
+    history = MetricsHistory(RESOLUTIONS)
+    fill(history, 8)
+    history.record(2.0, {'counts': np.array([1.0, 2.0, 3.0]), 'phase': 0.0})
+    
+    counts = history.query(['counts'])['series']['counts']
+    assert counts['length'] == 1 and counts['columns'] == [[1.0], [2.0], [3.0]]
+    assert history.query(['phase'])['series']['phase']['length'] == 9  # other series keep their history
+    assert history.series_names()[0] == 'counts'
+    logger.success("Width changes restart the series")
+
+if __name__ == "__main__":
+    test_bounded_rings()
+    test_downsampling()
+    test_base64_encoding()
+    test_width_change()
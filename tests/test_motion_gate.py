@@ -0,0 +1,92 @@
+"""
+Test the motion gate (reuse, partial crop, full and forced refresh decisions)
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.roi_mapping import ROIMapper
+from yolo_detection.motion_gate import MotionGate, GatePlan
+from loguru import logger
+
+
+LANES = [
+    {'id': 0, 'roi': [[0, 0, 160, 480]]},
+    {'id': 1, 'roi': [[480, 0, 640, 480]]},
+]
+
+
+def car(x, y):
+    return Detection((x - 20, y - 15, x + 20, y + 15), 0.9, 2, "car")
+
+
+def make_gate(max_age=20):
+    mapper = ROIMapper(LANES, frame_shape=(480, 640))
+    return MotionGate(mapper, downsample=8, threshold=6.0, max_age=max_age, crop_padding=32)
+
+
+def test_reuse_partial_full():
+    """Static lanes reuse detections, one changed lane is re-detected on a crop, many on the full frame"""
+    gate = make_gate()
+    frame = np.full((480, 640, 3), 60, dtype=np.uint8)
+    
+    plan = gate.plan(frame)
+    assert plan.action == GatePlan.FULL and not plan.forced
+    first = [car(80, 240), car(560, 240)]
+    assert gate.commit(plan, first) == first
+    
+    plan = gate.plan(frame.copy())
+    assert plan.action == GatePlan.REUSE
+    assert gate.commit(plan) == first
+    
+    # Lane 1 changes: only its crop runs, lane 0 keeps its detection
+    changed = frame.copy()
+    changed[:, 480:] = 200
+    plan = gate.plan(changed)
+    assert plan.action == GatePlan.PARTIAL
+    assert plan.changed_lanes.tolist() == [False, True]
+    assert plan.crop == (448, 0, 640, 480)
+    moved = car(560, 300)
+    merged = gate.commit(plan, [moved, car(80, 100)])  # crop boxes in lane 0 are dropped
+    assert merged == [first[0], moved]
+    
+    # Both lanes change: the crop would cover the frame, so it runs full
+    plan = gate.plan(np.full((480, 640, 3), 10, dtype=np.uint8))
+    assert plan.action == GatePlan.FULL and plan.changed_lanes.all()
+    
+    metrics = gate.get_metrics()
+    assert metrics['skipped_frames'] == 1 and metrics['partial_inferences'] == 1
+    logger.success("Motion gate reuse/partial/full decisions work")
+
+
+def test_forced_refresh():
+    """Every lane is re-detected on the full frame after max_age reused frames, measuring count drift"""
+    gate = make_gate(max_age=3)
+    frame = np.full((480, 640, 3), 60, dtype=np.uint8)
+    gate.commit(gate.plan(frame), [car(80, 240)])
+    for _ in range(3):
+        plan = gate.plan(frame)
+        assert plan.action == GatePlan.REUSE
+        gate.commit(plan)
+        
+    plan = gate.plan(frame)
+    assert plan.action == GatePlan.FULL and plan.forced
+    gate.commit(plan, [car(80, 240), car(560, 240), car(560, 100)])
+    metrics = gate.get_metrics()
+    assert metrics['forced_inferences'] == 1
+    assert np.isclose(metrics['count_drift_mae'], 1.0)  # lane 1: 0 reused vs 2 fresh
+    
+    assert gate.plan(frame).action == GatePlan.REUSE  # ages restart after the refresh
+    gate.reset()
+    assert gate.plan(frame).action == GatePlan.FULL
+    logger.success("Motion gate forced refresh works")
+
+
+if __name__ == "__main__":
+    test_reuse_partial_full()
+    test_forced_refresh()
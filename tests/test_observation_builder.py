@@ -0,0 +1,94 @@
+"""
+Test the observation feature pipeline and frame stacking
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import ObservationBuilder
+from sensing_pipeline.observation_builder import observation_layout
+from loguru import logger
+
+
+def test_layout():
+    """Blocks are laid out in order with their sizes and scales"""
+    layout = observation_layout(
+        ['counts', 'phase_one_hot', {'name': 'phase_elapsed', 'scale': 30.0}], num_lanes=4, num_phases=3
+    )
+    assert [(b['name'], b['offset'], b['size'], b['scale']) for b in layout] == [
+        ('counts', 0, 4, 20.0), ('phase_one_hot', 4, 3, 1.0), ('phase_elapsed', 7, 1, 30.0)
+    ]
+    for bad in (['counts', 'counts'], ['speed']):
+        try:
+            observation_layout(bad, num_lanes=4, num_phases=3)
+            raise AssertionError(f"{bad} should be rejected")
+        except ValueError:
+            pass
+    logger.success("Observation layout works")
+
+
+def test_feature_blocks():
+    """Every block is written normalized into one float32 frame"""
+    builder = ObservationBuilder(
+        4, features=['counts', 'queue_length', 'phase_one_hot', 'phase_elapsed'], num_phases=3
+    )
+    obs = builder.build_observation(
+        np.array([2.0, 0.0, 4.0, 30.0]),
+        lane_features={'queue_length': np.array([30.0, 0.0, 0.0, 90.0])},
+        phase=1,
+        phase_elapsed=15.0
+    )
+    expected = [0.1, 0.0, 0.2, 1.0, 0.5, 0.0, 0.0, 1.0, 0.0, 1.0, 0.0, 0.25]
+    assert np.allclose(obs['observation'], expected)
+    assert builder.last_observation.dtype == np.float32
+    assert builder.validate_observation(builder.last_observation)
+    
+    info = builder.get_observation_space_info()
+    assert info['shape'] == (12,) and info['channels'][-1] == 'phase_elapsed'
+    assert obs['lane_features']['queue_length'] == [30.0, 0.0, 0.0, 90.0]
+    logger.success("Observation feature blocks work")
+
+
+def test_frame_stack():
+    """The stacked history is a view of the ring buffer, oldest frame first"""
+    builder = ObservationBuilder(2, max_vehicles_per_lane=10, frame_stack=3)
+    builder.build_observation(np.array([1, 1]))
+    assert np.allclose(builder.get_stacked(), 0.1)  # first frame fills the history
+    
+    for step in range(2, 6):
+        obs = builder.build_observation(np.array([step, 0]))
+    stacked = builder.get_stacked()
+    assert stacked.shape == (3, 2)
+    assert np.allclose(stacked[:, 0], [0.3, 0.4, 0.5])
+    assert np.shares_memory(stacked, builder._frames)
+    assert np.allclose(obs['observation'], stacked.reshape(-1))
+    assert builder.get_observation_space_info()['shape'] == (6,)
+    
+    builder.reset()
+    builder.build_observation(np.array([7, 7]))
+    assert np.allclose(builder.get_stacked(), 0.7)
+    logger.success("Frame stacking works")
+
+
+def test_raw_counts_types():
+    """raw_counts stay integers; fractional counts are rounded there and reported separately"""
+    builder = ObservationBuilder(3)
+    obs = builder.build_observation(np.array([1.4, 2.0, 0.2], dtype=np.float32), raw_counts=np.array([1, 2, 0]))
+    assert obs['raw_counts'] == [1, 2, 0] and all(type(c) is int for c in obs['raw_counts'])
+    assert 'raw_counts_fractional' not in obs
+    
+    obs = builder.build_observation(np.zeros(3), raw_counts=np.array([1.6, 0.4, 2.0], dtype=np.float32))
+    assert obs['raw_counts'] == [2, 0, 2]
+    assert np.allclose(obs['raw_counts_fractional'], [1.6, 0.4, 2.0])
+    logger.success("Raw count types work")
+
+
+if __name__ == "__main__":
+    test_layout()
+    test_feature_blocks()
+    test_frame_stack()
+    test_raw_counts_types()
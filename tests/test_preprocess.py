@@ -0,0 +1,67 @@
+"""
+Test ingest-time letterbox preprocessing and the mapping of boxes back to the frame
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.preprocess import LetterboxPreprocessor
+from loguru import logger
+
+
+def test_letterbox_tensor():
+    """Resize keeps the aspect ratio, padding goes to the next stride multiple, channels are RGB in [0, 1]"""
+    preprocessor = LetterboxPreprocessor(image_size=320, stride=32)
+    image = np.empty((480, 640, 3), dtype=np.uint8)
+    image[:] = (10, 20, 30)  # BGR
+    tensor, meta = preprocessor(image)
+    
+    assert tensor.shape == (1, 3, 256, 320) and tensor.dtype == np.float32
+    assert meta.scale == 0.5 and meta.pad == (0, 8)
+    assert meta.orig_shape == (480, 640) and meta.input_shape == (256, 320)
+    assert np.allclose(tensor[0, :, 128, 160], np.array([30, 20, 10]) / 255.0)
+    assert np.allclose(tensor[0, :, 0, 0], 114 / 255.0)  # top padding row
+    logger.success("Letterbox tensor is built correctly")
+
+
+def test_map_boxes_round_trip():
+    """Boxes mapped into the letterboxed input and back land on the original pixels"""
+    preprocessor = LetterboxPreprocessor(image_size=640)
+    _, meta = preprocessor(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    boxes = np.array([[100, 50, 300, 200], [1500, 900, 1920, 1080]], dtype=np.float32)
+    
+    letterboxed = boxes * meta.scale
+    letterboxed[:, [0, 2]] += meta.pad[0]
+    letterboxed[:, [1, 3]] += meta.pad[1]
+    assert np.allclose(meta.map_boxes_back(letterboxed), boxes, atol=1e-3)
+    
+    # Boxes reaching into the padding are clipped to the frame
+    outside = np.array([[-20, -20, 700, 700]], dtype=np.float32)
+    assert np.allclose(meta.map_boxes_back(outside), [[0, 0, 1920, 1080]])
+    logger.success("Boxes map back to the original frame")
+
+
+def test_buffers_reused():
+    """Output tensors come from a preallocated ring; an input-size change reallocates"""
+    preprocessor = LetterboxPreprocessor(image_size=320, num_buffers=2)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    first, _ = preprocessor(frame)
+    second, _ = preprocessor(frame)
+    third, _ = preprocessor(frame)
+    assert third is first and second is not first
+    
+    # A per-call input size (the SLO controller's snapshot) leaves the default alone
+    tensor, meta = preprocessor(frame, image_size=640)
+    assert tensor.shape == (1, 3, 480, 640) and meta.scale == 1.0
+    assert preprocessor.image_size == 320 and preprocessor(frame)[0].shape == (1, 3, 256, 320)
+    logger.success("Letterbox buffers are reused")
+
+
+if __name__ == "__main__":
+    test_letterbox_tensor()
+    test_map_boxes_round_trip()
+    test_buffers_reused()
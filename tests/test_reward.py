@@ -0,0 +1,67 @@
+"""
+Test the server-side reward components and weighting
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import RewardCalculator
+from loguru import logger
+
+
+PHASES = [
+    {'id': 0, 'green_lanes': [0, 1]},
+    {'id': 1, 'green_lanes': [2, 3]},
+    {'id': 2, 'green_lanes': []}
+]
+
+
+def test_components():
+    """Components are raw measurements, the reward their weighted sum"""
+    calculator = RewardCalculator(
+        4, PHASES, weights={'queue': -0.1, 'pressure': -0.5, 'throughput': 1.0, 'phase_switch': -2.0}
+    )
+    queue = np.array([3.0, 1.0, 4.0, 2.0])
+    
+    step = calculator.compute(queue, phase=0, waiting_time=6.5, vehicles_served=2)
+    assert step['components'] == {
+        'queue': 10.0, 'pressure': 2.0, 'waiting_time': 6.5, 'throughput': 2.0, 'phase_switch': 0.0
+    }
+    assert abs(step['reward'] - (-1.0 - 1.0 + 2.0)) < 1e-9
+    
+    step = calculator.compute(queue, phase=1)
+    assert step['components']['pressure'] == -2.0 and step['components']['phase_switch'] == 1.0
+    assert abs(step['reward'] - (-1.0 + 1.0 - 2.0)) < 1e-9
+    assert calculator.compute(queue, phase=2)['components']['pressure'] == 10.0
+    logger.success("Reward components work")
+
+
+def test_episode_totals():
+    """Episode totals accumulate per component and reset with the episode"""
+    calculator = RewardCalculator(4, PHASES, weights={'queue': -1.0, 'phase_switch': -1.0})
+    for phase in (0, 0, 1):
+        calculator.compute(np.ones(4), phase=phase)
+    metrics = calculator.get_metrics()
+    assert metrics['steps'] == 3 and metrics['episode_reward'] == -13.0
+    assert metrics['episode_components']['queue'] == 12.0
+    assert metrics['episode_contributions']['phase_switch'] == -1.0
+    
+    calculator.reset()
+    assert calculator.compute(np.ones(4), phase=2)['components']['phase_switch'] == 0.0
+    assert calculator.get_metrics()['steps'] == 1
+    
+    try:
+        RewardCalculator(4, PHASES, weights={'speed': 1.0})
+        raise AssertionError("unknown component should be rejected")
+    except ValueError:
+        pass
+    logger.success("Reward episode totals work")
+
+
+if __name__ == "__main__":
+    test_components()
+    test_episode_totals()
@@ -0,0 +1,141 @@
+"""
+Test ROI mapping (lane label mask lookup)
+"""
+
+import sys
+import cv2
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.roi_mapping import ROIMapper
+from loguru import logger
+
+
+LANES = [
+    {'id': 0, 'roi': [[100, 200, 300, 400]]},
+    {'id': 1, 'roi': [[50, 200, 150, 400]]},
+    {'id': 2, 'roi': [[300, 500, 500, 700], [600, 500, 700, 600]]},
+]
+
+
+def random_detections(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    corners = rng.integers(0, 800, size=(count, 2))
+    sizes = rng.integers(10, 80, size=(count, 2))
+    return [
+        Detection((int(x), int(y), int(x + w), int(y + h)), 0.9, 2, "car")
+        for (x, y), (w, h) in zip(corners, sizes)
+    ]
+
+
+def test_label_mask_matches_polygon_test():
+    """Mask lookup assigns the same lanes as the per-polygon test (lowest id wins)"""
+    mapper = ROIMapper(LANES, frame_shape=(1080, 1920))
+    detections = random_detections(500)
+    
+    expected = []
+    for det in detections:
+        lane = -1
+        for lane_id in range(mapper.num_lanes):
+            if any(cv2.pointPolygonTest(p, det.center, False) >= 0 for p in mapper.roi_polygons[lane_id]):
+                lane = lane_id
+                break
+        expected.append(lane)
+        
+    assert mapper.assign_lanes(detections).tolist() == expected
+    counts = mapper.count_vehicles_per_lane(detections)
+    assert counts.tolist() == [expected.count(i) for i in range(mapper.num_lanes)]
+    logger.success("Label mask matches polygon test")
+
+
+def test_overlap_priority_and_rebuild():
+    """Configured priority decides overlaps; the mask is rebuilt only on changes"""
+    mapper = ROIMapper(LANES)
+    overlap = [Detection((110, 290, 130, 310), 0.9, 2, "car")]
+    assert mapper.assign_lanes(overlap).tolist() == [0]
+    
+    mask = mapper.get_label_mask()
+    assert mapper.get_label_mask() is mask
+    
+    lanes = [dict(lane) for lane in LANES]
+    lanes[1]['priority'] = 1
+    mapper.set_lanes(lanes)
+    assert mapper.assign_lanes(overlap).tolist() == [1]
+    
+    mapper.set_frame_shape(1080, 1920)
+    assert mapper.get_label_mask().shape == (1080, 1920)
+    logger.success("Overlap priority and mask rebuild work")
+
+
+def test_polygons_and_exclusions():
+    """Polygon and multi-region ROIs with per-lane and global exclusion zones"""
+    lanes = [
+        {'id': 0, 'roi': [[[0, 0], [200, 0], [100, 200]], [400, 0, 500, 100]],
+         'exclude': [[90, 10, 110, 30]]},
+        {'id': 1, 'roi': [[600, 0, 800, 200]]},
+        {'id': 2, 'roi': [[1, 2, 3]]},  # malformed, ignored
+    ]
+    mapper = ROIMapper(lanes, exclusion_zones=[[[700, 150], [800, 150], [800, 200], [700, 200]]])
+    points = [(100, 50), (20, 150), (450, 50), (100, 20), (650, 50), (750, 180)]
+    detections = [Detection((x - 5, y - 5, x + 5, y + 5), 0.9, 2, "car") for x, y in points]
+    
+    assert mapper.assign_lanes(detections).tolist() == [0, -1, 0, -1, 1, -1]
+    assert mapper.roi_polygons[2] == []
+    assert mapper.point_in_roi((100, 50), 0) and not mapper.point_in_roi((100, 20), 0)
+    logger.success("Polygon ROIs and exclusion zones work")
+
+
+def test_overlap_fractions():
+    """Integral-image overlaps match a pixel count; overlap modes assign and count by box fraction"""
+    lanes = [{'id': 0, 'roi': [[0, 0, 100, 100]]}, {'id': 1, 'roi': [[100, 0, 200, 100]]}]
+    mapper = ROIMapper(lanes, frame_shape=(200, 200), assignment="max_overlap", integral_downsample=1)
+    detections = [
+        Detection((40, 40, 60, 60), 0.9, 2, "car"),      # inside lane 0
+        Detection((70, 0, 110, 100), 0.9, 2, "car"),     # mostly lane 0, partly lane 1
+        Detection((90, 150, 110, 190), 0.9, 2, "car"),   # outside both lanes
+    ]
+    
+    labels = mapper.get_label_mask()
+    expected = [
+        [np.mean(labels[y1:y2, x1:x2] == lane) for lane in range(2)]
+        for x1, y1, x2, y2 in (det.bbox for det in detections)
+    ]
+    assert np.allclose(mapper.lane_overlap(detections), expected, atol=0.02)
+    assert mapper.assign_lanes(detections).tolist() == [0, 0, -1]
+    
+    mapper.assignment = "fractional"
+    assert np.allclose(mapper.count_vehicles_per_lane(detections), np.sum(expected, axis=0), atol=0.02)
+    logger.success("Overlap fractions work")
+
+
+def test_cached_overlay():
+    """The static ROI layer is rendered once per ROI version and composited onto frames"""
+    mapper = ROIMapper(LANES, frame_shape=(1080, 1920))
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    
+    result = mapper.visualize_rois(frame)
+    overlay = mapper.get_roi_overlay(1080, 1920)
+    assert result is not frame and not frame.any()
+    assert tuple(result[300, 100]) == (255, 0, 0)  # lane 0 outline
+    
+    mapper.visualize_rois(frame, in_place=True)
+    assert mapper.get_roi_overlay(1080, 1920) is overlay and (frame == result).all()
+    
+    half = mapper.visualize_rois(np.zeros_like(frame), alpha=0.5)
+    assert abs(int(half[300, 100, 0]) - 128) <= 1
+    
+    mapper.set_lanes(LANES[:1])
+    assert mapper.get_roi_overlay(1080, 1920) is not overlay
+    logger.success("Cached ROI overlay works")
+
+
+if __name__ == "__main__":
+    test_label_mask_matches_polygon_test()
+    test_overlap_priority_and_rebuild()
+    test_polygons_and_exclusions()
+    test_overlap_fractions()
+    test_cached_overlay()
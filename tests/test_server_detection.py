@@ -0,0 +1,126 @@
+"""
+Test the server's per-frame detection sharing (detect_cached) and the RL-step
+fallback timeout (count_for_step) with a fake detector
+"""
+
+import sys
+import asyncio
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from api import server
+from yolo_detection.detect_vehicles import Detection
+from yolo_detection.detection_cache import DetectionCache
+from yolo_detection.roi_mapping import ROIMapper
+from yolo_detection.motion_gate import MotionGate
+from yolo_detection.slo_controller import LatencySLOController
+from yolo_detection.fallback_counter import FallbackCounter
+from loguru import logger
+
+
+DETECTIONS = [Detection((0, 0, 10, 10), 0.3, 2, "car"), Detection((20, 0, 30, 10), 0.9, 2, "car")]
+
+
+LANES = [
+    {'id': 0, 'roi': [[0, 0, 160, 480]]},
+    {'id': 1, 'roi': [[480, 0, 640, 480]]},
+]
+
+
+def use_fake_detector(*delays: float):
+    """
+    Replace inference with a fake taking delays[i] seconds on its i-th call
+    (0.05 s past the given ones); returns the list of calls it served
+    """
+    calls = []
+    
+    async def fake_detect_vehicles(image=None, conf=None, camera_id=None, prepared=None, tiles=None):
+        calls.append((camera_id, conf))
+        await asyncio.sleep(delays[len(calls) - 1] if len(calls) <= len(delays) else 0.05)
+        return DETECTIONS
+        
+    server.detect_vehicles = fake_detect_vehicles
+    server.system.detection_cache = DetectionCache(max_frames=4, base_conf=0.2)
+    server.system.inflight_detections = {}
+    return calls
+
+
+def test_cancelled_owner():
+    """A consumer waiting on a frame takes over its inference when the first consumer is cancelled"""
+    calls = use_fake_detector()
+    
+    async def run():
+        first = asyncio.ensure_future(server.detect_cached(None, "cam", 1, conf=0.5))
+        await asyncio.sleep(0)  # first registers the frame as in flight
+        second = asyncio.ensure_future(server.detect_cached(None, "cam", 1, conf=0.2))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await asyncio.wait_for(second, timeout=1.0)
+        assert first.cancelled()
+        return result
+        
+    assert asyncio.run(run()) == DETECTIONS
+    assert calls == [("cam", 0.2), ("cam", 0.2)]
+    assert server.system.inflight_detections == {}
+    # The takeover filled the cache
+    assert server.system.detection_cache.get("cam", 1, 0.5) == DETECTIONS[1:]
+    logger.success("Cancelled detection owner hands over to the waiter")
+
+
+def test_shared_inference():
+    """Concurrent consumers of one frame share a single inference, each at its own threshold"""
+    calls = use_fake_detector()
+    
+    async def run():
+        return await asyncio.gather(
+            server.detect_cached(None, "cam", 2, conf=0.5),
+            server.detect_cached(None, "cam", 2, conf=0.2)
+        )
+        
+    high, low = asyncio.run(run())
+    assert high == DETECTIONS[1:] and low == DETECTIONS
+    assert len(calls) == 1 and server.system.inflight_detections == {}
+    logger.success("Concurrent consumers share one inference")
+
+
+def test_step_timeout():
+    """A step abandoned after the fallback timeout fills the cache but leaves gate, SLO and last_detections alone"""
+    calls = use_fake_detector(0.2, 0.0)
+    mapper = ROIMapper(LANES, frame_shape=(480, 640))
+    server.system.detector = type("FakeDetector", (), {'confidence_threshold': 0.5})()
+    server.system.roi_mapper = mapper
+    server.system.motion_gate = MotionGate(mapper)
+    server.system.slo_controller = LatencySLOController(slo_ms=50.0, levels=[{'image_size': 640}], start_level=0)
+    server.system.fallback_counter = FallbackCounter(mapper)
+    server.system.tracker = None
+    server.system.step_lock = asyncio.Lock()
+    server.config.yolo['yolo'].setdefault('fallback', {})['max_latency_ms'] = 50.0
+    frame = np.full((480, 640, 3), 60, dtype=np.uint8)
+    
+    async def run():
+        counts, degraded = await server.count_for_step(frame, "cam", 1, None)
+        assert degraded and server.system.detector_failures == 1
+        await asyncio.sleep(0.3)  # the abandoned step finishes meanwhile
+        assert server.system.detection_cache.get("cam", 1, 0.5) == DETECTIONS[1:]
+        assert server.system.motion_gate.frames == 0
+        assert len(server.system.slo_controller._latencies) == 0
+        assert server.system.last_detections is None
+        
+        counts, degraded = await server.count_for_step(frame, "cam", 2, None)
+        assert not degraded and counts.tolist() == [1, 0]
+        assert server.system.motion_gate.frames == 1
+        assert len(server.system.slo_controller._latencies) == 1
+        assert server.system.last_detections == DETECTIONS[1:]
+        
+    asyncio.run(run())
+    assert len(calls) == 2 and server.system.detector_failures == 0
+    logger.success("Abandoned step leaves motion gate and SLO state to the next step")
+
+
+if __name__ == "__main__":
+    test_cancelled_owner()
+    test_shared_inference()
+    test_step_timeout()
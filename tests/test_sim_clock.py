@@ -0,0 +1,66 @@
+"""
+Test simulation-time phase timing
+"""
+
+import sys
+import time
+import numpy as np
+from types import SimpleNamespace
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import SimClock, StateManager
+from loguru import logger
+
+
+def snapshot(frame: int, delta: float = 0.05):
+    """Stand-in for carla.WorldSnapshot at a frame of a fixed-step simulation"""
+    return SimpleNamespace(frame=frame, timestamp=SimpleNamespace(elapsed_seconds=frame * delta))
+
+
+def test_phase_timing():
+    """Phase time and runtime count simulated seconds, however fast ticks arrive"""
+    clock = SimClock()
+    clock.sync(snapshot(100))
+    manager = StateManager(num_lanes=4, num_phases=3, clock=clock)
+    manager.set_phase(1, duration=2.0)
+    
+    for frame in range(101, 140):
+        clock.sync(snapshot(frame))
+        manager.update_state(np.zeros(4), manager.current_phase)
+    assert abs(manager.get_phase_elapsed_time() - 1.95) < 1e-9
+    assert not manager.should_change_phase()
+    
+    clock.sync(snapshot(140))
+    assert manager.should_change_phase()
+    state = manager.get_state_dict()
+    assert abs(state['episode_runtime'] - 2.0) < 1e-9 and clock.frame == 140
+    
+    manager.reset()
+    assert manager.get_state_dict()['episode_runtime'] == 0.0
+    logger.success("Simulation-time phase timing works")
+
+
+def test_realtime_factor():
+    """Throughput compares simulated seconds with wall seconds since the window start"""
+    clock = SimClock()
+    clock.sync(snapshot(0))
+    time.sleep(0.05)
+    for frame in range(1, 21):
+        clock.sync(snapshot(frame))
+    metrics = clock.get_metrics()
+    assert metrics['sim_seconds'] == 1.0 and metrics['ticks'] == 21
+    assert 1.0 < metrics['realtime_factor'] < 20.0 and metrics['ticks_per_second'] > 0
+    
+    clock.restart_measurement()
+    assert clock.get_metrics()['sim_seconds'] == 0.0
+    clock.sync(snapshot(21))
+    assert clock.get_metrics()['sim_seconds'] == 0.0 and clock.ticks == 22
+    logger.success("Realtime factor measurement works")
+
+
+if __name__ == "__main__":
+    test_phase_timing()
+    test_realtime_factor()
@@ -0,0 +1,66 @@
+"""
+Test the latency SLO controller (p90 hysteresis between levels, stride)
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from yolo_detection.slo_controller import LatencySLOController
+from loguru import logger
+
+
+LEVELS = [
+    {'image_size': 640, 'tiling': [2, 2]},
+    {'image_size': 640},
+    {'image_size': 320},
+    {'image_size': 320, 'stride': 2}
+]
+
+
+def test_level_transitions():
+    """Degrade on p90 over high water, hold in the hysteresis band, upgrade after sustained headroom"""
+    controller = LatencySLOController(
+        slo_ms=50.0, levels=LEVELS, start_level=1, window=8, upgrade_patience=5
+    )
+    assert controller.tiling is None and controller.image_size == 640
+    
+    # One or two slow samples are not a trend
+    assert not controller.observe(60.0) and not controller.observe(60.0)
+    assert controller.observe(60.0)
+    assert controller.level == 2 and controller.image_size == 320
+    assert controller.transitions[-1]['reason'] == "latency"
+    
+    # Between low water (25 ms) and high water (45 ms) nothing changes
+    assert not any(controller.observe(35.0) for _ in range(20))
+    assert controller.level == 2
+    
+    # Headroom counts once the window's p90 is under low water (7th fast sample),
+    # and upgrades one level after upgrade_patience such samples
+    changed = [controller.observe(10.0) for _ in range(11)]
+    assert changed == [False] * 10 + [True] and controller.level == 1
+    
+    # A backed-up queue degrades immediately, but never past the last level
+    assert controller.observe(10.0, queue_depth=10) and controller.level == 2
+    assert controller.observe(10.0, queue_depth=10) and controller.level == 3
+    assert not controller.observe(10.0, queue_depth=10) and controller.level == 3
+    assert controller.get_metrics()['total_transitions'] == 4
+    logger.success("SLO level transitions work")
+
+
+def test_stride():
+    """Strided levels run detection on every stride-th step only"""
+    controller = LatencySLOController(levels=LEVELS, start_level=3)
+    assert [controller.should_infer() for _ in range(6)] == [True, False, True, False, True, False]
+    
+    controller = LatencySLOController(levels=LEVELS, start_level=0)
+    assert all(controller.should_infer() for _ in range(4))
+    assert controller.tiling == (2, 2)
+    logger.success("SLO stride works")
+
+
+if __name__ == "__main__":
+    test_level_transitions()
+    test_stride()
@@ -0,0 +1,88 @@
+"""
+Test vehicle count smoothing filters
+"""
+
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sensing_pipeline import VehicleCounter, ObservationBuilder
+from loguru import logger
+
+
+FRAMES = np.array([
+    [3, 5, 2, 0],
+    [4, 5, 2, 0],
+    [3, 6, 9, 1],
+    [5, 6, 2, 1],
+], dtype=np.float32)
+
+
+def test_window_filters():
+    """Mean and median run over the ring buffer and keep fractional values"""
+    mean = VehicleCounter(4, smoothing_window=3, smoothing_filter="mean")
+    median = VehicleCounter(4, smoothing_window=3, smoothing_filter="median")
+    for frame in FRAMES:
+        smoothed_mean = mean.update(frame)
+        smoothed_median = median.update(frame)
+        
+    assert smoothed_mean.dtype == np.float32
+    assert np.allclose(smoothed_mean, FRAMES[1:].mean(axis=0))
+    assert np.allclose(smoothed_median, np.median(FRAMES[1:], axis=0))
+    assert median.get_lane_count(2) == 2.0  # the outlier 9 is rejected
+    logger.success("Mean and median filters work")
+
+
+def test_recursive_filters():
+    """EMA follows its recursion; the Kalman variance shrinks towards steady state"""
+    ema = VehicleCounter(4, smoothing_filter="ema", ema_alpha=0.5)
+    expected = FRAMES[0]
+    ema.update(FRAMES[0])
+    for frame in FRAMES[1:]:
+        expected = expected + 0.5 * (frame - expected)
+        smoothed = ema.update(frame)
+    assert np.allclose(smoothed, expected)
+    
+    kalman = VehicleCounter(4, smoothing_filter="kalman", process_noise=0.1, measurement_noise=1.0)
+    variances = []
+    for _ in range(20):
+        kalman.update(np.array([2, 2, 2, 2]))
+        variances.append(float(kalman.get_variance()[0]))
+    assert variances[0] == 1.0 and variances[-1] < variances[1] < variances[0]
+    assert np.allclose(kalman.get_counts(), 2.0)
+    logger.success("EMA and Kalman filters work")
+
+
+def test_raw_counts_reported():
+    """The observation is built from smoothed counts but reports the raw ones"""
+    counter = VehicleCounter(4, smoothing_window=2)
+    counter.update(FRAMES[0])
+    smoothed = counter.update(FRAMES[1])
+    obs = ObservationBuilder(4).build_observation(smoothed, raw_counts=FRAMES[1])
+    assert obs['raw_counts'] == FRAMES[1].tolist()
+    assert np.allclose(obs['observation'], smoothed / 20.0)
+    logger.success("Raw and smoothed counts are kept apart")
+
+
+def test_update_cost():
+    """Update cost stays flat for hundreds of lanes"""
+    for smoothing_filter in ("mean", "median", "ema", "kalman"):
+        counter = VehicleCounter(512, smoothing_window=10, smoothing_filter=smoothing_filter)
+        counts = np.random.default_rng(0).poisson(4, size=(200, 512))
+        start = time.perf_counter()
+        for frame in counts:
+            counter.update(frame)
+        per_update_ms = (time.perf_counter() - start) * 1000.0 / len(counts)
+        logger.info(f"{smoothing_filter}: {per_update_ms:.3f} ms per update (512 lanes)")
+        assert per_update_ms < 5.0
+
+
+if __name__ == "__main__":
+    test_window_filters()
+    test_recursive_filters()
+    test_raw_counts_reported()
+    test_update_cost()
@@ -6,5 +6,16 @@ Vehicle detection using YOLOv8/v10
 from .detect_vehicles import VehicleDetector
 from .roi_mapping import ROIMapper
 from .dataset_generator import DatasetGenerator
+from .inference_server import InferenceServer
+from .preprocess import LetterboxPreprocessor
+from .slo_controller import LatencySLOController
+from .detection_cache import DetectionCache
+from .motion_gate import MotionGate
+from .fallback_counter import FallbackCounter
+from .tracker import VehicleTracker
 
-__all__ = ['VehicleDetector', 'ROIMapper', 'DatasetGenerator']
+__all__ = [
+    'VehicleDetector', 'ROIMapper', 'DatasetGenerator',
+    'InferenceServer', 'LetterboxPreprocessor', 'LatencySLOController', 'DetectionCache',
+    'MotionGate', 'FallbackCounter', 'VehicleTracker'
+]
@@ -3,11 +3,14 @@ Vehicle Detector using YOLO (ultralytics)
 """
 
 import cv2
+import time
 import numpy as np
 from ultralytics import YOLO
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict
 from loguru import logger
 
+from .preprocess import LetterboxMeta
+
 
 class Detection:
     """Represents a single vehicle detection"""
@@ -36,7 +39,9 @@ class VehicleDetector:
         confidence_threshold: float = 0.5,
         iou_threshold: float = 0.45,
         target_classes: List[int] = None,
-        device: str = "cuda"
+        device: str = "cuda",
+        fuse: bool = False,
+        half: bool = False
     ):
         """
         Initialize YOLO vehicle detector
@@ -47,17 +52,32 @@ class VehicleDetector:
             iou_threshold: NMS IOU threshold
             target_classes: List of class IDs to detect (default: [2,3,5,7] = vehicles)
             device: 'cuda' or 'cpu'
+            fuse: Fuse Conv2d + BatchNorm layers after loading
+            half: Run inference in FP16 (ignored unless the device is a CUDA GPU)
         """
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
         self.target_classes = target_classes or [2, 3, 5, 7]  # car, motorcycle, bus, truck
         self.device = device
+        self.half = False
+        self.image_size = 640  # Inference size; the SLO controller may change it at runtime
+        
+        # Load-time optimization timings (see warmup() and get_load_report())
+        self.load_report: Dict = {'model_path': model_path, 'device': device}
         
         logger.info(f"Loading YOLO model: {model_path}")
+        start = time.perf_counter()
         self.model = YOLO(model_path)
         self.model.to(device)
+        self.load_report['load_time_s'] = time.perf_counter() - start
+        
+        logger.success(f"YOLO model loaded on {device} ({self.load_report['load_time_s']:.2f}s)")
         
-        logger.success(f"YOLO model loaded on {device}")
+        if fuse:
+            self._fuse_layers()
+        if half:
+            self._enable_half_precision()
+        self.load_report['half'] = self.half
         
         # COCO class names
         self.class_names = {
@@ -66,12 +86,335 @@ class VehicleDetector:
             5: "bus",
             7: "truck"
         }
+        
+        # Reused across annotate() calls to avoid a full-frame allocation per frame
+        self._annotation_buffer: Optional[np.ndarray] = None
+        
+        # Two-stage cascade (see enable_cascade()); None runs this model alone
+        self.cascade: Optional[Dict] = None
+        self.refine_model = None
+        self.cascade_stats = {'frames': 0, 'triggered_frames': 0, 'crops': 0, 'refine_time_s': 0.0}
+    
+    def _fuse_layers(self):
+        """Fuse Conv2d + BatchNorm2d layers (fewer kernels per forward pass)"""
+        start = time.perf_counter()
+        try:
+            self.model.fuse()
+            self.load_report['fused'] = True
+        except Exception as e:
+            logger.warning(f"Layer fusion not supported for this model: {e}")
+            self.load_report['fused'] = False
+        self.load_report['fuse_time_s'] = time.perf_counter() - start
+    
+    def _enable_half_precision(self):
+        """Use FP16 inference when the device supports it"""
+        if not str(self.device).startswith("cuda"):
+            logger.info("Half precision requested but device is not CUDA - staying in FP32")
+            return
+        
+        import torch
+        if not torch.cuda.is_available():
+            logger.warning("Half precision requested but CUDA is not available - staying in FP32")
+            return
+        
+        self.half = True
+        logger.info("Half precision (FP16) inference enabled")
+    
+    def warmup(
+        self,
+        image_shape: Tuple[int, int] = (1080, 1920),
+        runs: int = 3,
+        batch_size: int = 1,
+        preprocessor=None,
+        levels: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Run dummy inferences so CUDA kernels, cuDNN autotuning and memory pools
+        are initialized before the first real request
+        
+        Args:
+            image_shape: (height, width) of the camera frames
+            runs: Number of warmup iterations per input path
+            batch_size: Largest batch size to warm up (e.g. the batching server limit)
+            preprocessor: Optional LetterboxPreprocessor to warm up the preprocessed path too
+            levels: Inference settings the detector may switch to at runtime
+                ({image_size, tiling}, e.g. the SLO controller's levels); every
+                image size and tiled setting is warmed up. Default: the current image_size
+                
+        Returns:
+            The updated load report
+        """
+        if runs <= 0:
+            return self.load_report
+        
+        dummy = np.zeros((image_shape[0], image_shape[1], 3), dtype=np.uint8)
+        image_sizes = sorted({level['image_size'] for level in levels}) if levels else [self.image_size]
+        tiled = sorted({(level['image_size'], tuple(level['tiling'])) for level in levels or [] if level.get('tiling')})
+        original_size = self.image_size
+        start = time.perf_counter()
+        
+        try:
+            for _ in range(runs):
+                for image_size in image_sizes:
+                    self.image_size = image_size
+                    self.detect(dummy)
+                    if batch_size > 1:
+                        self.batch_detect([dummy] * batch_size)
+                    if preprocessor is not None:
+                        tensor, meta = preprocessor(dummy, image_size=image_size)
+                        self.detect_preprocessed(tensor, meta)
+                for image_size, tiles in tiled:
+                    self.detect_tiled(dummy, tiles, imgsz=image_size)
+                if self.cascade is not None:
+                    crop_size = self.cascade['crop_size']
+                    crops = [dummy[:crop_size, :crop_size]] * self.cascade['max_crops']
+                    list(self.refine_model.predict(
+                        crops, verbose=False, device=self.device, half=self.half, imgsz=crop_size, stream=True
+                    ))
+        finally:
+            self.image_size = original_size
+        
+        self.load_report['warmup_runs'] = runs
+        self.load_report['warmup_batch_size'] = batch_size
+        self.load_report['warmup_shape'] = list(image_shape)
+        self.load_report['warmup_image_sizes'] = image_sizes
+        self.load_report['warmup_tilings'] = [[size, list(tiles)] for size, tiles in tiled]
+        self.load_report['warmup_time_s'] = time.perf_counter() - start
+        
+        # Steady-state latency right after warmup (what the first real request should see)
+        start = time.perf_counter()
+        self.detect(dummy)
+        self.load_report['post_warmup_latency_ms'] = (time.perf_counter() - start) * 1000.0
+        
+        logger.success(
+            f"Detector warmed up: {runs} runs over sizes {image_sizes}"
+            + (f" and {len(tiled)} tiled settings" if tiled else "")
+            + f" in {self.load_report['warmup_time_s']:.2f}s, "
+            f"steady-state latency {self.load_report['post_warmup_latency_ms']:.1f}ms"
+        )
+        return self.load_report
+    
+    def enable_cascade(
+        self,
+        refine_model_path: str = "yolov8m.pt",
+        low_confidence: float = 0.15,
+        high_confidence: Optional[float] = None,
+        crowd_iou: float = 0.3,
+        crop_size: int = 320,
+        context: float = 0.5,
+        max_crops: int = 8
+    ):
+        """
+        Re-examine uncertain regions of each frame with a larger model
+        
+        This model stays the first stage on the full frame. Boxes it scores in
+        [low_confidence, high_confidence) or that overlap a neighbour by more
+        than crowd_iou are cropped (with context) and re-detected by the
+        refine model in one batch; its detections replace the first stage's
+        inside those crops.
+        
+        Args:
+            refine_model_path: Weights of the second-stage model
+            low_confidence: Lowest first-stage score that can trigger a crop
+            high_confidence: First-stage score above which a box is trusted
+                (default: confidence_threshold)
+            crowd_iou: IoU with another box above which a box counts as crowded
+            crop_size: Minimum crop side and second-stage inference size
+            context: Extra margin around a box, as a fraction of its size per side
+            max_crops: Maximum crops per frame (least confident boxes first)
+        """
+        logger.info(f"Loading cascade refine model: {refine_model_path}")
+        start = time.perf_counter()
+        self.refine_model = YOLO(refine_model_path)
+        self.refine_model.to(self.device)
+        if self.load_report.get('fused'):
+            try:
+                self.refine_model.fuse()
+            except Exception as e:
+                logger.warning(f"Layer fusion not supported for the refine model: {e}")
+        
+        self.cascade = {
+            'refine_model_path': refine_model_path,
+            'low_confidence': low_confidence,
+            'high_confidence': high_confidence if high_confidence is not None else self.confidence_threshold,
+            'crowd_iou': crowd_iou,
+            'crop_size': crop_size,
+            'context': context,
+            'max_crops': max_crops
+        }
+        self.load_report['cascade_load_time_s'] = time.perf_counter() - start
+        logger.success(f"Cascade enabled ({self.load_report['cascade_load_time_s']:.2f}s)")
+    
+    def stage1_conf(self, conf: Optional[float] = None) -> float:
+        """
+        Confidence threshold the first stage must run at so the cascade
+        sees its uncertain boxes
+        
+        Args:
+            conf: Final confidence threshold requested by the caller
+            
+        Returns:
+            Threshold for the first-stage predict call
+        """
+        conf = conf if conf is not None else self.confidence_threshold
+        if self.cascade is None:
+            return conf
+        return min(conf, self.cascade['low_confidence'])
+    
+    def _cascade_regions(self, detections: List[Detection], height: int, width: int) -> np.ndarray:
+        """
+        Select crops around uncertain or crowded first-stage boxes
+        
+        Returns:
+            (N, 4) int array of xyxy crop regions
+        """
+        if not detections:
+            return np.zeros((0, 4), dtype=np.int64)
+        cfg = self.cascade
+        boxes = np.array([d.bbox for d in detections], dtype=np.float32)
+        scores = np.array([d.confidence for d in detections], dtype=np.float32)
+        
+        ious = iou_matrix(boxes, boxes)
+        np.fill_diagonal(ious, 0.0)
+        uncertain = (scores >= cfg['low_confidence']) & (scores < cfg['high_confidence'])
+        crowded = ious.max(axis=1) > cfg['crowd_iou']
+        triggers = np.flatnonzero(uncertain | crowded)
+        
+        regions = []
+        for i in triggers[np.argsort(scores[triggers])]:
+            x1, y1, x2, y2 = boxes[i]
+            if any(rx1 <= x1 and ry1 <= y1 and x2 <= rx2 and y2 <= ry2 for rx1, ry1, rx2, ry2 in regions):
+                continue  # Already covered by a previous crop
+            side = max(cfg['crop_size'], max(x2 - x1, y2 - y1) * (1 + 2 * cfg['context']))
+            side = min(side, width, height)
+            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+            rx1 = int(np.clip(cx - side / 2, 0, width - side))
+            ry1 = int(np.clip(cy - side / 2, 0, height - side))
+            regions.append((rx1, ry1, rx1 + int(side), ry1 + int(side)))
+            if len(regions) >= cfg['max_crops']:
+                break
+        
+        return np.array(regions, dtype=np.int64).reshape(-1, 4)
+    
+    def refine_batch(
+        self,
+        images: List[np.ndarray],
+        detections: List[List[Detection]],
+        conf_override: Optional[float] = None
+    ) -> List[List[Detection]]:
+        """
+        Second cascade stage for a batch of frames: crops of all frames go
+        through the refine model in one predict call
+        
+        Args:
+            images: Full frames
+            detections: First-stage detections per frame, produced at stage1_conf()
+            conf_override: Final confidence threshold
+            
+        Returns:
+            Merged detections per frame (same Detection format), filtered at the final threshold
+        """
+        conf = conf_override if conf_override is not None else self.confidence_threshold
+        if self.cascade is None:
+            return [filter_detections(dets, conf) for dets in detections]
+        
+        start = time.perf_counter()
+        regions = [self._cascade_regions(dets, *image.shape[:2]) for image, dets in zip(images, detections)]
+        crops, owners = [], []
+        for index, (image, frame_regions) in enumerate(zip(images, regions)):
+            for x1, y1, x2, y2 in frame_regions:
+                crops.append(image[y1:y2, x1:x2])
+                owners.append((index, int(x1), int(y1)))
+        
+        refined = [[] for _ in images]
+        if crops:
+            results = self.refine_model.predict(
+                crops,
+                conf=conf,
+                iou=self.iou_threshold,
+                classes=self.target_classes,
+                verbose=False,
+                device=self.device,
+                half=self.half,
+                imgsz=self.cascade['crop_size'],
+                stream=True
+            )
+            for (index, x0, y0), result in zip(owners, results):
+                refined[index].extend(offset_detections(self._parse_result(result), x0, y0))
+        
+        merged = []
+        for dets, frame_regions, frame_refined in zip(detections, regions, refined):
+            if len(frame_regions) == 0:
+                merged.append(filter_detections(dets, conf))
+                continue
+            # The refine model is authoritative inside its crops
+            kept = []
+            for det in dets:
+                cx, cy = det.center
+                inside = (
+                    (frame_regions[:, 0] <= cx) & (cx < frame_regions[:, 2]) &
+                    (frame_regions[:, 1] <= cy) & (cy < frame_regions[:, 3])
+                )
+                if det.confidence >= conf and not inside.any():
+                    kept.append(det)
+            merged.append(merge_detections(kept + frame_refined, self.iou_threshold))
+        
+        stats = self.cascade_stats
+        stats['frames'] += len(images)
+        stats['triggered_frames'] += sum(1 for frame_regions in regions if len(frame_regions))
+        stats['crops'] += len(crops)
+        stats['refine_time_s'] += time.perf_counter() - start
+        return merged
+    
+    def detect_cascade(
+        self,
+        image: np.ndarray,
+        conf_override: Optional[float] = None,
+        imgsz: Optional[int] = None
+    ) -> List[Detection]:
+        """
+        Full cascade on one frame (first stage on the frame, refine model on uncertain crops)
+        
+        Args:
+            image: Input image (H, W, 3)
+            conf_override: Optional final confidence threshold
+            imgsz: Optional first-stage inference size
+            
+        Returns:
+            List of detections
+        """
+        detections, _ = self.detect(image, conf_override=self.stage1_conf(conf_override), imgsz=imgsz)
+        return self.refine_batch([image], [detections], conf_override)[0]
+    
+    def get_cascade_metrics(self) -> Optional[Dict]:
+        """
+        Get cascade trigger rate and second-stage latency
+        
+        Returns:
+            Metrics dictionary, or None when the cascade is disabled
+        """
+        if self.cascade is None:
+            return None
+        stats = self.cascade_stats
+        frames = max(1, stats['frames'])
+        return {
+            **self.cascade,
+            'frames': stats['frames'],
+            'trigger_rate': stats['triggered_frames'] / frames,
+            'crops_per_frame': stats['crops'] / frames,
+            'avg_refine_ms': stats['refine_time_s'] / frames * 1000.0
+        }
+    
+    def get_load_report(self) -> Dict:
+        """Get load, fusion and warmup timings"""
+        return dict(self.load_report)
     
     def detect(
         self,
         image: np.ndarray,
         visualize: bool = False,
-        conf_override: Optional[float] = None
+        conf_override: Optional[float] = None,
+        imgsz: Optional[int] = None
     ) -> Tuple[List[Detection], Optional[np.ndarray]]:
         """
         Detect vehicles in image
@@ -80,6 +423,7 @@ class VehicleDetector:
             image: Input image as numpy array (H, W, 3)
             visualize: If True, return annotated image with boxes
             conf_override: Optional lower confidence for display (see more detections)
+            imgsz: Optional inference size (default: detector image_size)
             
         Returns:
             Tuple of (detections list, annotated image or None)
@@ -91,35 +435,127 @@ class VehicleDetector:
             iou=self.iou_threshold,
             classes=self.target_classes,
             verbose=False,
-            device=self.device
+            device=self.device,
+            half=self.half,
+            imgsz=imgsz or self.image_size
         )
         
-        detections = []
-        result = results[0]
-        
-        if result.boxes is not None:
-            boxes = result.boxes.xyxy.cpu().numpy()
-            confidences = result.boxes.conf.cpu().numpy()
-            class_ids = result.boxes.cls.cpu().numpy().astype(int)
-            
-            for box, conf, cls_id in zip(boxes, confidences, class_ids):
-                x1, y1, x2, y2 = map(int, box)
-                class_name = self.class_names.get(cls_id, f"class_{cls_id}")
-                
-                detection = Detection(
-                    bbox=(x1, y1, x2, y2),
-                    confidence=float(conf),
-                    class_id=cls_id,
-                    class_name=class_name
-                )
-                detections.append(detection)
+        detections = self._parse_result(results[0])
         
         annotated_image = None
         if visualize:
-            annotated_image = self._draw_detections(image.copy(), detections)
+            annotated_image = self.annotate(image, detections)
         
         return detections, annotated_image
     
+    def annotate(self, image: np.ndarray, detections: List[Detection]) -> np.ndarray:
+        """
+        Draw detections on a copy of the image
+        
+        The copy lives in a buffer owned by the detector and is overwritten by
+        the next call, so encode or copy the result before annotating again.
+        
+        Args:
+            image: Input image
+            detections: Detections to draw (e.g. from batch_detect)
+            
+        Returns:
+            Annotated image
+        """
+        buffer = self._annotation_buffer
+        if buffer is None or buffer.shape != image.shape or buffer.dtype != image.dtype:
+            buffer = np.empty_like(image)
+            self._annotation_buffer = buffer
+        np.copyto(buffer, image)
+        return self._draw_detections(buffer, detections)
+    
+    def detect_preprocessed(
+        self,
+        tensor: np.ndarray,
+        meta: LetterboxMeta,
+        conf_override: Optional[float] = None
+    ) -> List[Detection]:
+        """
+        Detect vehicles in a frame already letterboxed at ingest time
+        (see LetterboxPreprocessor), skipping preprocessing on the request path
+        
+        Args:
+            tensor: (1, 3, h, w) float32 RGB tensor in [0, 1]
+            meta: Letterbox metadata used to map boxes back to the frame
+            conf_override: Optional confidence threshold
+            
+        Returns:
+            List of detections in original frame coordinates
+        """
+        return self.batch_detect_preprocessed([tensor], [meta], conf_override)[0]
+    
+    def batch_detect_preprocessed(
+        self,
+        tensors: List[np.ndarray],
+        metas: List[LetterboxMeta],
+        conf_override: Optional[float] = None
+    ) -> List[List[Detection]]:
+        """
+        Batch version of detect_preprocessed (all tensors must share a shape)
+        
+        Args:
+            tensors: List of (1, 3, h, w) float32 tensors
+            metas: Letterbox metadata per tensor
+            conf_override: Optional confidence threshold for the whole batch
+            
+        Returns:
+            List of detection lists in original frame coordinates
+        """
+        import torch
+        
+        batch = tensors[0] if len(tensors) == 1 else np.concatenate(tensors, axis=0)
+        conf = conf_override if conf_override is not None else self.confidence_threshold
+        results = self.model.predict(
+            torch.from_numpy(batch),
+            conf=conf,
+            iou=self.iou_threshold,
+            classes=self.target_classes,
+            verbose=False,
+            device=self.device,
+            half=self.half
+        )
+        
+        return [self._parse_result(result, meta) for result, meta in zip(results, metas)]
+    
+    def _parse_result(self, result, meta: Optional[LetterboxMeta] = None) -> List[Detection]:
+        """
+        Convert one ultralytics result into Detection objects
+        
+        Args:
+            result: Single ultralytics Results object
+            meta: Letterbox metadata when the input was a preprocessed tensor
+            
+        Returns:
+            List of detections
+        """
+        detections = []
+        if result.boxes is None:
+            return detections
+        
+        boxes = result.boxes.xyxy.cpu().numpy()
+        if meta is not None:
+            boxes = meta.map_boxes_back(boxes)
+        confidences = result.boxes.conf.cpu().numpy()
+        class_ids = result.boxes.cls.cpu().numpy().astype(int)
+        
+        for box, conf, cls_id in zip(boxes, confidences, class_ids):
+            x1, y1, x2, y2 = map(int, box)
+            class_name = self.class_names.get(cls_id, f"class_{cls_id}")
+            
+            detections.append(Detection(
+                bbox=(x1, y1, x2, y2),
+                confidence=float(conf),
+                class_id=cls_id,
+                class_name=class_name
+            ))
+        
+        return detections
+    
     def _draw_detections(self, image: np.ndarray, detections: List[Detection]) -> np.ndarray:
         """
         Draw bounding boxes on image
@@ -175,49 +611,166 @@ class VehicleDetector:
         
         return image
     
-    def batch_detect(self, images: List[np.ndarray]) -> List[List[Detection]]:
+    def batch_detect(
+        self,
+        images: List[np.ndarray],
+        conf_override: Optional[float] = None,
+        imgsz: Optional[int] = None
+    ) -> List[List[Detection]]:
         """
         Detect vehicles in multiple images (batch processing)
         
         Args:
             images: List of images
+            conf_override: Optional confidence threshold for the whole batch
+            imgsz: Optional inference size (default: detector image_size)
             
         Returns:
             List of detection lists
         """
+        conf = conf_override if conf_override is not None else self.confidence_threshold
         results = self.model.predict(
             images,
-            conf=self.confidence_threshold,
+            conf=conf,
             iou=self.iou_threshold,
             classes=self.target_classes,
             verbose=False,
             device=self.device,
+            half=self.half,
+            imgsz=imgsz or self.image_size,
             stream=True
         )
         
-        all_detections = []
-        for result in results:
-            detections = []
-            if result.boxes is not None:
-                boxes = result.boxes.xyxy.cpu().numpy()
-                confidences = result.boxes.conf.cpu().numpy()
-                class_ids = result.boxes.cls.cpu().numpy().astype(int)
-                
-                for box, conf, cls_id in zip(boxes, confidences, class_ids):
-                    x1, y1, x2, y2 = map(int, box)
-                    class_name = self.class_names.get(cls_id, f"class_{cls_id}")
-                    
-                    detection = Detection(
-                        bbox=(x1, y1, x2, y2),
-                        confidence=float(conf),
-                        class_id=cls_id,
-                        class_name=class_name
-                    )
-                    detections.append(detection)
+        return [self._parse_result(result) for result in results]
+    
+    def detect_tiled(
+        self,
+        image: np.ndarray,
+        tiles: Tuple[int, int] = (2, 2),
+        overlap: float = 0.1,
+        conf_override: Optional[float] = None,
+        imgsz: Optional[int] = None
+    ) -> List[Detection]:
+        """
+        Detect vehicles on overlapping tiles of the frame (one batched predict),
+        which keeps small far-away vehicles visible at a given inference size
+        
+        Args:
+            image: Input image (H, W, 3)
+            tiles: Tile grid as (rows, cols)
+            overlap: Fraction of a tile shared with its neighbour
+            conf_override: Optional confidence threshold
+            imgsz: Optional inference size per tile
             
-            all_detections.append(detections)
+        Returns:
+            Merged detections in frame coordinates
+        """
+        rows, cols = tiles
+        height, width = image.shape[:2]
+        tile_h = int(np.ceil(height / (rows - (rows - 1) * overlap)))
+        tile_w = int(np.ceil(width / (cols - (cols - 1) * overlap)))
+        step_y = int(tile_h * (1 - overlap))
+        step_x = int(tile_w * (1 - overlap))
+        
+        crops, offsets = [], []
+        for r in range(rows):
+            for c in range(cols):
+                y0 = min(r * step_y, max(0, height - tile_h))
+                x0 = min(c * step_x, max(0, width - tile_w))
+                crops.append(image[y0:y0 + tile_h, x0:x0 + tile_w])
+                offsets.append((x0, y0))
+        
+        per_tile = self.batch_detect(crops, conf_override=conf_override, imgsz=imgsz)
+        
+        detections = []
+        for (x0, y0), tile_detections in zip(offsets, per_tile):
+            detections.extend(offset_detections(tile_detections, x0, y0))
+        
+        return merge_detections(detections, self.iou_threshold)
+
+
+def offset_detections(detections: List[Detection], x0: int, y0: int) -> List[Detection]:
+    """
+    Shift detections from crop coordinates to frame coordinates
+    
+    Args:
+        detections: Detections found on a crop
+        x0: Crop left edge in the frame
+        y0: Crop top edge in the frame
+        
+    Returns:
+        Detections in frame coordinates
+    """
+    shifted = []
+    for det in detections:
+        x1, y1, x2, y2 = det.bbox
+        shifted.append(Detection(
+            bbox=(x1 + x0, y1 + y0, x2 + x0, y2 + y0),
+            confidence=det.confidence,
+            class_id=det.class_id,
+            class_name=det.class_name
+        ))
+    return shifted
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of xyxy boxes
+    
+    Args:
+        boxes_a: (N, 4) boxes
+        boxes_b: (M, 4) boxes
+        
+    Returns:
+        (N, M) IoU matrix
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+
+def filter_detections(detections: List[Detection], conf: float) -> List[Detection]:
+    """
+    Keep only detections at or above a confidence threshold
+    
+    Args:
+        detections: Detections produced at a lower (or equal) threshold
+        conf: Confidence cutoff to apply
+        
+    Returns:
+        Filtered list of detections
+    """
+    if not detections:
+        return []
+    confidences = np.fromiter((d.confidence for d in detections), dtype=np.float32, count=len(detections))
+    return [detections[i] for i in np.flatnonzero(confidences >= conf)]
+
+
+def merge_detections(detections: List[Detection], iou_threshold: float = 0.45) -> List[Detection]:
+    """
+    Class-agnostic NMS over detections gathered from several crops or tiles
+    
+    Args:
+        detections: Detections in common frame coordinates
+        iou_threshold: Overlap above which the lower-confidence box is dropped
         
-        return all_detections
+    Returns:
+        Deduplicated detections
+    """
+    if len(detections) < 2:
+        return list(detections)
+    boxes = [[d.bbox[0], d.bbox[1], d.bbox[2] - d.bbox[0], d.bbox[3] - d.bbox[1]] for d in detections]
+    scores = [d.confidence for d in detections]
+    keep = cv2.dnn.NMSBoxes(boxes, scores, 0.0, iou_threshold)
+    return [detections[i] for i in np.asarray(keep, dtype=np.int64).reshape(-1)]
 
 
 if __name__ == "__main__":
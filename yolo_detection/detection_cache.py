@@ -0,0 +1,112 @@
+"""
+Detection Cache - Shares detections of a camera frame across endpoints
+"""
+
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+
+from .detect_vehicles import Detection
+
+
+class DetectionCache:
+    """
+    Bounded LRU cache of detections keyed by (camera_id, frame_id).
+    
+    Entries hold the low-threshold (base_conf) detections of a frame; each
+    consumer applies its own confidence cutoff as a numpy filter instead of
+    re-running inference on identical pixels.
+    """
+    
+    def __init__(self, max_frames: int = 16, base_conf: float = 0.2):
+        """
+        Initialize detection cache
+        
+        Args:
+            max_frames: Maximum number of frames kept (oldest evicted first)
+            base_conf: Confidence threshold detections should be computed at before caching
+        """
+        self.max_frames = max(1, int(max_frames))
+        self.base_conf = base_conf
+        
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[List[Detection], np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        logger.info(f"Detection cache initialized: {self.max_frames} frames, base_conf={base_conf}")
+    
+    def get(self, camera_id: str, frame_id: int, conf: float) -> Optional[List[Detection]]:
+        """
+        Look up the detections of a frame at a confidence cutoff
+        
+        Args:
+            camera_id: Camera identifier
+            frame_id: Simulator frame number
+            conf: Confidence cutoff requested by the consumer
+            
+        Returns:
+            Filtered detections, or None on a miss (also when the cached entry
+            was computed at a higher threshold than requested)
+        """
+        key = (camera_id, frame_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] > conf:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            
+        detections, confidences, _ = entry
+        if not detections:
+            return []
+        return [detections[i] for i in np.flatnonzero(confidences >= conf)]
+    
+    def put(self, camera_id: str, frame_id: int, detections: List[Detection], conf: float):
+        """
+        Store the detections of a frame
+        
+        Args:
+            camera_id: Camera identifier
+            frame_id: Simulator frame number
+            detections: Detections computed at threshold conf
+            conf: Threshold the detections were computed at
+        """
+        confidences = np.fromiter(
+            (d.confidence for d in detections), dtype=np.float32, count=len(detections)
+        )
+        with self._lock:
+            self._entries[(camera_id, frame_id)] = (detections, confidences, conf)
+            self._entries.move_to_end((camera_id, frame_id))
+            while len(self._entries) > self.max_frames:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached frames"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get cache hit-rate metrics
+        
+        Returns:
+            Metrics dictionary
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_frames': self.max_frames,
+                'base_conf': self.base_conf,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
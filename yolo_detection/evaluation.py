@@ -0,0 +1,203 @@
+"""
+Detection Evaluation - mAP, per-lane count error and Pareto fronts
+for labeled frames produced by DatasetGenerator
+"""
+
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+from .detect_vehicles import Detection, iou_matrix
+
+
+COCO_IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def load_yolo_labels(label_path: Path, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read a YOLO label file (class x_center y_center width height, normalized)
+    
+    Args:
+        label_path: Path to the .txt label file
+        width: Image width in pixels
+        height: Image height in pixels
+        
+    Returns:
+        Tuple of ((N, 4) xyxy pixel boxes, (N,) class ids)
+    """
+    rows = []
+    if Path(label_path).exists():
+        with open(label_path) as f:
+            rows = [line.split() for line in f if line.strip()]
+    if not rows:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        
+    data = np.array(rows, dtype=np.float32)
+    classes = data[:, 0].astype(np.int64)
+    xc, yc = data[:, 1] * width, data[:, 2] * height
+    w, h = data[:, 3] * width, data[:, 4] * height
+    boxes = np.stack([xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2], axis=1)
+    return boxes, classes
+
+
+def labels_to_detections(boxes: np.ndarray, classes: np.ndarray, class_names: Dict[int, str]) -> List[Detection]:
+    """
+    Wrap ground-truth boxes as Detection objects (e.g. for ROIMapper counting)
+    
+    Args:
+        boxes: (N, 4) xyxy boxes
+        classes: (N,) class ids
+        class_names: Class id to name mapping
+        
+    Returns:
+        List of detections with confidence 1.0
+    """
+    return [
+        Detection(
+            bbox=tuple(int(v) for v in box),
+            confidence=1.0,
+            class_id=int(cls_id),
+            class_name=class_names.get(int(cls_id), f"class_{cls_id}")
+        )
+        for box, cls_id in zip(boxes, classes)
+    ]
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """
+    Area under the precision-recall curve (COCO 101-point interpolation)
+    
+    Args:
+        recall: Cumulative recall, sorted by descending score
+        precision: Cumulative precision, sorted by descending score
+        
+    Returns:
+        Average precision
+    """
+    # Precision envelope (monotonically decreasing from the right)
+    envelope = np.maximum.accumulate(np.concatenate([[0.0], precision, [0.0]])[::-1])[::-1]
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    points = np.linspace(0.0, 1.0, 101)
+    indices = np.searchsorted(recall, points, side='left')
+    return float(np.mean(envelope[np.minimum(indices, len(envelope) - 1)]))
+
+
+def compute_map(
+    predictions: List[List[Detection]],
+    ground_truths: List[Tuple[np.ndarray, np.ndarray]],
+    iou_thresholds: np.ndarray = COCO_IOU_THRESHOLDS
+) -> Dict[str, float]:
+    """
+    Mean average precision over classes and IoU thresholds
+    
+    Args:
+        predictions: Detections per image (produced at a low confidence threshold)
+        ground_truths: (boxes, classes) per image, as returned by load_yolo_labels
+        iou_thresholds: IoU thresholds to average over
+        
+    Returns:
+        Dictionary with map50, map50_95 and per-class AP at IoU 0.5
+    """
+    classes = sorted({int(c) for _, gt_classes in ground_truths for c in gt_classes})
+    ap = np.zeros((len(classes), len(iou_thresholds)), dtype=np.float64)
+    
+    for ci, cls_id in enumerate(classes):
+        scores, matched, num_gt = [], [], 0
+        for dets, (gt_boxes, gt_classes) in zip(predictions, ground_truths):
+            gt = gt_boxes[gt_classes == cls_id]
+            num_gt += len(gt)
+            dets = sorted((d for d in dets if d.class_id == cls_id), key=lambda d: -d.confidence)
+            if not dets:
+                continue
+            pred_boxes = np.array([d.bbox for d in dets], dtype=np.float32)
+            ious = iou_matrix(pred_boxes, gt)
+            
+            # Greedy matching per threshold: each GT box matches at most one prediction
+            hits = np.zeros((len(dets), len(iou_thresholds)), dtype=bool)
+            for ti, threshold in enumerate(iou_thresholds):
+                taken = np.zeros(len(gt), dtype=bool)
+                for pi in range(len(dets)):
+                    if not len(gt):
+                        break
+                    candidates = np.where(taken, -1.0, ious[pi])
+                    best = int(np.argmax(candidates))
+                    if candidates[best] >= threshold:
+                        taken[best] = True
+                        hits[pi, ti] = True
+            scores.extend(d.confidence for d in dets)
+            matched.append(hits)
+            
+        if num_gt == 0 or not scores:
+            continue
+        order = np.argsort(-np.asarray(scores), kind='stable')
+        hits = np.concatenate(matched, axis=0)[order]
+        true_pos = np.cumsum(hits, axis=0)
+        false_pos = np.cumsum(~hits, axis=0)
+        recall = true_pos / num_gt
+        precision = true_pos / np.maximum(true_pos + false_pos, 1)
+        for ti in range(len(iou_thresholds)):
+            ap[ci, ti] = average_precision(recall[:, ti], precision[:, ti])
+            
+    if not classes:
+        return {'map50': 0.0, 'map50_95': 0.0, 'ap50_per_class': {}}
+    return {
+        'map50': float(ap[:, 0].mean()),
+        'map50_95': float(ap.mean()),
+        'ap50_per_class': {cls_id: float(ap[ci, 0]) for ci, cls_id in enumerate(classes)}
+    }
+
+
+def count_mae(predicted_counts: np.ndarray, true_counts: np.ndarray) -> Dict:
+    """
+    Per-lane count error
+    
+    Args:
+        predicted_counts: (frames, lanes) predicted vehicle counts
+        true_counts: (frames, lanes) ground-truth vehicle counts
+        
+    Returns:
+        Dictionary with overall and per-lane MAE
+    """
+    error = np.abs(np.asarray(predicted_counts, dtype=np.float64) - np.asarray(true_counts, dtype=np.float64))
+    if error.size == 0:
+        return {'count_mae': 0.0, 'count_mae_per_lane': []}
+    return {
+        'count_mae': float(error.mean()),
+        'count_mae_per_lane': error.mean(axis=0).tolist()
+    }
+
+
+def pareto_front(
+    rows: List[Dict],
+    cost_key: str = 'p50_latency_ms',
+    quality_key: str = 'map50_95',
+    secondary_cost_key: Optional[str] = 'count_mae'
+) -> List[Dict]:
+    """
+    Configurations not dominated on (lower cost, higher quality[, lower secondary cost])
+    
+    Args:
+        rows: Benchmark result rows
+        cost_key: Metric to minimize (e.g. latency)
+        quality_key: Metric to maximize (e.g. mAP)
+        secondary_cost_key: Optional second metric to minimize (e.g. count MAE)
+        
+    Returns:
+        Non-dominated rows sorted by cost
+    """
+    def objectives(row):
+        values = [row[cost_key], -row[quality_key]]
+        if secondary_cost_key:
+            values.append(row[secondary_cost_key])
+        return np.array(values, dtype=np.float64)
+        
+    points = [objectives(row) for row in rows]
+    front = []
+    for i, point in enumerate(points):
+        dominated = any(
+            np.all(other <= point) and np.any(other < point)
+            for j, other in enumerate(points) if j != i
+        )
+        if not dominated:
+            front.append(rows[i])
+    return sorted(front, key=lambda row: row[cost_key])
@@ -0,0 +1,198 @@
+"""
+Fallback Counter - Classical CV lane occupancy estimate for degraded mode
+Background subtraction + blob analysis per lane ROI, no accelerator needed
+"""
+
+import time
+import cv2
+import numpy as np
+from typing import List, Dict, Optional
+from loguru import logger
+
+from .roi_mapping import ROIMapper
+
+
+class FallbackCounter:
+    """
+    Estimates vehicles per lane from foreground blobs against a learned background.
+    
+    While YOLO is healthy the counter runs alongside it: the background is
+    learned everywhere except under detected vehicles, the foreground area
+    of one vehicle is calibrated per lane from YOLO counts, and the count
+    error against YOLO is accumulated. When YOLO is down or too slow, the
+    counts come from the blobs alone.
+    """
+    
+    def __init__(
+        self,
+        roi_mapper: ROIMapper,
+        downsample: int = 4,
+        diff_threshold: int = 25,
+        learning_rate: float = 0.02,
+        degraded_learning_rate: float = 0.002,
+        min_blob_area: int = 150,
+        vehicle_area: int = 6000,
+        calibration_rate: float = 0.05
+    ):
+        """
+        Initialize fallback counter
+        
+        Args:
+            roi_mapper: ROI mapper holding the lane polygons
+            downsample: Downsampling factor applied before any processing
+            diff_threshold: Gray-level difference from the background that counts as foreground
+            learning_rate: Background update rate while YOLO is available
+            degraded_learning_rate: Background update rate (outside blobs) in degraded mode
+            min_blob_area: Smallest blob (in full-resolution pixels) counted as a vehicle
+            vehicle_area: Initial foreground area of one vehicle in full-resolution pixels
+            calibration_rate: EMA rate of the per-lane vehicle area calibration against YOLO
+        """
+        self.roi_mapper = roi_mapper
+        self.num_lanes = roi_mapper.num_lanes
+        self.downsample = max(1, int(downsample))
+        self.diff_threshold = diff_threshold
+        self.learning_rate = learning_rate
+        self.degraded_learning_rate = degraded_learning_rate
+        self.calibration_rate = calibration_rate
+        
+        area_scale = float(self.downsample * self.downsample)
+        self.min_blob_area = max(1, int(min_blob_area / area_scale))
+        self.vehicle_area = np.full(self.num_lanes, vehicle_area / area_scale, dtype=np.float64)
+        
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._frame_shape = None
+        self._labels: Optional[np.ndarray] = None
+        self._background: Optional[np.ndarray] = None
+        self._small: Optional[np.ndarray] = None
+        self._foreground: Optional[np.ndarray] = None
+        self._lane_area = np.zeros(self.num_lanes, dtype=np.float64)
+        self._last_counts = np.zeros(self.num_lanes, dtype=np.int32)
+        
+        self.frames = 0
+        self._process_time_s = 0.0
+        self._error_samples = 0
+        self._abs_error = np.zeros(self.num_lanes, dtype=np.float64)
+        self._signed_error = np.zeros(self.num_lanes, dtype=np.float64)
+        
+        logger.info(f"Fallback counter initialized: {self.num_lanes} lanes, downsample={self.downsample}")
+    
+    def _prepare(self, image: np.ndarray) -> np.ndarray:
+        """Downsample (before color conversion, which is the cheaper order) to grayscale"""
+        height, width = image.shape[:2]
+        key = (height, width, self.roi_mapper.roi_version)
+        if self._frame_shape != key:
+            if self._frame_shape is None or self._frame_shape[:2] != (height, width):
+                self._background = None
+            self._labels = self.roi_mapper.rasterize(height, width, self.downsample)
+            self._frame_shape = key
+            
+        small_h, small_w = self._labels.shape
+        small = cv2.resize(image, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    
+    def count(self, image: np.ndarray, degraded: bool = False) -> np.ndarray:
+        """
+        Estimate vehicles per lane
+        
+        Args:
+            image: BGR frame
+            degraded: True when the result is used in place of YOLO; the
+                background is then also updated (slowly, outside blobs) here
+                
+        Returns:
+            Estimated vehicle count per lane (int32)
+        """
+        start = time.perf_counter()
+        small = self._prepare(image)
+        self._small = small
+        
+        if self._background is None:
+            self._background = small.astype(np.float32)
+            
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        _, foreground = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_OPEN, self._kernel)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_CLOSE, self._kernel)
+        foreground[self._labels < 0] = 0
+        self._foreground = foreground
+        
+        num, _, stats, centroids = cv2.connectedComponentsWithStats(foreground, connectivity=8)
+        areas = stats[1:, cv2.CC_STAT_AREA].astype(np.float64)
+        keep = areas >= self.min_blob_area
+        areas = areas[keep]
+        centers = centroids[1:][keep].astype(np.int64)
+        lanes = self._labels[centers[:, 1], centers[:, 0]] if len(centers) else np.zeros(0, dtype=np.int16)
+        in_lane = lanes >= 0
+        lanes, areas = lanes[in_lane], areas[in_lane]
+        
+        # A merged blob (queued vehicles) counts as several vehicles by area
+        per_blob = np.maximum(1.0, np.rint(areas / self.vehicle_area[lanes])) if len(lanes) else areas
+        counts = np.bincount(lanes, weights=per_blob, minlength=self.num_lanes)[:self.num_lanes]
+        self._lane_area = np.bincount(lanes, weights=areas, minlength=self.num_lanes)[:self.num_lanes]
+        self._last_counts = counts.astype(np.int32)
+        
+        if degraded:
+            cv2.accumulateWeighted(
+                small, self._background, self.degraded_learning_rate,
+                mask=cv2.bitwise_not(cv2.dilate(foreground, self._kernel, iterations=2))
+            )
+            
+        self.frames += 1
+        self._process_time_s += time.perf_counter() - start
+        return self._last_counts.copy()
+    
+    def observe_detections(self, detections: List, yolo_counts: np.ndarray):
+        """
+        Learn from YOLO on the frame last passed to count()
+        
+        Args:
+            detections: YOLO detections of that frame
+            yolo_counts: YOLO vehicle counts per lane of that frame
+        """
+        if self._small is None:
+            return
+            
+        # Learn the background everywhere except under detected vehicles
+        mask = np.full(self._small.shape, 255, dtype=np.uint8)
+        ds = self.downsample
+        for det in detections:
+            x1, y1, x2, y2 = det.bbox
+            mask[y1 // ds:(y2 + ds - 1) // ds, x1 // ds:(x2 + ds - 1) // ds] = 0
+        cv2.accumulateWeighted(self._small, self._background, self.learning_rate, mask=mask)
+        
+        yolo_counts = np.asarray(yolo_counts, dtype=np.float64)
+        occupied = (yolo_counts > 0) & (self._lane_area > 0)
+        if occupied.any():
+            observed = self._lane_area[occupied] / yolo_counts[occupied]
+            self.vehicle_area[occupied] += self.calibration_rate * (observed - self.vehicle_area[occupied])
+            
+        error = self._last_counts - yolo_counts
+        self._abs_error += np.abs(error)
+        self._signed_error += error
+        self._error_samples += 1
+    
+    def reset(self):
+        """Forget the learned background (vehicle area calibration is kept)"""
+        self._background = None
+        self._small = None
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get throughput and count error against YOLO
+        
+        Returns:
+            Metrics dictionary
+        """
+        frames = max(1, self.frames)
+        samples = max(1, self._error_samples)
+        avg_ms = self._process_time_s / frames * 1000.0
+        return {
+            'frames': self.frames,
+            'avg_process_ms': avg_ms,
+            'fps': 1000.0 / avg_ms if avg_ms > 0 else 0.0,
+            'error_samples': self._error_samples,
+            'mae_vs_yolo': float(self._abs_error.sum() / (samples * max(1, self.num_lanes))),
+            'mae_per_lane': (self._abs_error / samples).tolist(),
+            'bias_per_lane': (self._signed_error / samples).tolist(),
+            'vehicle_area_px': (self.vehicle_area * self.downsample * self.downsample).tolist()
+        }
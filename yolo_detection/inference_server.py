@@ -0,0 +1,326 @@
+"""
+Inference Server - Micro-batches detection requests from all cameras and callers
+"""
+
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+
+from .detect_vehicles import VehicleDetector, Detection, filter_detections
+from .preprocess import LetterboxMeta
+
+
+class InferenceRequest:
+    """A single pending detection request"""
+    
+    def __init__(
+        self,
+        image: Optional[np.ndarray],
+        conf: float,
+        camera_id: Optional[str] = None,
+        prepared: Optional[Tuple[np.ndarray, LetterboxMeta]] = None,
+        imgsz: Optional[int] = None,
+        tiles: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Args:
+            image: Input image (H, W, 3), or None when prepared is given
+            conf: Confidence threshold requested by the caller
+            camera_id: Camera the frame came from (for metrics only)
+            prepared: Ingest-time letterboxed (tensor, meta) pair
+            imgsz: Inference size for raw images (None: detector default)
+            tiles: Optional (rows, cols) tile grid for raw images
+        """
+        self.image = image
+        self.prepared = prepared
+        self.imgsz = imgsz
+        self.tiles = tuple(tiles) if tiles else None
+        self.conf = conf
+        self.camera_id = camera_id
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceServer:
+    """
+    Collects frames from every camera and requester within a short time window
+    and runs them through the detector as one batch.
+    
+    The batch is predicted at the lowest confidence any request asked for; each
+    request then gets its own threshold applied in post-processing.
+    """
+    
+    def __init__(
+        self,
+        detector: VehicleDetector,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        metrics_window: int = 500
+    ):
+        """
+        Initialize inference server
+        
+        Args:
+            detector: Loaded vehicle detector
+            max_batch_size: Maximum number of frames per predict call
+            max_wait_ms: Maximum time the first frame of a batch waits for company
+            metrics_window: Number of recent requests/batches kept for metrics
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        
+        self._queue: "queue.Queue[InferenceRequest]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._batch_times = deque(maxlen=metrics_window)  # (start, end) of each predict
+        self._queue_waits = deque(maxlen=metrics_window)
+        self._latencies = deque(maxlen=metrics_window)
+        self.total_batches = 0
+        self.total_frames = 0
+        
+        logger.info(
+            f"Inference server configured: max_batch_size={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.1f}ms"
+        )
+    
+    def start(self):
+        """Start the batching worker thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-server", daemon=True)
+        self._thread.start()
+        logger.success("Inference server started")
+    
+    def stop(self, timeout: float = 2.0):
+        """Stop the worker thread and fail any request still queued"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+            
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("Inference server stopped"))
+        logger.info("Inference server stopped")
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a batch"""
+        return self._queue.qsize()
+    
+    def submit(
+        self,
+        image: Optional[np.ndarray] = None,
+        conf: Optional[float] = None,
+        camera_id: Optional[str] = None,
+        prepared: Optional[Tuple[np.ndarray, LetterboxMeta]] = None,
+        imgsz: Optional[int] = None,
+        tiles: Optional[Tuple[int, int]] = None
+    ) -> Future:
+        """
+        Queue an image (or an ingest-time preprocessed tensor) for detection
+        
+        Args:
+            image: Input image (H, W, 3)
+            conf: Confidence threshold for this request (default: detector threshold)
+            camera_id: Camera identifier (for metrics only)
+            prepared: (tensor, meta) from LetterboxPreprocessor, used instead of image
+            imgsz: Inference size for raw images (None: detector default)
+            tiles: Optional (rows, cols) grid to run raw images tiled
+            
+        Returns:
+            Future resolving to a list of Detection objects
+        """
+        if not self._running:
+            raise RuntimeError("Inference server is not running")
+        if image is None and prepared is None:
+            raise ValueError("Either image or prepared must be given")
+            
+        if conf is None:
+            conf = self.detector.confidence_threshold
+        request = InferenceRequest(image, conf, camera_id, prepared, imgsz, tiles)
+        self._queue.put(request)
+        return request.future
+    
+    def detect(
+        self,
+        image: np.ndarray,
+        conf: Optional[float] = None,
+        camera_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Detection]:
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(image, conf, camera_id).result(timeout=timeout)
+    
+    def _collect_batch(self) -> List[InferenceRequest]:
+        """
+        Wait for the first request, then gather more until the batch is full or
+        the window closes. Requests whose future was cancelled meanwhile (e.g.
+        the awaiting coroutine timed out) are dropped, the others marked running.
+        """
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+            
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+                
+        return [request for request in batch if request.future.set_running_or_notify_cancel()]
+    
+    def _run(self):
+        """Worker loop; a failing batch is logged and never stops the worker"""
+        while self._running:
+            try:
+                batch = self._collect_batch()
+                if batch:
+                    self._process_batch(batch)
+            except Exception as e:
+                logger.error(f"Inference worker error: {e}")
+    
+    def _process_batch(self, batch: List[InferenceRequest]):
+        """Run one predict call per input kind in the batch and resolve every request"""
+        # Raw images go through ultralytics preprocessing and can share a call
+        # when they use the same inference size; preprocessed tensors can only
+        # be stacked with tensors of the same shape; tiled frames batch their tiles
+        groups: Dict[tuple, List[InferenceRequest]] = {}
+        for request in batch:
+            if request.prepared is not None:
+                key = ('prepared', request.prepared[0].shape)
+            elif request.tiles is not None:
+                key = ('tiled', request.imgsz, request.tiles)
+            else:
+                key = ('raw', request.imgsz)
+            groups.setdefault(key, []).append(request)
+            
+        for key, requests in groups.items():
+            self._process_group(requests, kind=key[0])
+    
+    def _process_group(self, batch: List[InferenceRequest], kind: str):
+        """Run inference for requests of the same input kind"""
+        batch_conf = min(request.conf for request in batch)
+        stage1_conf = self.detector.stage1_conf(batch_conf)
+        start = time.perf_counter()
+        
+        try:
+            if kind == 'prepared':
+                results = self.detector.batch_detect_preprocessed(
+                    [request.prepared[0] for request in batch],
+                    [request.prepared[1] for request in batch],
+                    conf_override=stage1_conf
+                )
+            elif kind == 'tiled':
+                results = [
+                    self.detector.detect_tiled(
+                        request.image, request.tiles, conf_override=stage1_conf, imgsz=request.imgsz
+                    )
+                    for request in batch
+                ]
+            else:
+                results = self.detector.batch_detect(
+                    [request.image for request in batch],
+                    conf_override=stage1_conf,
+                    imgsz=batch[0].imgsz
+                )
+            if self.detector.cascade is not None:
+                # Crops of every frame in the group share one refine predict;
+                # prepared-only requests have no frame to crop and keep their first stage
+                framed = [index for index, request in enumerate(batch) if request.image is not None]
+                refined = self.detector.refine_batch(
+                    [batch[index].image for index in framed],
+                    [results[index] for index in framed],
+                    conf_override=batch_conf
+                )
+                results = [filter_detections(detections, batch_conf) for detections in results]
+                for index, detections in zip(framed, refined):
+                    results[index] = detections
+        except Exception as e:
+            logger.error(f"Batch inference failed: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+            
+        end = time.perf_counter()
+        
+        for request, detections in zip(batch, results):
+            if request.conf > batch_conf:
+                detections = filter_detections(detections, request.conf)
+            if not request.future.done():
+                request.future.set_result(detections)
+            
+        with self._lock:
+            self.total_batches += 1
+            self.total_frames += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._batch_times.append((start, end))
+            for request in batch:
+                self._queue_waits.append(start - request.enqueued_at)
+                self._latencies.append(end - request.enqueued_at)
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get batching metrics (throughput versus added latency)
+        
+        Returns:
+            Metrics dictionary; times are in milliseconds
+        """
+        with self._lock:
+            batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+            batch_times = np.array(self._batch_times, dtype=np.float64).reshape(-1, 2)
+            queue_waits = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+            latencies = np.array(self._latencies, dtype=np.float64) * 1000.0
+            total_batches = self.total_batches
+            total_frames = self.total_frames
+            
+        metrics = {
+            'total_batches': total_batches,
+            'total_frames': total_frames,
+            'queue_depth': self.queue_depth,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'avg_batch_size': 0.0,
+            'throughput_fps': 0.0,
+            'avg_inference_ms': 0.0,
+            'avg_queue_wait_ms': 0.0,
+            'p99_queue_wait_ms': 0.0,
+            'p50_latency_ms': 0.0,
+            'p99_latency_ms': 0.0
+        }
+        
+        if len(batch_sizes) > 0:
+            span = batch_times[-1, 1] - batch_times[0, 0]
+            metrics['avg_batch_size'] = float(batch_sizes.mean())
+            metrics['throughput_fps'] = float(batch_sizes.sum() / span) if span > 0 else 0.0
+            metrics['avg_inference_ms'] = float((batch_times[:, 1] - batch_times[:, 0]).mean() * 1000.0)
+            
+        if len(latencies) > 0:
+            metrics['avg_queue_wait_ms'] = float(queue_waits.mean())
+            metrics['p99_queue_wait_ms'] = float(np.percentile(queue_waits, 99))
+            metrics['p50_latency_ms'] = float(np.percentile(latencies, 50))
+            metrics['p99_latency_ms'] = float(np.percentile(latencies, 99))
+            
+        return metrics
@@ -0,0 +1,248 @@
+"""
+Motion Gate - Skips YOLO on lane ROIs whose pixels have not changed
+"""
+
+import cv2
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+
+from .roi_mapping import ROIMapper
+
+
+class GatePlan:
+    """Decision of the motion gate for one frame"""
+    
+    REUSE = "reuse"
+    PARTIAL = "partial"
+    FULL = "full"
+    
+    def __init__(self, action: str, changed_lanes: np.ndarray, small_frame: np.ndarray,
+                 crop: Optional[Tuple[int, int, int, int]] = None, forced: bool = False):
+        """
+        Args:
+            action: REUSE (keep previous detections), PARTIAL (infer on crop) or FULL
+            changed_lanes: Boolean mask of lanes that need fresh detections
+            small_frame: Downsampled grayscale frame the decision was made on
+            crop: (x1, y1, x2, y2) region to infer on for PARTIAL
+            forced: True when FULL was forced by the maximum age
+        """
+        self.action = action
+        self.changed_lanes = changed_lanes
+        self.small_frame = small_frame
+        self.crop = crop
+        self.forced = forced
+
+
+class MotionGate:
+    """
+    Cheap change detector in front of the vehicle detector.
+    
+    Each frame is downsampled to grayscale and compared, per lane ROI, with
+    the pixels at the time that lane was last inferred. Lanes whose mean
+    absolute difference stays below the threshold keep their previous
+    detections; changed lanes are re-inferred on a crop covering them.
+    Every lane is re-inferred on the full frame at least every max_age frames.
+    """
+    
+    def __init__(
+        self,
+        roi_mapper: ROIMapper,
+        downsample: int = 8,
+        threshold: float = 6.0,
+        max_age: int = 20,
+        crop_padding: int = 32,
+        max_crop_fraction: float = 0.6
+    ):
+        """
+        Initialize motion gate
+        
+        Args:
+            roi_mapper: ROI mapper holding the lane polygons
+            downsample: Downsampling factor for frame differencing
+            threshold: Mean absolute gray-level difference above which a lane counts as changed
+            max_age: Maximum frames a lane may reuse detections before a forced full inference
+            crop_padding: Pixels added around changed lanes for the partial crop
+            max_crop_fraction: Crops larger than this fraction of the frame run full inference
+        """
+        self.roi_mapper = roi_mapper
+        self.downsample = max(1, int(downsample))
+        self.threshold = threshold
+        self.max_age = max_age
+        self.crop_padding = crop_padding
+        self.max_crop_fraction = max_crop_fraction
+        
+        self.num_lanes = roi_mapper.num_lanes
+        self._frame_shape: Optional[Tuple[int, int, int]] = None  # (height, width, ROI version)
+        self._labels: Optional[np.ndarray] = None
+        self._lane_pixels = np.zeros(self.num_lanes, dtype=np.float64)
+        self._lane_boxes = np.zeros((self.num_lanes, 4), dtype=np.int32)
+        self._reference: Optional[np.ndarray] = None
+        self._age = np.zeros(self.num_lanes, dtype=np.int32)
+        self._detections: List = []
+        
+        self.frames = 0
+        self.full_inferences = 0
+        self.forced_inferences = 0
+        self.partial_inferences = 0
+        self.skipped_frames = 0
+        self.lane_steps = 0
+        self.lane_steps_reused = 0
+        self._drift_sum = 0.0
+        self._drift_samples = 0
+        
+        logger.info(f"Motion gate initialized: downsample={downsample}, threshold={threshold}, max_age={max_age}")
+    
+    def _build_lane_masks(self, height: int, width: int):
+        """Rasterize lane ROIs at the downsampled resolution"""
+        labels = self.roi_mapper.rasterize(height, width, self.downsample)
+        for lane_id, polygons in self.roi_mapper.roi_polygons.items():
+            if polygons:
+                points = np.concatenate(polygons, axis=0)
+                self._lane_boxes[lane_id] = (*points.min(axis=0), *points.max(axis=0))
+        
+        valid = labels >= 0
+        self._labels = labels
+        self._lane_pixels = np.bincount(labels[valid], minlength=self.num_lanes).astype(np.float64)
+        self._frame_shape = (height, width, self.roi_mapper.roi_version)
+        self._reference = None
+    
+    def _small_gray(self, image: np.ndarray) -> np.ndarray:
+        """Downsampled grayscale copy of a BGR frame"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (self._labels.shape[1], self._labels.shape[0]), interpolation=cv2.INTER_AREA)
+    
+    def _lane_of(self, detections: List) -> np.ndarray:
+        """Lane label of each detection center (-1 outside all lanes)"""
+        if not detections:
+            return np.zeros(0, dtype=np.int16)
+        centers = np.array([d.center for d in detections], dtype=np.int64) // self.downsample
+        h, w = self._labels.shape
+        inside = (centers[:, 0] >= 0) & (centers[:, 0] < w) & (centers[:, 1] >= 0) & (centers[:, 1] < h)
+        lanes = np.full(len(detections), -1, dtype=np.int16)
+        lanes[inside] = self._labels[centers[inside, 1], centers[inside, 0]]
+        return lanes
+    
+    def _lane_counts(self, detections: List) -> np.ndarray:
+        lanes = self._lane_of(detections)
+        return np.bincount(lanes[lanes >= 0], minlength=self.num_lanes)[:self.num_lanes]
+    
+    def plan(self, image: np.ndarray) -> GatePlan:
+        """
+        Decide how much of this frame needs inference
+        
+        Args:
+            image: BGR frame
+            
+        Returns:
+            GatePlan; for REUSE, call commit(plan) without detections
+        """
+        height, width = image.shape[:2]
+        if self._frame_shape != (height, width, self.roi_mapper.roi_version):
+            self._build_lane_masks(height, width)
+            
+        small = self._small_gray(image)
+        all_lanes = np.ones(self.num_lanes, dtype=bool)
+        
+        if self._reference is None:
+            return GatePlan(GatePlan.FULL, all_lanes, small)
+        if np.any(self._age >= self.max_age):
+            return GatePlan(GatePlan.FULL, all_lanes, small, forced=True)
+            
+        diff = cv2.absdiff(small, self._reference)
+        valid = self._labels >= 0
+        lane_diff = np.bincount(
+            self._labels[valid], weights=diff[valid], minlength=self.num_lanes
+        )[:self.num_lanes] / np.maximum(self._lane_pixels, 1.0)
+        changed = lane_diff > self.threshold
+        
+        if not changed.any():
+            return GatePlan(GatePlan.REUSE, changed, small)
+            
+        boxes = self._lane_boxes[changed]
+        x1 = max(0, int(boxes[:, 0].min()) - self.crop_padding)
+        y1 = max(0, int(boxes[:, 1].min()) - self.crop_padding)
+        x2 = min(width, int(boxes[:, 2].max()) + self.crop_padding)
+        y2 = min(height, int(boxes[:, 3].max()) + self.crop_padding)
+        if (x2 - x1) * (y2 - y1) > self.max_crop_fraction * width * height:
+            return GatePlan(GatePlan.FULL, all_lanes, small)
+            
+        return GatePlan(GatePlan.PARTIAL, changed, small, crop=(x1, y1, x2, y2))
+    
+    def commit(self, plan: GatePlan, new_detections: Optional[List] = None) -> List:
+        """
+        Merge fresh detections with reused ones and update the gate state
+        
+        Args:
+            plan: Plan returned by plan() for this frame
+            new_detections: Detections for plan.crop (in frame coordinates) or the
+                full frame; ignored for REUSE
+                
+        Returns:
+            Detections for the whole frame
+        """
+        self.frames += 1
+        self.lane_steps += self.num_lanes
+        
+        if plan.action == GatePlan.REUSE:
+            self.skipped_frames += 1
+            self.lane_steps_reused += self.num_lanes
+            self._age += 1
+            return list(self._detections)
+            
+        new_detections = list(new_detections or [])
+        
+        if plan.action == GatePlan.FULL:
+            if plan.forced:
+                self.forced_inferences += 1
+                drift = np.abs(self._lane_counts(self._detections) - self._lane_counts(new_detections))
+                self._drift_sum += float(drift.mean())
+                self._drift_samples += 1
+            self.full_inferences += 1
+            merged = new_detections
+            self._reference = plan.small_frame
+            self._age[:] = 0
+        else:
+            self.partial_inferences += 1
+            unchanged = np.flatnonzero(~plan.changed_lanes)
+            kept = [d for d, lane in zip(self._detections, self._lane_of(self._detections))
+                    if lane >= 0 and lane in unchanged]
+            fresh = [d for d, lane in zip(new_detections, self._lane_of(new_detections))
+                     if lane not in unchanged]
+            merged = kept + fresh
+            
+            refresh = np.isin(self._labels, np.flatnonzero(plan.changed_lanes))
+            self._reference[refresh] = plan.small_frame[refresh]
+            self.lane_steps_reused += len(unchanged)
+            self._age[plan.changed_lanes] = 0
+            self._age[~plan.changed_lanes] += 1
+            
+        self._detections = merged
+        return list(merged)
+    
+    def reset(self):
+        """Forget the reference frame and cached detections"""
+        self._reference = None
+        self._detections = []
+        self._age[:] = 0
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get skip-rate and count-drift metrics
+        
+        Returns:
+            Metrics dictionary
+        """
+        frames = max(1, self.frames)
+        return {
+            'frames': self.frames,
+            'full_inferences': self.full_inferences,
+            'forced_inferences': self.forced_inferences,
+            'partial_inferences': self.partial_inferences,
+            'skipped_frames': self.skipped_frames,
+            'frame_skip_rate': self.skipped_frames / frames,
+            'lane_skip_rate': self.lane_steps_reused / max(1, self.lane_steps),
+            # Mean per-lane |count| difference between reused and fresh detections,
+            # measured on every forced refresh
+            'count_drift_mae': self._drift_sum / self._drift_samples if self._drift_samples else 0.0
+        }
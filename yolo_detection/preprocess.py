@@ -0,0 +1,131 @@
+"""
+Letterbox Preprocessing - Builds model-ready tensors from BGR frames
+Runs on the CARLA sensor callback thread so the request path skips it
+"""
+
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+from loguru import logger
+
+
+class LetterboxMeta:
+    """Scale and padding applied by letterboxing, used to map boxes back"""
+    
+    def __init__(self, scale: float, pad: Tuple[int, int], orig_shape: Tuple[int, int],
+                 input_shape: Tuple[int, int]):
+        """
+        Args:
+            scale: Resize ratio applied to the original frame
+            pad: (left, top) padding in pixels of the model input
+            orig_shape: (height, width) of the original frame
+            input_shape: (height, width) of the model input
+        """
+        self.scale = scale
+        self.pad = pad
+        self.orig_shape = orig_shape
+        self.input_shape = input_shape
+    
+    def map_boxes_back(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Map (N, 4) xyxy boxes from model-input coordinates to the original frame
+        
+        Args:
+            boxes: Boxes in letterboxed coordinates
+            
+        Returns:
+            Boxes in original frame coordinates (clipped to the frame)
+        """
+        boxes = boxes.astype(np.float32, copy=True)
+        boxes[:, [0, 2]] -= self.pad[0]
+        boxes[:, [1, 3]] -= self.pad[1]
+        boxes /= self.scale
+        height, width = self.orig_shape
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+        return boxes
+
+
+class LetterboxPreprocessor:
+    """
+    Letterbox resize, BGR->RGB, HWC->CHW and [0, 1] normalization into
+    preallocated float32 buffers (same transform ultralytics applies in predict)
+    """
+    
+    def __init__(self, image_size: int = 640, stride: int = 32, num_buffers: int = 4,
+                 pad_value: int = 114):
+        """
+        Initialize preprocessor
+        
+        Args:
+            image_size: Longest side of the model input (default for __call__)
+            stride: Model stride; padding is reduced to the next multiple of it
+            num_buffers: Output ring size (a tensor stays valid for num_buffers - 1 frames)
+            pad_value: Gray value used for padding
+        """
+        self.image_size = image_size
+        self.stride = stride
+        self.num_buffers = max(2, int(num_buffers))
+        self.pad_value = pad_value
+        
+        self._key = None
+        self._resized = None
+        self._canvases = []
+        self._tensors = []
+        self._meta_args = None
+        self._next = 0
+    
+    def _geometry(self, height: int, width: int, image_size: int) -> Tuple[float, Tuple[int, int], Tuple[int, int], Tuple[int, int]]:
+        """Compute scale, resized size, padding and input shape for a frame size"""
+        scale = min(image_size / height, image_size / width)
+        new_w, new_h = int(round(width * scale)), int(round(height * scale))
+        pad_w = (image_size - new_w) % self.stride
+        pad_h = (image_size - new_h) % self.stride
+        left, top = pad_w // 2, pad_h // 2
+        return scale, (new_w, new_h), (left, top), (new_h + pad_h, new_w + pad_w)
+    
+    def _allocate(self, height: int, width: int, image_size: int):
+        """(Re)allocate buffers for a new frame size or input size"""
+        scale, (new_w, new_h), pad, (in_h, in_w) = self._geometry(height, width, image_size)
+        self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self._canvases = [
+            np.full((in_h, in_w, 3), self.pad_value, dtype=np.uint8) for _ in range(self.num_buffers)
+        ]
+        self._tensors = [
+            np.empty((1, 3, in_h, in_w), dtype=np.float32) for _ in range(self.num_buffers)
+        ]
+        self._next = 0
+        self._key = (height, width, image_size)
+        self._meta_args = (scale, pad, (height, width), (in_h, in_w))
+        logger.debug(f"Letterbox buffers allocated: {width}x{height} -> {in_w}x{in_h}")
+    
+    def __call__(self, image: np.ndarray, image_size: Optional[int] = None) -> Tuple[np.ndarray, LetterboxMeta]:
+        """
+        Preprocess a BGR frame
+        
+        Args:
+            image: (H, W, 3) uint8 BGR frame
+            image_size: Model input size for this frame (default: self.image_size).
+                Callers on another thread pass their snapshot of it here rather
+                than setting image_size
+                
+        Returns:
+            Tuple of ((1, 3, h, w) float32 RGB tensor in [0, 1], letterbox metadata)
+        """
+        image_size = image_size or self.image_size
+        height, width = image.shape[:2]
+        if self._key != (height, width, image_size):
+            self._allocate(height, width, image_size)
+            
+        scale, (left, top), orig_shape, input_shape = self._meta_args
+        new_h, new_w = self._resized.shape[:2]
+        
+        cv2.resize(image, (new_w, new_h), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        canvas = self._canvases[self._next]
+        canvas[top:top + new_h, left:left + new_w] = self._resized
+        
+        tensor = self._tensors[self._next]
+        np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=tensor[0])
+        self._next = (self._next + 1) % self.num_buffers
+        
+        return tensor, LetterboxMeta(scale, (left, top), orig_shape, input_shape)
@@ -4,43 +4,277 @@ ROI Mapper - Maps vehicle detections to specific lanes
 
 import cv2
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from loguru import logger
 
 
+LANE_COLORS = [
+    (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+    (255, 0, 255), (0, 255, 255), (128, 128, 0), (128, 0, 128)
+]
+
+
+def parse_region(region) -> Optional[np.ndarray]:
+    """
+    Convert a configured region into a polygon
+    
+    Args:
+        region: Rectangle [x1, y1, x2, y2] or polygon [[x, y], [x, y], ...] (3+ vertices)
+        
+    Returns:
+        (N, 2) int32 polygon, or None if the region is malformed
+    """
+    try:
+        points = np.asarray(region, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    
+    if points.shape == (4,):
+        x1, y1, x2, y2 = points
+        points = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        return None
+    return np.round(points).astype(np.int32)
+
+
+def rasterize_lane_labels(
+    roi_polygons: Dict[int, List[np.ndarray]],
+    height: int,
+    width: int,
+    downsample: int = 1,
+    priority: Optional[Dict[int, int]] = None,
+    lane_exclusions: Optional[Dict[int, List[np.ndarray]]] = None,
+    exclusion_zones: Optional[List[np.ndarray]] = None
+) -> np.ndarray:
+    """
+    Rasterize lane ROIs into a lane-id image
+    
+    Args:
+        roi_polygons: lane_id -> list of (N, 2) polygons in frame pixels
+        height: Frame height in pixels
+        width: Frame width in pixels
+        downsample: Integer downsampling factor of the output
+        priority: Optional lane_id -> priority; on overlaps the higher priority
+            wins, then the lower lane id
+        lane_exclusions: Optional lane_id -> polygons cut out of that lane only
+        exclusion_zones: Optional polygons cut out of every lane
+        
+    Returns:
+        (ceil(H / downsample), ceil(W / downsample)) int16 image holding the lane id
+        of each pixel (-1 outside all ROIs)
+    """
+    priority = priority or {}
+    lane_exclusions = lane_exclusions or {}
+    labels = np.full(
+        ((height + downsample - 1) // downsample, (width + downsample - 1) // downsample),
+        -1, dtype=np.int16
+    )
+    
+    def scaled(polygons):
+        return [(polygon // downsample).astype(np.int32) for polygon in polygons]
+    
+    lane_mask = None
+    # Paint lowest priority first so the winners of an overlap are painted last
+    for lane_id in sorted(roi_polygons, key=lambda lane: (priority.get(lane, 0), -lane)):
+        if not roi_polygons[lane_id]:
+            continue
+        if not lane_exclusions.get(lane_id):
+            cv2.fillPoly(labels, scaled(roi_polygons[lane_id]), int(lane_id))
+            continue
+        if lane_mask is None:
+            lane_mask = np.zeros(labels.shape, dtype=np.uint8)
+        lane_mask[:] = 0
+        cv2.fillPoly(lane_mask, scaled(roi_polygons[lane_id]), 1)
+        cv2.fillPoly(lane_mask, scaled(lane_exclusions[lane_id]), 0)
+        labels[lane_mask.view(bool)] = lane_id
+    
+    if exclusion_zones:
+        cv2.fillPoly(labels, scaled(exclusion_zones), -1)
+    return labels
+
+
 class ROIMapper:
     """Maps bounding box detections to lane-specific regions of interest"""
     
-    def __init__(self, lane_configs: List[Dict]):
+    ASSIGNMENT_MODES = ("center", "max_overlap", "fractional")
+    
+    def __init__(
+        self,
+        lane_configs: List[Dict],
+        frame_shape: Optional[Tuple[int, int]] = None,
+        exclusion_zones: Optional[List] = None,
+        assignment: str = "center",
+        min_overlap: float = 0.1,
+        integral_downsample: int = 4
+    ):
         """
         Initialize ROI mapper
         
+        Args:
+            lane_configs: List of lane configurations. Each lane's 'roi' is a list
+                of regions (rectangles [x1, y1, x2, y2] or polygons [[x, y], ...]);
+                an optional 'exclude' list of regions is cut out of the lane and an
+                optional 'priority' decides overlaps (higher wins; by default the
+                lower lane id wins)
+            frame_shape: Optional (height, width) of the camera frames; the lane
+                label mask covers the ROI extent until it is known
+            exclusion_zones: Optional regions cut out of every lane (sidewalks,
+                parking, ...)
+            assignment: 'center' (lane under the box center), 'max_overlap' (lane
+                holding the largest fraction of the box) or 'fractional' (each
+                lane counts the fraction of the box it holds)
+            min_overlap: Smallest box fraction inside a lane for 'max_overlap' to assign it
+            integral_downsample: Resolution divisor of the per-lane integral images
+        """
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.label_mask: Optional[np.ndarray] = None
+        self._mask_key = None
+        self.roi_version = 0  # Bumped by set_lanes() so cached rasterizations can be invalidated
+        self.exclusion_zones: List[np.ndarray] = []
+        
+        if assignment not in self.ASSIGNMENT_MODES:
+            raise ValueError(f"Unknown lane assignment mode '{assignment}', expected one of {self.ASSIGNMENT_MODES}")
+        self.assignment = assignment
+        self.min_overlap = min_overlap
+        self.integral_downsample = max(1, int(integral_downsample))
+        self.integral_images: Optional[np.ndarray] = None
+        self._integral_key = None
+        self._overlay: Optional[Tuple] = None
+        self._overlay_key = None
+        
+        self.set_lanes(lane_configs, exclusion_zones)
+        
+        logger.info(f"ROI Mapper initialized with {self.num_lanes} lanes")
+    
+    def set_lanes(self, lane_configs: List[Dict], exclusion_zones: Optional[List] = None):
+        """
+        (Re)load lane ROIs; the label mask is rebuilt on next use
+        
         Args:
             lane_configs: List of lane configurations with ROI definitions
+            exclusion_zones: Optional regions cut out of every lane (None keeps the current ones)
         """
         self.lane_configs = lane_configs
         self.num_lanes = len(lane_configs)
         
         self.roi_polygons = {}
+        self.exclusions = {}
+        self.priority = {}
         for lane in lane_configs:
             lane_id = lane['id']
-            rois = lane.get('roi', [])
+            self.roi_polygons[lane_id] = self._parse_regions(lane.get('roi', []), f"lane {lane_id} roi")
+            self.exclusions[lane_id] = self._parse_regions(lane.get('exclude', []), f"lane {lane_id} exclude")
+            self.priority[lane_id] = lane.get('priority', 0)
+        
+        if exclusion_zones is not None:
+            self.exclusion_zones = self._parse_regions(exclusion_zones, "exclusion zone")
+        
+        self.roi_version += 1
+    
+    @staticmethod
+    def _parse_regions(regions: List, label: str) -> List[np.ndarray]:
+        """Parse configured regions into polygons, warning about malformed entries"""
+        polygons = []
+        for region in regions:
+            polygon = parse_region(region)
+            if polygon is None:
+                logger.warning(f"Ignoring malformed {label}: {region}")
+                continue
+            polygons.append(polygon)
+        return polygons
+    
+    def set_frame_shape(self, height: int, width: int):
+        """Set the camera resolution (the label mask is rebuilt only if it changed)"""
+        self.frame_shape = (height, width)
+    
+    def rasterize(self, height: int, width: int, downsample: int = 1) -> np.ndarray:
+        """
+        Lane-id image of this mapper's ROIs (see rasterize_lane_labels)
+        
+        Args:
+            height: Frame height in pixels
+            width: Frame width in pixels
+            downsample: Integer downsampling factor of the output
             
-            polygons = []
-            for roi in rois:
-                if len(roi) == 4:
-                    x1, y1, x2, y2 = roi
-                    polygon = np.array([
-                        [x1, y1],
-                        [x2, y1],
-                        [x2, y2],
-                        [x1, y2]
-                    ], dtype=np.int32)
-                    polygons.append(polygon)
+        Returns:
+            int16 lane-id image (-1 outside all ROIs)
+        """
+        return rasterize_lane_labels(
+            self.roi_polygons, height, width, downsample, self.priority,
+            self.exclusions, self.exclusion_zones
+        )
+    
+    def get_label_mask(self) -> np.ndarray:
+        """
+        Full-resolution lane-id lookup image, rebuilt only when the ROIs or the
+        frame shape changed
+        
+        Returns:
+            (H, W) int16 image holding the lane id of each pixel (-1 outside all ROIs)
+        """
+        shape = self._mask_shape()
+        key = (self.roi_version, shape)
+        if self._mask_key != key:
+            self.label_mask = self.rasterize(*shape)
+            self._mask_key = key
+            logger.debug(f"Lane label mask rebuilt: {shape[1]}x{shape[0]}")
+        return self.label_mask
+    
+    def _mask_shape(self) -> Tuple[int, int]:
+        """Frame shape if known, otherwise the extent of the ROIs"""
+        if self.frame_shape is not None:
+            return self.frame_shape
+        points = [polygon for polygons in self.roi_polygons.values() for polygon in polygons]
+        extent = np.concatenate(points, axis=0).max(axis=0) + 1 if points else np.array([1, 1])
+        return (int(extent[1]), int(extent[0]))
+    
+    def get_integral_images(self) -> np.ndarray:
+        """
+        Per-lane summed-area tables of the (downsampled) label mask, rebuilt
+        only when the ROIs or the frame shape changed
+        
+        Returns:
+            (num_lanes, h + 1, w + 1) int32 array; entry [l, y, x] is the number of
+            lane-l cells above and left of (x, y) at integral_downsample resolution
+        """
+        shape = self._mask_shape()
+        key = (self.roi_version, shape)
+        if self._integral_key != key:
+            labels = self.rasterize(*shape, downsample=self.integral_downsample)
+            self.integral_images = np.stack([
+                cv2.integral((labels == lane_id).view(np.uint8))
+                for lane_id in range(self.num_lanes)
+            ]) if self.num_lanes else np.zeros((0, labels.shape[0] + 1, labels.shape[1] + 1), dtype=np.int32)
+            self._integral_key = key
+            logger.debug(f"Lane integral images rebuilt: {self.num_lanes} x {labels.shape[1]}x{labels.shape[0]}")
+        return self.integral_images
+    
+    def lane_overlap(self, detections: List) -> np.ndarray:
+        """
+        Fraction of every bounding box inside every lane (four table lookups
+        per box and lane, vectorized over all detections)
+        
+        Args:
+            detections: List of Detection objects
             
-            self.roi_polygons[lane_id] = polygons
+        Returns:
+            (N, num_lanes) float32 array of overlap fractions in [0, 1]
+        """
+        if not detections:
+            return np.zeros((0, self.num_lanes), dtype=np.float32)
+        tables = self.get_integral_images()
+        height, width = tables.shape[1] - 1, tables.shape[2] - 1
+        ds = self.integral_downsample
         
-        logger.info(f"ROI Mapper initialized with {self.num_lanes} lanes")
+        boxes = np.array([detection.bbox for detection in detections], dtype=np.int64).reshape(-1, 4)
+        x1 = np.clip(boxes[:, 0] // ds, 0, width)
+        y1 = np.clip(boxes[:, 1] // ds, 0, height)
+        x2 = np.clip(-(-boxes[:, 2] // ds), 0, width)
+        y2 = np.clip(-(-boxes[:, 3] // ds), 0, height)
+        
+        inside = tables[:, y2, x2] - tables[:, y1, x2] - tables[:, y2, x1] + tables[:, y1, x1]
+        area = np.maximum((x2 - x1) * (y2 - y1), 1)
+        return (inside / area).T.astype(np.float32)
     
     def point_in_roi(self, point: Tuple[int, int], lane_id: int) -> bool:
         """
@@ -56,6 +290,10 @@ class ROIMapper:
         if lane_id not in self.roi_polygons:
             return False
         
+        for polygon in self.exclusions[lane_id] + self.exclusion_zones:
+            if cv2.pointPolygonTest(polygon, point, False) >= 0:
+                return False
+        
         for polygon in self.roi_polygons[lane_id]:
             result = cv2.pointPolygonTest(polygon, point, False)
             if result >= 0:
@@ -63,6 +301,32 @@ class ROIMapper:
         
         return False
     
+    def assign_lanes(self, detections: List) -> np.ndarray:
+        """
+        Lane of every detection: the lane under its center (one lookup into the
+        label mask), or the lane holding most of its box in the overlap modes
+        
+        Args:
+            detections: List of Detection objects
+            
+        Returns:
+            (N,) int array of lane ids (-1 for detections outside all lanes)
+        """
+        if not detections:
+            return np.zeros(0, dtype=np.int64)
+        if self.assignment != "center":
+            overlap = self.lane_overlap(detections)
+            lanes = overlap.argmax(axis=1)
+            lanes[overlap[np.arange(len(lanes)), lanes] < max(self.min_overlap, 1e-6)] = -1
+            return lanes
+        mask = self.get_label_mask()
+        centers = np.array([detection.center for detection in detections], dtype=np.int64).reshape(-1, 2)
+        height, width = mask.shape
+        inside = (centers[:, 0] >= 0) & (centers[:, 0] < width) & (centers[:, 1] >= 0) & (centers[:, 1] < height)
+        lanes = np.full(len(detections), -1, dtype=np.int64)
+        lanes[inside] = mask[centers[inside, 1], centers[inside, 0]]
+        return lanes
+    
     def map_detections_to_lanes(self, detections: List) -> Dict[int, List]:
         """
         Map vehicle detections to specific lanes
@@ -75,13 +339,9 @@ class ROIMapper:
         """
         lane_detections = {i: [] for i in range(self.num_lanes)}
         
-        for detection in detections:
-            center = detection.center
-            
-            for lane_id in range(self.num_lanes):
-                if self.point_in_roi(center, lane_id):
-                    lane_detections[lane_id].append(detection)
-                    break
+        for detection, lane_id in zip(detections, self.assign_lanes(detections)):
+            if lane_id >= 0:
+                lane_detections[int(lane_id)].append(detection)
         
         return lane_detections
     
@@ -94,62 +354,121 @@ class ROIMapper:
             
         Returns:
             Numpy array of vehicle counts [lane0_count, lane1_count, ...]
+            (float32 sums of box fractions in 'fractional' mode)
         """
-        lane_detections = self.map_detections_to_lanes(detections)
-        counts = np.array([len(lane_detections[i]) for i in range(self.num_lanes)], dtype=np.int32)
-        return counts
+        if self.assignment == "fractional":
+            return self.lane_overlap(detections).sum(axis=0, dtype=np.float32)
+        lanes = self.assign_lanes(detections)
+        counts = np.bincount(lanes[lanes >= 0], minlength=self.num_lanes)[:self.num_lanes]
+        return counts.astype(np.int32)
+    
+    def get_roi_overlay(self, height: int, width: int) -> Tuple:
+        """
+        Static visualization layer (ROI outlines, exclusions, labels and legend),
+        rendered once per ROI version and resolution
+        
+        Args:
+            height: Frame height in pixels
+            width: Frame width in pixels
+            
+        Returns:
+            Tuple of (row/column slices of the layer's bounding box, BGR layer and
+            mask of fully covered pixels cropped to that box, (rows, cols) of
+            partially covered (anti-aliased) pixels, their coverage (K, 1) and
+            premultiplied colors (K, 3))
+        """
+        key = (self.roi_version, height, width)
+        if self._overlay_key == key:
+            return self._overlay
+        
+        layer = np.zeros((height, width, 3), dtype=np.uint8)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        
+        def draw(primitive, *args, color, **kwargs):
+            primitive(layer, *args, color=color, **kwargs)
+            primitive(mask, *args, color=255, **kwargs)
+        
+        excluded = [polygon for polygons in self.exclusions.values() for polygon in polygons]
+        if excluded or self.exclusion_zones:
+            draw(cv2.polylines, excluded + self.exclusion_zones, isClosed=True, color=(128, 128, 128), thickness=2)
+        
+        for lane_id, polygons in self.roi_polygons.items():
+            color = LANE_COLORS[lane_id % len(LANE_COLORS)]
+            for polygon in polygons:
+                draw(cv2.polylines, [polygon], isClosed=True, color=color, thickness=3)
+                centroid = polygon.mean(axis=0).astype(int)
+                draw(cv2.putText, f"Lane {lane_id}", tuple(int(v) for v in centroid),
+                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, color=color, thickness=2)
+        
+        # Legend (top right): one swatch and name per lane
+        for row, lane in enumerate(self.lane_configs):
+            lane_id = lane['id']
+            color = LANE_COLORS[lane_id % len(LANE_COLORS)]
+            y = 20 + row * 22
+            x = width - 220
+            draw(cv2.rectangle, (x, y - 12), (x + 14, y + 2), color=color, thickness=-1)
+            draw(cv2.putText, f"{lane_id}: {lane.get('name', '')}", (x + 22, y),
+                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, color=color, thickness=1)
+        
+        x, y, w, h = cv2.boundingRect(mask)
+        box = (slice(y, y + h), slice(x, x + w))
+        layer, mask = layer[box].copy(), mask[box].copy()
+        
+        # Text edges are anti-aliased: blend those few pixels by coverage, copy the rest
+        edges = np.nonzero((mask > 0) & (mask < 255))
+        coverage = mask[edges][:, None].astype(np.float32) / 255.0
+        self._overlay = (
+            box, layer, np.where(mask == 255, mask, 0).astype(np.uint8),
+            edges, coverage, layer[edges].astype(np.float32)
+        )
+        self._overlay_key = key
+        logger.debug(f"ROI overlay rebuilt: {width}x{height}, {w}x{h} drawn region")
+        return self._overlay
     
     def visualize_rois(
         self,
         image: np.ndarray,
         detections: List = None,
-        show_rois: bool = True
+        show_rois: bool = True,
+        in_place: bool = False,
+        alpha: float = 1.0
     ) -> np.ndarray:
         """
         Draw ROIs on image for debugging
         
+        The static layer comes from get_roi_overlay() and is composited in place
+        with one masked copy (or blend); only detection markers are drawn per frame.
+        
         Args:
             image: Input image
             detections: Optional list of detections to show mapping
             show_rois: If False, skip drawing ROIs (use when camera not at intersection)
+            in_place: Draw directly on the input image instead of a copy
+                (use when the caller already owns a private copy)
+            alpha: Opacity of the ROI layer (1.0 = opaque)
             
         Returns:
             Image with ROIs drawn (or original if show_rois=False)
         """
-        result_image = image.copy()
+        result_image = image if in_place else image.copy()
         
         if not show_rois:
             return result_image
         
-        colors = [
-            (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
-            (255, 0, 255), (0, 255, 255), (128, 128, 0), (128, 0, 128)
-        ]
-        
-        for lane_id, polygons in self.roi_polygons.items():
-            color = colors[lane_id % len(colors)]
-            
-            for polygon in polygons:
-                cv2.polylines(result_image, [polygon], isClosed=True, color=color, thickness=3)
-                
-                centroid = polygon.mean(axis=0).astype(int)
-                cv2.putText(
-                    result_image,
-                    f"Lane {lane_id}",
-                    tuple(centroid),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    color,
-                    2
-                )
+        box, layer, solid, edges, coverage, edge_colors = self.get_roi_overlay(*result_image.shape[:2])
+        region = result_image[box]
+        if len(coverage):
+            blended = region[edges] * (1.0 - alpha * coverage) + alpha * edge_colors
+            region[edges] = np.clip(blended, 0, 255).astype(np.uint8)
+        if alpha < 1.0:
+            layer = cv2.addWeighted(region, 1.0 - alpha, layer, alpha, 0.0)
+        cv2.copyTo(layer, solid, region)
         
         if detections:
-            lane_detections = self.map_detections_to_lanes(detections)
-            
-            for lane_id, lane_dets in lane_detections.items():
-                for det in lane_dets:
-                    color = colors[lane_id % len(colors)]
-                    cv2.circle(result_image, det.center, 8, color, -1)
+            lanes = self.assign_lanes(detections)
+            for det, lane_id in zip(detections, lanes.tolist()):
+                if lane_id >= 0:
+                    cv2.circle(result_image, det.center, 8, LANE_COLORS[lane_id % len(LANE_COLORS)], -1)
         
         return result_image
     
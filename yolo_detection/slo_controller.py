@@ -0,0 +1,176 @@
+"""
+Latency SLO Controller - Adapts inference resolution, stride and tiling to a latency budget
+"""
+
+import time
+import numpy as np
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+
+
+DEFAULT_LEVELS = [
+    {'image_size': 640, 'stride': 1, 'tiling': [2, 2]},
+    {'image_size': 640, 'stride': 1, 'tiling': None},
+    {'image_size': 480, 'stride': 1, 'tiling': None},
+    {'image_size': 320, 'stride': 1, 'tiling': None},
+    {'image_size': 320, 'stride': 2, 'tiling': None},
+]
+
+
+class LatencySLOController:
+    """
+    Feedback controller that keeps detection latency within a per-step SLO.
+    
+    Levels are ordered from highest quality (slowest) to lowest quality
+    (fastest). The controller steps down one level when the recent p90 latency
+    exceeds high_water * SLO or the inference queue backs up, and steps back up
+    after a sustained period with p90 below low_water * SLO.
+    """
+    
+    def __init__(
+        self,
+        slo_ms: float = 50.0,
+        levels: Optional[List[Dict]] = None,
+        start_level: int = 1,
+        window: int = 20,
+        high_water: float = 0.9,
+        low_water: float = 0.5,
+        max_queue_depth: int = 4,
+        upgrade_patience: int = 40,
+        max_transitions: int = 50
+    ):
+        """
+        Initialize SLO controller
+        
+        Args:
+            slo_ms: Per-step detection latency budget in milliseconds
+            levels: Settings per level ({image_size, stride, tiling}); best quality first
+            start_level: Index of the level to start at
+            window: Number of recent latency samples used for the p90
+            high_water: Fraction of the SLO above which the controller degrades
+            low_water: Fraction of the SLO below which the controller may upgrade
+            max_queue_depth: Inference queue depth above which the controller degrades
+            upgrade_patience: Consecutive in-budget samples required before upgrading
+            max_transitions: Number of recent transitions kept for /metrics
+        """
+        self.slo_ms = slo_ms
+        self.levels = [self._normalize_level(level) for level in (levels or DEFAULT_LEVELS)]
+        self.level = int(np.clip(start_level, 0, len(self.levels) - 1))
+        self.window = window
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_queue_depth = max_queue_depth
+        self.upgrade_patience = upgrade_patience
+        
+        self._latencies = deque(maxlen=window)
+        self._min_samples = max(3, window // 4)
+        self._headroom_streak = 0
+        self._step = 0
+        self.transitions = deque(maxlen=max_transitions)
+        self.total_transitions = 0
+        
+        logger.info(
+            f"SLO controller initialized: {slo_ms:.0f}ms budget, "
+            f"{len(self.levels)} levels, starting at {self.settings}"
+        )
+    
+    @staticmethod
+    def _normalize_level(level: Dict) -> Dict:
+        """Fill defaults and convert tiling to a (rows, cols) tuple or None"""
+        tiling = level.get('tiling')
+        return {
+            'image_size': int(level.get('image_size', 640)),
+            'stride': max(1, int(level.get('stride', 1))),
+            'tiling': tuple(tiling) if tiling else None
+        }
+    
+    @property
+    def settings(self) -> Dict:
+        """Current inference settings"""
+        return self.levels[self.level]
+    
+    @property
+    def image_size(self) -> int:
+        return self.settings['image_size']
+    
+    @property
+    def tiling(self) -> Optional[Tuple[int, int]]:
+        return self.settings['tiling']
+    
+    def should_infer(self) -> bool:
+        """
+        Advance the step counter and decide whether this step runs detection
+        (False means the caller should reuse the previous detections)
+        """
+        run = self._step % self.settings['stride'] == 0
+        self._step += 1
+        return run
+    
+    def observe(self, latency_ms: float, queue_depth: int = 0) -> bool:
+        """
+        Record one measured inference latency and adapt the settings
+        
+        Args:
+            latency_ms: Measured detection latency (including queueing)
+            queue_depth: Current inference queue depth
+            
+        Returns:
+            True if the settings changed
+        """
+        self._latencies.append(latency_ms)
+        p90 = float(np.percentile(self._latencies, 90))
+        
+        # A single slow sample right after a transition is not a trend
+        over_budget = len(self._latencies) >= self._min_samples and p90 > self.high_water * self.slo_ms
+        backed_up = queue_depth > self.max_queue_depth
+        if (over_budget or backed_up) and self.level < len(self.levels) - 1:
+            self._transition(self.level + 1, "queue" if backed_up else "latency", p90, queue_depth)
+            return True
+            
+        if p90 < self.low_water * self.slo_ms and queue_depth == 0:
+            self._headroom_streak += 1
+        else:
+            self._headroom_streak = 0
+            
+        if self._headroom_streak >= self.upgrade_patience and self.level > 0:
+            self._transition(self.level - 1, "headroom", p90, queue_depth)
+            return True
+            
+        return False
+    
+    def _transition(self, new_level: int, reason: str, p90: float, queue_depth: int):
+        """Switch level and start a fresh measurement window"""
+        old = self.settings
+        self.level = new_level
+        self._latencies.clear()
+        self._headroom_streak = 0
+        self.total_transitions += 1
+        self.transitions.append({
+            'time': time.time(),
+            'from': dict(old),
+            'to': dict(self.settings),
+            'reason': reason,
+            'p90_latency_ms': p90,
+            'queue_depth': queue_depth
+        })
+        logger.info(f"SLO controller ({reason}, p90={p90:.1f}ms): {old} -> {self.settings}")
+    
+    def get_metrics(self) -> Dict:
+        """
+        Get current settings and recent transitions
+        
+        Returns:
+            Metrics dictionary
+        """
+        latencies = np.array(self._latencies, dtype=np.float64)
+        return {
+            'slo_ms': self.slo_ms,
+            'level': self.level,
+            'num_levels': len(self.levels),
+            'settings': dict(self.settings),
+            'p50_latency_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'p90_latency_ms': float(np.percentile(latencies, 90)) if len(latencies) else 0.0,
+            'total_transitions': self.total_transitions,
+            'transitions': list(self.transitions)
+        }
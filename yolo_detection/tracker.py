@@ -0,0 +1,325 @@
+"""
+Vehicle Tracker - ByteTrack-style multi-object tracking with persistent IDs
+Track state is kept in flat numpy arrays (one row per live track) so that
+association and bookkeeping stay vectorized for hundreds of tracks
+"""
+
+import time
+import numpy as np
+from typing import List, Dict, Optional
+from loguru import logger
+
+from .detect_vehicles import iou_matrix
+
+
+def greedy_assignment(scores: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Greedy one-to-one assignment on a score matrix (highest score first)
+    
+    Args:
+        scores: (N, M) similarity matrix (e.g. IoU)
+        threshold: Minimum score for a pair to be assigned
+        
+    Returns:
+        (K, 2) array of (row, column) pairs
+    """
+    rows, cols = np.nonzero(scores >= threshold)
+    if not len(rows):
+        return np.zeros((0, 2), dtype=np.int64)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    
+    taken_rows = np.zeros(scores.shape[0], dtype=bool)
+    taken_cols = np.zeros(scores.shape[1], dtype=bool)
+    pairs = []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if not taken_rows[row] and not taken_cols[col]:
+            taken_rows[row] = taken_cols[col] = True
+            pairs.append((row, col))
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+class VehicleTracker:
+    """Associates detections over time and keeps per-vehicle waiting/exit statistics"""
+    
+    # Per-track arrays (one row per live track)
+    FIELDS = {
+        'ids': np.int64,
+        'boxes': np.float32,        # (T, 4) last box
+        'velocity': np.float32,     # (T, 4) box velocity per second
+        'points': np.float64,       # (T, 2) last position (world meters or box center pixels)
+        'first_seen': np.float64,
+        'last_seen': np.float64,
+        'stopped_time': np.float64,
+        'hits': np.int32,
+        'misses': np.int32,
+        'lane': np.int16,           # last known lane (-1 = none yet)
+        'confirmed': bool,
+        'stopped': bool,
+        'departed': bool            # left its lane (exit event recorded)
+    }
+    
+    def __init__(
+        self,
+        high_threshold: float = 0.5,
+        low_threshold: float = 0.1,
+        match_iou: float = 0.3,
+        low_match_iou: float = 0.5,
+        min_hits: int = 3,
+        max_age: int = 30,
+        stop_speed: float = 1.0,
+        stop_speed_px: float = 15.0
+    ):
+        """
+        Initialize tracker
+        
+        Args:
+            high_threshold: Detections at or above this confidence are matched first
+                and may start new tracks
+            low_threshold: Lower-confidence detections (down to this) only extend
+                existing confirmed tracks (ByteTrack second stage)
+            match_iou: Minimum IoU between a predicted track box and a high-confidence detection
+            low_match_iou: Minimum IoU for the low-confidence stage
+            min_hits: Matches needed before a track is confirmed (gets reported)
+            max_age: Consecutive missed updates before a track is dropped
+            stop_speed: Speed below which a vehicle is stopped, m/s (world positions)
+            stop_speed_px: Same in pixels/s, used when no world positions are given
+        """
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.stop_speed = stop_speed
+        self.stop_speed_px = stop_speed_px
+        
+        self.reset()
+        
+        logger.info(f"Vehicle tracker initialized: IoU>={match_iou}, min_hits={min_hits}, max_age={max_age}")
+    
+    def reset(self):
+        """Drop all tracks and statistics (e.g. on episode reset)"""
+        self.tracks: Dict[str, np.ndarray] = {
+            name: np.zeros((0, 4) if name in ('boxes', 'velocity') else (0, 2) if name == 'points' else 0, dtype=dtype)
+            for name, dtype in self.FIELDS.items()
+        }
+        self.next_id = 1
+        self.last_timestamp: Optional[float] = None
+        self.exit_events: List[Dict] = []
+        self.last_waiting_time = 0.0  # vehicle-seconds spent stopped during the last update
+        
+        self.stats = {
+            'updates': 0,
+            'tracks_started': 0,
+            'tracks_confirmed': 0,
+            'exits': 0,
+            'tracks_lost': 0,
+            'total_update_ms': 0.0
+        }
+    
+    @property
+    def num_tracks(self) -> int:
+        """Number of live (tentative or confirmed) tracks"""
+        return len(self.tracks['ids'])
+    
+    def update(
+        self,
+        detections: List,
+        timestamp: float,
+        lanes: Optional[np.ndarray] = None,
+        positions: Optional[np.ndarray] = None,
+        junction: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Associate one frame of detections with the live tracks
+        
+        Args:
+            detections: Detections of the frame (produced at or below low_threshold)
+            timestamp: Frame time in seconds (simulation time)
+            lanes: Optional (N,) lane of every detection (-1 = outside all lanes)
+            positions: Optional (N, 2) world XY of every detection in meters; box
+                centers in pixels are used otherwise
+            junction: Optional (N,) bool, detection lies in the junction region; a
+                confirmed track with a lane matched there has departed
+                
+        Returns:
+            (N,) track id of every detection (-1 if unmatched or not yet confirmed)
+        """
+        start = time.perf_counter()
+        self.last_waiting_time = 0.0
+        count = len(detections)
+        dt = 0.0 if self.last_timestamp is None else max(timestamp - self.last_timestamp, 0.0)
+        self.last_timestamp = timestamp
+        
+        boxes = np.array([d.bbox for d in detections], dtype=np.float32).reshape(-1, 4)
+        scores = np.array([d.confidence for d in detections], dtype=np.float32)
+        lanes = np.full(count, -1, dtype=np.int16) if lanes is None else np.asarray(lanes, dtype=np.int16)
+        world = positions is not None
+        if world:
+            points = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        else:
+            points = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1).astype(np.float64)
+            
+        tracks = self.tracks
+        predicted = tracks['boxes'] + tracks['velocity'] * dt
+        det_track = np.full(count, -1, dtype=np.int64)  # row of the matched track
+        track_det = np.full(self.num_tracks, -1, dtype=np.int64)
+        
+        # Stage 1: confident detections against all live tracks
+        high = np.flatnonzero(scores >= self.high_threshold)
+        if len(high) and self.num_tracks:
+            pairs = greedy_assignment(iou_matrix(boxes[high], predicted), self.match_iou)
+            det_track[high[pairs[:, 0]]] = pairs[:, 1]
+            track_det[pairs[:, 1]] = high[pairs[:, 0]]
+            
+        # Stage 2: weak detections only extend confirmed tracks left unmatched
+        low = np.flatnonzero((scores < self.high_threshold) & (scores >= self.low_threshold))
+        free_tracks = np.flatnonzero((track_det < 0) & tracks['confirmed'])
+        if len(low) and len(free_tracks):
+            pairs = greedy_assignment(iou_matrix(boxes[low], predicted[free_tracks]), self.low_match_iou)
+            det_track[low[pairs[:, 0]]] = free_tracks[pairs[:, 1]]
+            track_det[free_tracks[pairs[:, 1]]] = low[pairs[:, 0]]
+            
+        # Matched tracks: motion, stop state, lane
+        rows = np.flatnonzero(track_det >= 0)
+        matched = track_det[rows]
+        if len(rows):
+            if dt > 0:
+                tracks['velocity'][rows] = (boxes[matched] - tracks['boxes'][rows]) / dt
+                speed = np.linalg.norm(points[matched] - tracks['points'][rows], axis=1) / dt
+                stopped = ~np.isnan(speed) & (speed < (self.stop_speed if world else self.stop_speed_px))
+                tracks['stopped'][rows] = stopped
+                tracks['stopped_time'][rows[stopped]] += dt
+                self.last_waiting_time = dt * float((stopped & tracks['confirmed'][rows]).sum())
+            tracks['boxes'][rows] = boxes[matched]
+            tracks['points'][rows] = points[matched]
+            tracks['last_seen'][rows] = timestamp
+            tracks['hits'][rows] += 1
+            tracks['misses'][rows] = 0
+            assigned = lanes[matched] >= 0
+            tracks['lane'][rows[assigned]] = lanes[matched][assigned]
+            
+            newly = rows[~tracks['confirmed'][rows] & (tracks['hits'][rows] >= self.min_hits)]
+            tracks['confirmed'][newly] = True
+            self.stats['tracks_confirmed'] += len(newly)
+            
+            if junction is not None:
+                entered = np.asarray(junction, dtype=bool)[matched]
+                self._depart(rows[entered])
+                
+        track_ids = np.full(count, -1, dtype=np.int64)
+        hit = det_track >= 0
+        rows_hit = det_track[hit]
+        track_ids[hit] = np.where(tracks['confirmed'][rows_hit], tracks['ids'][rows_hit], -1)
+        
+        # Unmatched tracks age; stale ones are dropped (vehicles that never departed are lost, not served)
+        missed = track_det < 0
+        tracks['misses'][missed] += 1
+        tracks['stopped'][missed] = False
+        expired = missed & ((tracks['misses'] > self.max_age) | ~tracks['confirmed'])
+        self._close(expired)
+        
+        # Unmatched confident detections start tentative tracks
+        new = high[det_track[high] < 0]
+        if len(new):
+            self._start(boxes[new], points[new], lanes[new], timestamp)
+            
+        self.stats['updates'] += 1
+        self.stats['total_update_ms'] += (time.perf_counter() - start) * 1000.0
+        return track_ids
+    
+    def _start(self, boxes: np.ndarray, points: np.ndarray, lanes: np.ndarray, timestamp: float):
+        """Append tentative tracks"""
+        count = len(boxes)
+        new = {
+            'ids': np.arange(self.next_id, self.next_id + count, dtype=np.int64),
+            'boxes': boxes,
+            'velocity': np.zeros((count, 4), dtype=np.float32),
+            'points': points,
+            'first_seen': np.full(count, timestamp),
+            'last_seen': np.full(count, timestamp),
+            'stopped_time': np.zeros(count),
+            'hits': np.ones(count, dtype=np.int32),
+            'misses': np.zeros(count, dtype=np.int32),
+            'lane': lanes,
+            'confirmed': np.full(count, self.min_hits <= 1),
+            'stopped': np.zeros(count, dtype=bool),
+            'departed': np.zeros(count, dtype=bool)
+        }
+        for name, dtype in self.FIELDS.items():
+            self.tracks[name] = np.concatenate([self.tracks[name], new[name].astype(dtype)])
+        self.next_id += count
+        self.stats['tracks_started'] += count
+        if self.min_hits <= 1:
+            self.stats['tracks_confirmed'] += count
+    
+    def _depart(self, rows: np.ndarray):
+        """Record exit events of confirmed lane tracks at these rows that have not departed yet"""
+        tracks = self.tracks
+        rows = rows[tracks['confirmed'][rows] & (tracks['lane'][rows] >= 0) & ~tracks['departed'][rows]]
+        tracks['departed'][rows] = True
+        for row in rows.tolist():
+            self.exit_events.append({
+                'track_id': int(tracks['ids'][row]),
+                'lane': int(tracks['lane'][row]),
+                'first_seen': float(tracks['first_seen'][row]),
+                'last_seen': float(tracks['last_seen'][row]),
+                'waiting_time': float(tracks['stopped_time'][row])
+            })
+        self.stats['exits'] += len(rows)
+    
+    def mark_departed(self, track_ids: np.ndarray):
+        """
+        Record that vehicles left their lane (e.g. crossed the stop line)
+        
+        Args:
+            track_ids: Ids of the departed vehicles; unknown or unconfirmed ones are ignored
+        """
+        self._depart(np.flatnonzero(np.isin(self.tracks['ids'], np.asarray(track_ids, dtype=np.int64))))
+    
+    def _close(self, expired: np.ndarray):
+        """Remove expired tracks, counting confirmed ones that never departed as lost"""
+        if not expired.any():
+            return
+        tracks = self.tracks
+        self.stats['tracks_lost'] += int((expired & tracks['confirmed'] & ~tracks['departed']).sum())
+        
+        keep = ~expired
+        for name in self.FIELDS:
+            tracks[name] = tracks[name][keep]
+    
+    def pop_exit_events(self) -> List[Dict]:
+        """
+        Vehicles that departed (crossed the stop line or entered the junction)
+        since the last call
+        
+        Returns:
+            List of {track_id, lane, first_seen, last_seen, waiting_time}
+        """
+        events, self.exit_events = self.exit_events, []
+        return events
+    
+    def stopped_vehicles(self, num_lanes: int) -> np.ndarray:
+        """Confirmed, currently stopped vehicles per lane"""
+        mask = self.tracks['confirmed'] & self.tracks['stopped'] & (self.tracks['lane'] >= 0) & ~self.tracks['departed']
+        return np.bincount(self.tracks['lane'][mask], minlength=num_lanes)[:num_lanes]
+    
+    def lane_waiting_time(self, num_lanes: int) -> np.ndarray:
+        """Accumulated stopped time of the confirmed vehicles currently in each lane, seconds"""
+        mask = self.tracks['confirmed'] & (self.tracks['lane'] >= 0) & ~self.tracks['departed']
+        return np.bincount(
+            self.tracks['lane'][mask], weights=self.tracks['stopped_time'][mask], minlength=num_lanes
+        )[:num_lanes]
+    
+    def get_metrics(self) -> Dict:
+        """Tracker statistics"""
+        return {
+            'updates': self.stats['updates'],
+            'tracks_started': self.stats['tracks_started'],
+            'tracks_confirmed': self.stats['tracks_confirmed'],
+            'exits': self.stats['exits'],
+            'tracks_lost': self.stats['tracks_lost'],
+            'avg_update_ms': self.stats['total_update_ms'] / max(1, self.stats['updates']),
+            'active_tracks': int(self.tracks['confirmed'].sum()),
+            'tentative_tracks': int((~self.tracks['confirmed']).sum())
+        }